@@ -1,4 +1,5 @@
-from flask import Flask
+import os
+from flask import Flask, jsonify, send_from_directory
 from flask_cors import CORS
 
 from users import users_bp
@@ -8,36 +9,62 @@ from seats import seats_bp
 from auth import auth_bp
 from mongo_routes import mongo_bp
 from wallet import wallet_bp
+from export import export_bp
+from metrics import metrics_bp
+from querylog import querylog_bp
+from tracing import tracing_bp
+from db import get_pool
 
-app = Flask(__name__)
-CORS(app)  # 👈 สำคัญมาก
+BLUEPRINTS = [
+    auth_bp, users_bp, booking_bp, showtimes_bp, seats_bp, mongo_bp, wallet_bp,
+    export_bp, metrics_bp, querylog_bp, tracing_bp,
+]
 
-# Register blueprints
-app.register_blueprint(auth_bp)
-app.register_blueprint(users_bp)
-app.register_blueprint(booking_bp)
-app.register_blueprint(showtimes_bp)
-app.register_blueprint(seats_bp)
-app.register_blueprint(mongo_bp)
-app.register_blueprint(wallet_bp)
 
+def create_app(config=None):
+    """
+    Application factory. The module-level `app` below is what gunicorn
+    serves (`gunicorn -c gunicorn.conf.py app:app`), the dev server runs
+    and the tests import.
+    """
+    app = Flask(__name__)
+    if config:
+        app.config.update(config)
+    CORS(app, expose_headers=["X-Next-Cursor", "Link", "Content-Disposition", "traceparent"])  # 👈 สำคัญมาก
+
+    # Register blueprints
+    for blueprint in BLUEPRINTS:
+        app.register_blueprint(blueprint)
+
+    # MySQL connection pool statistics (for scraping / debugging);
+    # under gunicorn this is the pool of the worker that answered
+    @app.route('/api/admin/db/pool', methods=['GET'])
+    def db_pool_stats():
+        return jsonify(dict(get_pool().stats(), pid=os.getpid()))
+
+    # serve frontend build if it exists (so backend can be the single entrypoint)
+    @app.route('/', defaults={'path': ''})
+    @app.route('/<path:path>')
+    def serve_frontend(path):
+        # look for files under frontend/dist
+        build_dir = os.path.join(os.path.dirname(__file__), '..', 'frontend', 'dist')
+        if path != "" and os.path.exists(os.path.join(build_dir, path)):
+            return send_from_directory(build_dir, path)
+        if os.path.exists(os.path.join(build_dir, 'index.html')):
+            return send_from_directory(build_dir, 'index.html')
+        # fallback to 404 if no build available
+        return ("Frontend not built", 404)
+
+    return app
 
-# serve frontend build if it exists (so backend can be the single entrypoint)
-from flask import send_from_directory
-import os
 
-@app.route('/', defaults={'path': ''})
-@app.route('/<path:path>')
-def serve_frontend(path):
-    # look for files under frontend/dist
-    build_dir = os.path.join(os.path.dirname(__file__), '..', 'frontend', 'dist')
-    if path != "" and os.path.exists(os.path.join(build_dir, path)):
-        return send_from_directory(build_dir, path)
-    if os.path.exists(os.path.join(build_dir, 'index.html')):
-        return send_from_directory(build_dir, 'index.html')
-    # fallback to 404 if no build available
-    return ("Frontend not built", 404)
+app = create_app()
 
 
 if __name__ == "__main__":
+    # development server; production runs gunicorn -c gunicorn.conf.py app:app
+    # the debug reloader runs the app in a child process; only reap there
+    if os.environ.get("WERKZEUG_RUN_MAIN") == "true" and os.getenv("HOLD_REAPER", "1") == "1":
+        from hold_reaper import hold_reaper
+        hold_reaper.start()
     app.run(host="0.0.0.0", port=5000, debug=True)
@@ -0,0 +1,402 @@
+import argparse
+import datetime
+import random
+import sys
+import threading
+import time
+from db import get_connection
+from bench_load import SERVERS, Client, summarize, save_results, git_commit, spawn_app, wait_until_up
+
+# Contention harness for seat booking (flash sale on one showtime).
+#
+# Many simulated users hammer a single showtime through the real HTTP API:
+# hold 1..--max-seats random seats (/api/booking/bulk or /api/booking),
+# then confirm (--confirm-ratio) or cancel the hold. Afterwards the
+# database is checked directly:
+#   - no seat of the showtime is held/booked twice
+#   - every booked seat has a Paid payment, and every payment equals the
+#     sum of its seat prices
+#   - the seats the clients saw confirmed are exactly the booked ones
+#   - each simulated user's balance dropped by exactly what they paid
+# and the run reports confirmed bookings/sec, the 409 rate, deadlocks
+# (seen by clients and InnoDB's lock_deadlocks counter) and row lock waits.
+#
+#   python bench_booking.py --spawn --users 500 --concurrency 64 --attempts 5000
+#
+# Simulated users are created directly in MySQL (same DB_* settings as the
+# app) and removed again together with their bookings unless --keep is set.
+
+HOLD, CONFIRM, CANCEL = "hold", "confirm", "cancel"
+
+
+def classify(status, body):
+    """Bucket a response: ok, conflict, deadlock, lock_timeout, duplicate, rejected or error."""
+    if status is None:
+        return "error"
+    if 200 <= status < 300:
+        return "ok"
+    if status == 409:
+        return "conflict"
+    message = str((body or {}).get("error", "")) if isinstance(body, dict) else ""
+    if "Deadlock" in message or "1213" in message:
+        return "deadlock"
+    if "Lock wait timeout" in message or "1205" in message:
+        return "lock_timeout"
+    if "Duplicate entry" in message or "1062" in message:
+        return "duplicate"
+    if status == 400:
+        return "rejected"
+    return "error"
+
+
+# ---------- setup / teardown ----------
+
+def create_users(count, balance, prefix):
+    conn = get_connection()
+    try:
+        with conn.cursor() as cursor:
+            cursor.executemany(
+                "INSERT INTO users (email, password, balance) VALUES (%s, '!', %s)",
+                [(f"{prefix}{n}@contention.test", balance) for n in range(1, count + 1)]
+            )
+            cursor.execute(
+                "SELECT user_id, balance FROM users WHERE email LIKE %s ORDER BY user_id",
+                (f"{prefix}%@contention.test",)
+            )
+            users = {row["user_id"]: float(row["balance"]) for row in cursor.fetchall()}
+        conn.commit()
+        return users
+    finally:
+        conn.close()
+
+
+def load_seats(showtime_id):
+    conn = get_connection()
+    try:
+        with conn.cursor() as cursor:
+            cursor.execute("""
+                SELECT s.seat_id, s.price
+                FROM showtimes st
+                JOIN seats s ON s.theater_id = st.theater_id
+                WHERE st.showtime_id = %s
+                ORDER BY s.seat_id
+            """, (showtime_id,))
+            return {row["seat_id"]: float(row["price"]) for row in cursor.fetchall()}
+    finally:
+        conn.close()
+
+
+def innodb_counters():
+    """Row lock waits / wait time (ms) and deadlocks since server start."""
+    conn = get_connection()
+    try:
+        with conn.cursor() as cursor:
+            cursor.execute("SHOW GLOBAL STATUS LIKE 'Innodb_row_lock_%'")
+            status = {row["Variable_name"]: int(row["Value"]) for row in cursor.fetchall()}
+            deadlocks = None
+            try:
+                cursor.execute("SELECT `count` FROM information_schema.INNODB_METRICS WHERE name = 'lock_deadlocks'")
+                row = cursor.fetchone()
+                deadlocks = int(row["count"]) if row else None
+            except Exception:
+                pass
+        return {
+            "lock_waits": status.get("Innodb_row_lock_waits", 0),
+            "lock_wait_ms": status.get("Innodb_row_lock_time", 0),
+            "deadlocks": deadlocks,
+        }
+    finally:
+        conn.close()
+
+
+def cleanup(user_ids):
+    if not user_ids:
+        return
+    in_list = ','.join(['%s'] * len(user_ids))
+    conn = get_connection()
+    try:
+        with conn.cursor() as cursor:
+            cursor.execute(f"SELECT book_id FROM booking WHERE user_id IN ({in_list})", tuple(user_ids))
+            book_ids = [row["book_id"] for row in cursor.fetchall()]
+            if book_ids:
+                books = ','.join(['%s'] * len(book_ids))
+                cursor.execute(f"DELETE FROM book_seat WHERE book_id IN ({books})", tuple(book_ids))
+                cursor.execute(f"DELETE FROM payments WHERE book_id IN ({books})", tuple(book_ids))
+                cursor.execute(f"DELETE FROM booking WHERE book_id IN ({books})", tuple(book_ids))
+            cursor.execute(f"DELETE FROM users WHERE user_id IN ({in_list})", tuple(user_ids))
+        conn.commit()
+    finally:
+        conn.close()
+
+
+# ---------- verification ----------
+
+def snapshot(showtime_id, user_ids):
+    in_list = ','.join(['%s'] * len(user_ids))
+    conn = get_connection()
+    try:
+        with conn.cursor() as cursor:
+            cursor.execute("""
+                SELECT seat_id, COUNT(*) AS holds
+                FROM book_seat WHERE showtime_id = %s
+                GROUP BY seat_id HAVING COUNT(*) > 1
+            """, (showtime_id,))
+            double = [row["seat_id"] for row in cursor.fetchall()]
+
+            cursor.execute("""
+                SELECT bs.seat_id, bs.status, p.status AS payment_status, b.user_id
+                FROM book_seat bs
+                JOIN booking b ON b.book_id = bs.book_id
+                LEFT JOIN payments p ON p.book_id = bs.book_id
+                WHERE bs.showtime_id = %s
+            """, (showtime_id,))
+            seats = cursor.fetchall()
+
+            cursor.execute("""
+                SELECT p.book_id, p.amount, SUM(s.price) AS seat_total
+                FROM payments p
+                JOIN book_seat bs ON bs.book_id = p.book_id
+                JOIN seats s ON s.seat_id = bs.seat_id
+                WHERE bs.showtime_id = %s
+                GROUP BY p.book_id, p.amount
+            """, (showtime_id,))
+            amounts = cursor.fetchall()
+
+            cursor.execute(f"""
+                SELECT u.user_id, u.balance,
+                       COALESCE((SELECT SUM(p.amount) FROM booking b
+                                 JOIN payments p ON p.book_id = b.book_id
+                                 WHERE b.user_id = u.user_id AND p.status = 'Paid'), 0) AS paid
+                FROM users u WHERE u.user_id IN ({in_list})
+            """, tuple(user_ids))
+            balances = cursor.fetchall()
+        return double, seats, amounts, balances
+    finally:
+        conn.close()
+
+
+def reconcile(confirmed_seats, start_balances, double, seats, amounts, balances, user_ids):
+    """Returns a list of problems (empty when everything adds up)."""
+    problems = []
+    if double:
+        problems.append(f"seats held more than once: {sorted(double)[:10]}")
+
+    orphans = [s["seat_id"] for s in seats if s["status"] == "booked" and s["payment_status"] != "Paid"]
+    if orphans:
+        problems.append(f"booked seats without a Paid payment: {sorted(orphans)[:10]}")
+
+    if len(confirmed_seats) != len(set(confirmed_seats)):
+        problems.append("the same seat was confirmed to more than one client")
+
+    ours = set(user_ids)
+    booked = {s["seat_id"] for s in seats if s["status"] == "booked" and s["user_id"] in ours}
+    if booked != set(confirmed_seats):
+        lost = set(confirmed_seats) - booked
+        extra = booked - set(confirmed_seats)
+        problems.append(f"confirmed seats differ from the database (missing {sorted(lost)[:10]}, "
+                        f"unexpected {sorted(extra)[:10]})")
+
+    wrong = [a["book_id"] for a in amounts if abs(float(a["amount"]) - float(a["seat_total"])) > 0.005]
+    if wrong:
+        problems.append(f"payments not matching their seat prices: {wrong[:10]}")
+
+    for row in balances:
+        charged = start_balances[row["user_id"]] - float(row["balance"])
+        if abs(charged - float(row["paid"])) > 0.005:
+            problems.append(f"user {row['user_id']} was charged {charged:.2f} but paid {float(row['paid']):.2f}")
+    return problems
+
+
+# ---------- load ----------
+
+class Stats:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.latency = {HOLD: [], CONFIRM: [], CANCEL: []}
+        self.outcomes = {HOLD: {}, CONFIRM: {}, CANCEL: {}}
+        self.confirmed_seats = []
+        self.confirmed_bookings = 0
+
+    def record(self, op, outcome, seconds):
+        with self.lock:
+            self.outcomes[op][outcome] = self.outcomes[op].get(outcome, 0) + 1
+            if outcome == "ok":
+                self.latency[op].append(seconds)
+
+
+def call(client, stats, op, path, body):
+    started = time.perf_counter()
+    try:
+        status, data = client.request("POST", path, body)
+    except Exception:
+        status, data = None, None
+    outcome = classify(status, data)
+    stats.record(op, outcome, time.perf_counter() - started)
+    return outcome, data
+
+
+def simulated_user(base_url, showtime_id, user_ids, seat_ids, args, budget, stats, n):
+    rng = random.Random(args.seed * 100003 + n)
+    client = Client(base_url)
+    try:
+        while True:
+            with budget["lock"]:
+                if budget["left"] <= 0:
+                    return
+                budget["left"] -= 1
+            user_id = rng.choice(user_ids)
+            picked = rng.sample(seat_ids, min(len(seat_ids), rng.randint(1, args.max_seats)))
+
+            if args.mode == "single":
+                outcome, data = call(client, stats, HOLD, "/api/booking",
+                                     {"user_id": user_id, "showtime_id": showtime_id, "seat_id": picked[0]})
+                picked = picked[:1]
+                book_ids = [data["book_id"]] if outcome == "ok" else []
+            else:
+                outcome, data = call(client, stats, HOLD, "/api/booking/bulk",
+                                     {"user_id": user_id, "showtime_id": showtime_id,
+                                      "seat_ids": picked, "mode": args.mode})
+                book_ids = list(dict.fromkeys(item["book_id"] for item in data["items"])) if outcome == "ok" else []
+            if not book_ids:
+                continue
+
+            if rng.random() < args.confirm_ratio:
+                outcome, _ = call(client, stats, CONFIRM, "/api/booking/confirm",
+                                  {"user_id": user_id, "book_ids": book_ids})
+                if outcome == "ok":
+                    with stats.lock:
+                        stats.confirmed_seats.extend(picked)
+                        stats.confirmed_bookings += len(book_ids)
+                    continue
+            # cancelled on purpose, or the confirm failed: release the hold
+            for book_id in book_ids:
+                call(client, stats, CANCEL, "/api/booking/cancel", {"book_id": book_id})
+    finally:
+        client.close()
+
+
+def run(base_url, showtime_id, args):
+    seats = load_seats(showtime_id)
+    if not seats:
+        raise SystemExit(f"Showtime {showtime_id} has no seats")
+    seat_ids = sorted(seats)[:args.hot_seats] if args.hot_seats else sorted(seats)
+    prefix = f"contention-{datetime.datetime.now():%Y%m%d%H%M%S}-"
+    users = create_users(args.users, args.balance, prefix)
+    user_ids = list(users)
+    print(f"Flash sale on showtime {showtime_id}: {len(seat_ids)} seats, {len(user_ids)} users, "
+          f"{args.concurrency} concurrent clients, {args.attempts} hold attempts ({args.mode} mode)")
+
+    stats = Stats()
+    budget = {"left": args.attempts, "lock": threading.Lock()}
+    before = innodb_counters()
+    started = time.perf_counter()
+    threads = [
+        threading.Thread(target=simulated_user,
+                         args=(base_url, showtime_id, user_ids, seat_ids, args, budget, stats, n))
+        for n in range(args.concurrency)
+    ]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    elapsed = time.perf_counter() - started
+    after = innodb_counters()
+
+    problems = reconcile(stats.confirmed_seats, users, *snapshot(showtime_id, user_ids), user_ids)
+    holds = sum(stats.outcomes[HOLD].values())
+    client_deadlocks = sum(stats.outcomes[op].get("deadlock", 0) for op in stats.outcomes)
+    report = {
+        "showtime_id": showtime_id,
+        "seats": len(seat_ids),
+        "users": len(user_ids),
+        "elapsed_s": round(elapsed, 2),
+        "hold_attempts": holds,
+        "confirmed_bookings": stats.confirmed_bookings,
+        "confirmed_seats": len(stats.confirmed_seats),
+        "bookings_per_s": round(stats.confirmed_bookings / elapsed, 1) if elapsed else 0.0,
+        "conflict_rate": round(stats.outcomes[HOLD].get("conflict", 0) / holds, 3) if holds else 0.0,
+        "deadlocks_client": client_deadlocks,
+        "deadlocks_server": (after["deadlocks"] - before["deadlocks"]) if before["deadlocks"] is not None else None,
+        "lock_waits": after["lock_waits"] - before["lock_waits"],
+        "lock_wait_ms": after["lock_wait_ms"] - before["lock_wait_ms"],
+        "outcomes": stats.outcomes,
+        "latency": {op: summarize(lat, 0, elapsed) for op, lat in stats.latency.items()},
+        "problems": problems,
+    }
+    if not args.keep:
+        cleanup(user_ids)
+    return report
+
+
+def print_report(r):
+    print(f"\n{r['hold_attempts']} holds in {r['elapsed_s']}s -> {r['confirmed_bookings']} bookings confirmed "
+          f"({r['confirmed_seats']}/{r['seats']} seats), {r['bookings_per_s']} bookings/s")
+    print(f"409 rate {r['conflict_rate']:.1%}, deadlocks {r['deadlocks_client']} seen by clients / "
+          f"{r['deadlocks_server'] if r['deadlocks_server'] is not None else '?'} in InnoDB, "
+          f"{r['lock_waits']} row lock waits ({r['lock_wait_ms']} ms)")
+    for op, outcomes in r["outcomes"].items():
+        lat = r["latency"][op]
+        print(f"  {op:<8} {outcomes}  p50 {lat['p50_ms']} ms  p95 {lat['p95_ms']} ms  p99 {lat['p99_ms']} ms")
+    if r["problems"]:
+        print("CONSISTENCY CHECK FAILED:")
+        for problem in r["problems"]:
+            print(f"  - {problem}")
+    else:
+        print("Consistency check passed: no double bookings, payments and balances reconcile.")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Concurrent seat booking contention harness")
+    parser.add_argument("--base-url", default="http://127.0.0.1:5000")
+    parser.add_argument("--spawn", action="store_true", help="start the app locally for the run")
+    parser.add_argument("--server", choices=SERVERS, default="gunicorn",
+                        help="server for --spawn: gunicorn with gunicorn.conf.py (default) or the flask dev server")
+    parser.add_argument("--port", type=int, default=5055, help="port for --spawn")
+    parser.add_argument("--showtime-id", type=int, help="showtime to sell out (default: the first one)")
+    parser.add_argument("--users", type=int, default=200, help="simulated users to create")
+    parser.add_argument("--balance", type=float, default=100000, help="starting balance of each simulated user")
+    parser.add_argument("--concurrency", type=int, default=64)
+    parser.add_argument("--attempts", type=int, default=3000, help="hold attempts in total")
+    parser.add_argument("--max-seats", type=int, default=4, help="seats per hold (1..n)")
+    parser.add_argument("--hot-seats", type=int, default=0, help="only fight over the first N seats (0 = all)")
+    parser.add_argument("--mode", choices=["seat", "basket", "single"], default="basket",
+                        help="bulk booking mode, or 'single' for the legacy /api/booking endpoint")
+    parser.add_argument("--confirm-ratio", type=float, default=0.7, help="share of holds that are paid (rest cancelled)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--keep", action="store_true", help="keep simulated users and their bookings")
+    parser.add_argument("--out", help="result file (default bench-results/contention-<commit>-<time>.json)")
+    args = parser.parse_args()
+
+    proc = None
+    base_url = args.base_url
+    if args.spawn:
+        base_url = f"http://127.0.0.1:{args.port}"
+        proc = spawn_app(args.port, args.server)
+    try:
+        if not wait_until_up(base_url):
+            raise SystemExit(f"App at {base_url} did not come up")
+        showtime_id = args.showtime_id
+        if showtime_id is None:
+            client = Client(base_url)
+            _, showtimes = client.request("GET", "/api/showtimes")
+            client.close()
+            if not showtimes:
+                raise SystemExit("No showtimes; seed the database first")
+            showtime_id = showtimes[0]["showtime_id"]
+        report = run(base_url, showtime_id, args)
+    finally:
+        if proc is not None:
+            proc.terminate()
+            proc.wait()
+
+    print_report(report)
+    save_results("contention", {
+        "meta": {
+            "commit": git_commit(),
+            "timestamp": datetime.datetime.now().isoformat(timespec="seconds"),
+            "base_url": base_url,
+            "args": {k: v for k, v in vars(args).items() if k not in ("out",)},
+        },
+        "results": report,
+    }, args.out)
+    sys.exit(1 if report["problems"] else 0)
@@ -0,0 +1,300 @@
+import argparse
+import datetime
+import http.client
+import json
+import os
+import random
+import socket
+import subprocess
+import sys
+import threading
+import time
+from urllib.parse import urlsplit
+
+# HTTP load benchmark for the read paths.
+#
+# Runs concurrent GET load against a running app (or one started with
+# --spawn) one endpoint at a time and reports requests/sec and p50/p95/p99
+# latency per endpoint. Ids for the parameterized routes (showtimes, users)
+# are discovered from the app itself, so any seeded database works; use
+# `python seed.py --generate` for production-sized data.
+#
+#   python bench_load.py --spawn --duration 20 --concurrency 32   # gunicorn, as deployed
+#   python bench_load.py --spawn --server flask                    # dev server
+#   python bench_load.py --base-url http://localhost:5000 --endpoints movies,seats
+#   python bench_load.py --compare bench-results/load-<old>.json
+#
+# Results are written to bench-results/ as JSON, named after the current
+# git commit, so runs can be compared across commits with --compare.
+
+RESULTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "bench-results")
+
+ENDPOINTS = {
+    "movies": lambda ids, rng: "/api/movies",
+    "showtimes": lambda ids, rng: "/api/showtimes",
+    "seats": lambda ids, rng: f"/api/seats?showtime_id={rng.choice(ids['showtimes'])}",
+    "transactions": lambda ids, rng: f"/api/transactions/{rng.choice(ids['users'])}",
+    "admin_bookings": lambda ids, rng: "/api/admin/bookings?limit=100",
+}
+
+
+# ---------- HTTP ----------
+
+class Client:
+    """One keep-alive HTTP connection per worker thread."""
+
+    def __init__(self, base_url, timeout=30):
+        parts = urlsplit(base_url)
+        self.host = parts.hostname
+        self.port = parts.port or (443 if parts.scheme == "https" else 80)
+        self.https = parts.scheme == "https"
+        self.timeout = timeout
+        self.conn = None
+
+    def _connect(self):
+        cls = http.client.HTTPSConnection if self.https else http.client.HTTPConnection
+        self.conn = cls(self.host, self.port, timeout=self.timeout)
+        self.conn.connect()
+        self.conn.sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+
+    def request(self, method, path, body=None):
+        """Returns (status, parsed JSON body or None). Reconnects once on a dropped socket."""
+        payload = json.dumps(body) if body is not None else None
+        headers = {"Content-Type": "application/json"} if payload is not None else {}
+        for attempt in (1, 2):
+            try:
+                if self.conn is None:
+                    self._connect()
+                self.conn.request(method, path, body=payload, headers=headers)
+                resp = self.conn.getresponse()
+                data = resp.read()
+                if resp.getheader("Connection", "").lower() == "close":
+                    self.close()
+                try:
+                    return resp.status, json.loads(data) if data else None
+                except ValueError:
+                    return resp.status, None
+            except (http.client.HTTPException, ConnectionError, OSError):
+                self.close()
+                if attempt == 2:
+                    raise
+
+    def close(self):
+        if self.conn is not None:
+            self.conn.close()
+            self.conn = None
+
+
+# ---------- statistics ----------
+
+def percentile(sorted_values, pct):
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return None
+    rank = max(1, -(-len(sorted_values) * pct // 100))
+    return sorted_values[min(int(rank), len(sorted_values)) - 1]
+
+
+def summarize(latencies, errors, elapsed):
+    """latencies in seconds -> dict of counts, rps and millisecond percentiles."""
+    latencies = sorted(latencies)
+    ms = lambda v: round(v * 1000, 2) if v is not None else None
+    total = len(latencies) + errors
+    return {
+        "requests": total,
+        "errors": errors,
+        "rps": round(len(latencies) / elapsed, 1) if elapsed else 0.0,
+        "mean_ms": ms(sum(latencies) / len(latencies)) if latencies else None,
+        "p50_ms": ms(percentile(latencies, 50)),
+        "p95_ms": ms(percentile(latencies, 95)),
+        "p99_ms": ms(percentile(latencies, 99)),
+        "max_ms": ms(latencies[-1]) if latencies else None,
+    }
+
+
+# ---------- load ----------
+
+def run_load(base_url, path_for, concurrency, duration, seed=0):
+    """
+    Hammer one endpoint with `concurrency` threads for `duration` seconds.
+    path_for(rng) returns the path of the next request.
+    """
+    lock = threading.Lock()
+    latencies, errors = [], [0]
+    deadline = time.perf_counter() + duration
+
+    def worker(n):
+        rng = random.Random(seed * 1000 + n)
+        client = Client(base_url)
+        local, failed = [], 0
+        try:
+            while time.perf_counter() < deadline:
+                started = time.perf_counter()
+                try:
+                    status, _ = client.request("GET", path_for(rng))
+                    ok = 200 <= status < 300
+                except Exception:
+                    ok = False
+                if ok:
+                    local.append(time.perf_counter() - started)
+                else:
+                    failed += 1
+        finally:
+            client.close()
+        with lock:
+            latencies.extend(local)
+            errors[0] += failed
+
+    started = time.perf_counter()
+    threads = [threading.Thread(target=worker, args=(n,)) for n in range(concurrency)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return summarize(latencies, errors[0], time.perf_counter() - started)
+
+
+def discover_ids(base_url, sample=200):
+    client = Client(base_url)
+    try:
+        _, showtimes = client.request("GET", "/api/showtimes")
+        _, users = client.request("GET", f"/api/admin/users?limit={sample}")
+    finally:
+        client.close()
+    return {
+        "showtimes": [s["showtime_id"] for s in (showtimes or [])[:sample]] or [1],
+        "users": [u["user_id"] for u in (users or [])] or [1],
+    }
+
+
+# ---------- app process ----------
+
+def wait_until_up(base_url, timeout=30):
+    client = Client(base_url, timeout=2)
+    deadline = time.time() + timeout
+    try:
+        while time.time() < deadline:
+            try:
+                status, _ = client.request("GET", "/api/admin/db/pool")
+                if status == 200:
+                    return True
+            except Exception:
+                pass
+            time.sleep(0.5)
+    finally:
+        client.close()
+    return False
+
+
+SERVERS = ("gunicorn", "flask")
+
+
+def spawn_app(port, server="gunicorn"):
+    """
+    Start the app on `port`. "gunicorn" runs the production setup from
+    gunicorn.conf.py (gthread workers, one MySQL pool per worker; size it
+    with WEB_CONCURRENCY / GUNICORN_THREADS); "flask" runs the threaded
+    development server without the debug reloader.
+    """
+    backend_dir = os.path.dirname(os.path.abspath(__file__))
+    if server == "gunicorn":
+        cmd = [sys.executable, "-m", "gunicorn", "-c", "gunicorn.conf.py",
+               "--bind", f"127.0.0.1:{port}", "app:create_app()"]
+    else:
+        code = f"from app import app; app.run(host='127.0.0.1', port={port}, threaded=True)"
+        cmd = [sys.executable, "-c", code]
+    return subprocess.Popen(cmd, cwd=backend_dir)
+
+
+# ---------- results ----------
+
+def git_commit():
+    try:
+        return subprocess.check_output(
+            ["git", "rev-parse", "--short", "HEAD"], stderr=subprocess.DEVNULL, text=True
+        ).strip()
+    except Exception:
+        return "unknown"
+
+
+def save_results(kind, report, out=None):
+    if out is None:
+        os.makedirs(RESULTS_DIR, exist_ok=True)
+        stamp = datetime.datetime.now().strftime("%Y%m%d-%H%M%S")
+        out = os.path.join(RESULTS_DIR, f"{kind}-{report['meta']['commit']}-{stamp}.json")
+    with open(out, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"Results saved to {out}")
+    return out
+
+
+def print_table(results, previous=None):
+    print(f"{'endpoint':<16}{'rps':>10}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'errors':>8}")
+    for name, r in results.items():
+        line = f"{name:<16}{r['rps']:>10}{r['p50_ms'] or '-':>10}{r['p95_ms'] or '-':>10}{r['p99_ms'] or '-':>10}{r['errors']:>8}"
+        old = (previous or {}).get(name)
+        if old and old.get("rps") and old.get("p95_ms") and r["p95_ms"]:
+            line += (f"   rps {100 * (r['rps'] / old['rps'] - 1):+.0f}%"
+                     f"  p95 {100 * (r['p95_ms'] / old['p95_ms'] - 1):+.0f}%")
+        print(line)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Concurrent load benchmark for the read endpoints")
+    parser.add_argument("--base-url", default="http://127.0.0.1:5000")
+    parser.add_argument("--spawn", action="store_true", help="start the app locally for the run (uses .env / DB_* settings)")
+    parser.add_argument("--server", choices=SERVERS, default="gunicorn",
+                        help="server for --spawn: gunicorn with gunicorn.conf.py (default) or the flask dev server")
+    parser.add_argument("--port", type=int, default=5055, help="port for --spawn")
+    parser.add_argument("--endpoints", default=",".join(ENDPOINTS), help="comma separated subset of: " + ", ".join(ENDPOINTS))
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--duration", type=float, default=10, help="seconds of load per endpoint")
+    parser.add_argument("--warmup", type=float, default=2, help="seconds of unmeasured load per endpoint first")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--out", help="result file (default bench-results/load-<commit>-<time>.json)")
+    parser.add_argument("--compare", help="earlier result file to compare against")
+    args = parser.parse_args()
+
+    names = [n.strip() for n in args.endpoints.split(",") if n.strip()]
+    unknown = [n for n in names if n not in ENDPOINTS]
+    if unknown:
+        parser.error(f"unknown endpoints: {', '.join(unknown)}")
+
+    proc = None
+    base_url = args.base_url
+    if args.spawn:
+        base_url = f"http://127.0.0.1:{args.port}"
+        proc = spawn_app(args.port, args.server)
+    try:
+        if not wait_until_up(base_url):
+            raise SystemExit(f"App at {base_url} did not come up")
+        ids = discover_ids(base_url)
+        results = {}
+        for name in names:
+            path_for = lambda rng, name=name: ENDPOINTS[name](ids, rng)
+            if args.warmup:
+                run_load(base_url, path_for, args.concurrency, args.warmup, args.seed)
+            print(f"Benchmarking {name} ({args.concurrency} clients, {args.duration:g}s)...")
+            results[name] = run_load(base_url, path_for, args.concurrency, args.duration, args.seed)
+    finally:
+        if proc is not None:
+            proc.terminate()
+            proc.wait()
+
+    previous = None
+    if args.compare:
+        with open(args.compare) as f:
+            previous = json.load(f)["results"]
+    print_table(results, previous)
+    save_results("load", {
+        "meta": {
+            "commit": git_commit(),
+            "timestamp": datetime.datetime.now().isoformat(timespec="seconds"),
+            "base_url": base_url,
+            "server": args.server if args.spawn else None,
+            "concurrency": args.concurrency,
+            "duration": args.duration,
+            "python": sys.version.split()[0],
+        },
+        "results": results,
+    }, args.out)
@@ -1,5 +1,9 @@
 from flask import Blueprint, request, jsonify
 from db import get_connection
+from enrich import enrich_history, enrich_transactions
+from seat_events import seat_changed
+from hold_reaper import hold_reaper
+from pagination import BadCursor, page_args, page_response
 
 booking_bp = Blueprint("booking", __name__)
 
@@ -58,25 +62,8 @@ def get_watch_history(user_id):
             """, (user_id,))
             history = cursor.fetchall()
 
-            # Now, we should ideally fetch movie titles and theater branch names from Mongo
-            # to make the history complete.
-            from db import get_mongo_db
-            from bson.objectid import ObjectId
-            
-            mongo_db = get_mongo_db()
-            
-            for item in history:
-                try:
-                    movie = mongo_db.movies.find_one({"_id": ObjectId(item["movie_id"])})
-                    item["title"] = movie.get("title", "Unknown Movie") if movie else "Unknown Movie"
-                except:
-                    item["title"] = "Unknown Movie"
-                
-                try:
-                    theater = mongo_db.theaters.find_one({"_id": ObjectId(item["theater_id"])})
-                    item["branch_name"] = theater.get("branch_name", f"Theater {item['theater_id']}") if theater else f"Theater {item['theater_id']}"
-                except:
-                    item["branch_name"] = f"Theater {item['theater_id']}"
+            # Attach movie titles and theater branch names from Mongo
+            enrich_history(history)
 
             return jsonify(history)
     except Exception as e:
@@ -144,6 +131,7 @@ def create_booking():
             )
 
         conn.commit()
+        seat_changed(data["showtime_id"])
         return jsonify({
             "message": "Booking pending",
             "book_id": book_id,
@@ -162,72 +150,135 @@ def create_booking():
 def create_booking_bulk():
     """
     Create bookings for multiple seats in a single showtime for a user.
-    Each seat becomes its own booking + payment, so that payments
-    still map 1:1 with seats while allowing a single confirmation flow.
+
+    mode "seat" (default): each seat becomes its own booking + payment, so
+    that payments map 1:1 with seats while allowing a single confirmation flow.
+    mode "basket": the whole purchase is one booking with one book_seat row
+    per seat and a single payment for the total.
     """
     data = request.json or {}
     user_id = data.get("user_id")
     showtime_id = data.get("showtime_id")
     seat_ids = data.get("seat_ids") or []
+    mode = data.get("mode", "seat")
+
+    if mode not in ("seat", "basket"):
+        return jsonify({"error": "mode must be 'seat' or 'basket'"}), 400
 
     if not user_id or not showtime_id or not isinstance(seat_ids, list) or not seat_ids:
         return jsonify({"error": "user_id, showtime_id and seat_ids[] are required"}), 400
 
+    try:
+        # keep request order, drop repeats (a seat can only be held once)
+        seat_ids = list(dict.fromkeys(int(sid) for sid in seat_ids))
+    except (TypeError, ValueError):
+        return jsonify({"error": "seat_ids must be integers"}), 400
+    in_list = ','.join(['%s'] * len(seat_ids))
+
     conn = get_connection()
     created = []
     try:
         with conn.cursor() as cursor:
-            for seat_id in seat_ids:
-                # get seat price
-                cursor.execute(
-                    "SELECT price FROM seats WHERE seat_id = %s",
-                    (seat_id,)
-                )
-                seat = cursor.fetchone()
-                if not seat:
-                    conn.rollback()
-                    return jsonify({"error": f"seat not found: {seat_id}"}), 404
-                seat_price = float(seat["price"])
-
-                # check seat availability (lock)
-                cursor.execute("""
-                    SELECT status FROM book_seat
-                    WHERE showtime_id = %s AND seat_id = %s
-                    FOR UPDATE
-                """, (showtime_id, seat_id))
-                existing = cursor.fetchone()
-                if existing:
-                    conn.rollback()
-                    return jsonify({"error": f"seat already taken: {seat_id}"}), 409
-
-                # create booking
+            # get all seat prices at once
+            cursor.execute(
+                f"SELECT seat_id, price FROM seats WHERE seat_id IN ({in_list})",
+                tuple(seat_ids)
+            )
+            prices = {row["seat_id"]: float(row["price"]) for row in cursor.fetchall()}
+            missing = [sid for sid in seat_ids if sid not in prices]
+            if missing:
+                conn.rollback()
+                return jsonify({"error": f"seat not found: {missing[0]}"}), 404
+
+            # check availability of every seat (lock) in one statement,
+            # in seat_id order so concurrent group bookings lock consistently
+            cursor.execute(f"""
+                SELECT seat_id FROM book_seat
+                WHERE showtime_id = %s AND seat_id IN ({in_list})
+                ORDER BY seat_id
+                FOR UPDATE
+            """, (showtime_id, *sorted(seat_ids)))
+            taken = cursor.fetchone()
+            if taken:
+                conn.rollback()
+                return jsonify({"error": f"seat already taken: {taken['seat_id']}"}), 409
+
+            if mode == "basket":
+                total = round(sum(prices[sid] for sid in seat_ids), 2)
                 cursor.execute(
                     "INSERT INTO booking (user_id, showtime_id) VALUES (%s, %s)",
                     (user_id, showtime_id)
                 )
                 book_id = cursor.lastrowid
 
-                # hold seat
+                # hold all seats under the one booking
                 cursor.execute(
-                    """
-                    INSERT INTO book_seat (book_id, showtime_id, seat_id, status)
-                    VALUES (%s, %s, %s, 'pending')
-                    """,
-                    (book_id, showtime_id, seat_id)
+                    "INSERT INTO book_seat (book_id, showtime_id, seat_id, status) VALUES "
+                    + ','.join(["(%s, %s, %s, 'pending')"] * len(seat_ids)),
+                    [v for seat_id in seat_ids for v in (book_id, showtime_id, seat_id)]
                 )
 
-                # payment record
+                # single payment for the whole basket
                 cursor.execute(
                     """
                     INSERT INTO payments (book_id, amount, status)
                     VALUES (%s, %s, 'Pending')
                     """,
-                    (book_id, seat_price)
+                    (book_id, total)
                 )
 
-                created.append({"book_id": book_id, "seat_id": seat_id, "amount": seat_price})
+                created = [
+                    {"book_id": book_id, "seat_id": seat_id, "amount": prices[seat_id]}
+                    for seat_id in seat_ids
+                ]
+            else:
+                # create one booking per seat with a single multi-row insert.
+                # lastrowid is the first new id; the rest are increasing but
+                # not necessarily consecutive (innodb_autoinc_lock_mode=2,
+                # auto_increment_increment), so read them back in row order
+                cursor.execute(
+                    "INSERT INTO booking (user_id, showtime_id) VALUES "
+                    + ','.join(['(%s, %s)'] * len(seat_ids)),
+                    [v for _ in seat_ids for v in (user_id, showtime_id)]
+                )
+                cursor.execute("""
+                    SELECT book_id FROM booking
+                    WHERE book_id >= %s AND user_id = %s AND showtime_id = %s
+                    ORDER BY book_id
+                    LIMIT %s
+                """, (cursor.lastrowid, user_id, showtime_id, len(seat_ids)))
+                book_ids = [row["book_id"] for row in cursor.fetchall()]
+                if len(book_ids) != len(seat_ids):
+                    raise RuntimeError("could not read back the new booking ids")
+
+                # hold seats
+                cursor.execute(
+                    "INSERT INTO book_seat (book_id, showtime_id, seat_id, status) VALUES "
+                    + ','.join(["(%s, %s, %s, 'pending')"] * len(seat_ids)),
+                    [v for book_id, seat_id in zip(book_ids, seat_ids) for v in (book_id, showtime_id, seat_id)]
+                )
+
+                # payment records
+                cursor.execute(
+                    "INSERT INTO payments (book_id, amount, status) VALUES "
+                    + ','.join(["(%s, %s, 'Pending')"] * len(seat_ids)),
+                    [v for book_id, seat_id in zip(book_ids, seat_ids) for v in (book_id, prices[seat_id])]
+                )
+
+                created = [
+                    {"book_id": book_id, "seat_id": seat_id, "amount": prices[seat_id]}
+                    for book_id, seat_id in zip(book_ids, seat_ids)
+                ]
 
         conn.commit()
+        seat_changed(showtime_id)
+        if mode == "basket":
+            return jsonify({
+                "message": "Booking pending",
+                "book_id": book_id,
+                "amount": total,
+                "items": created
+            }), 201
         return jsonify({
             "message": "Bookings pending",
             "items": created
@@ -241,63 +292,106 @@ def create_booking_bulk():
 
 
 # ================= CONFIRM BOOKING =================
+def settle_pending_payments(cursor, user_id=None, book_ids=None):
+    """
+    Pay a set of pending bookings in the caller's transaction: lock the
+    pending payments, charge the user once for the total and flip every
+    payment/seat with a single UPDATE ... JOIN.
+    Selects either the given book_ids or, if None, all pending payments
+    of user_id (an int). Returns (error_message, status_code, showtime_ids).
+    """
+    sql = """
+        SELECT b.book_id, b.user_id, b.showtime_id, p.amount
+        FROM payments p
+        JOIN booking b ON p.book_id = b.book_id
+        WHERE p.status = 'Pending'
+    """
+    if book_ids is not None:
+        in_list = ','.join(['%s'] * len(book_ids))
+        sql += f" AND p.book_id IN ({in_list})"
+        params = tuple(book_ids)
+    else:
+        sql += " AND b.user_id = %s"
+        params = (user_id,)
+    cursor.execute(sql + " FOR UPDATE", params)
+    pending = cursor.fetchall()
+    if not pending:
+        return "no pending payment" if book_ids is not None else "no pending payments", 400, set()
+
+    if book_ids is not None:
+        found = {row["book_id"] for row in pending}
+        missing = [bid for bid in book_ids if bid not in found]
+        if missing:
+            return f"no pending payment for booking {missing[0]}", 400, set()
+        owners = {row["user_id"] for row in pending}
+        if len(owners) > 1 or (user_id is not None and owners != {user_id}):
+            return "bookings belong to different users", 400, set()
+        user_id = owners.pop()
+
+    total = sum(float(row["amount"]) for row in pending)
+    cursor.execute(
+        "SELECT balance FROM users WHERE user_id = %s FOR UPDATE",
+        (user_id,)
+    )
+    u = cursor.fetchone()
+    if not u or float(u["balance"]) < total:
+        return "insufficient balance", 400, set()
+
+    # deduct balance
+    cursor.execute(
+        "UPDATE users SET balance = balance - %s WHERE user_id = %s",
+        (total, user_id)
+    )
+
+    # update payments & seats together
+    locked_ids = [row["book_id"] for row in pending]
+    in_list = ','.join(['%s'] * len(locked_ids))
+    cursor.execute(f"""
+        UPDATE payments p
+        JOIN book_seat bs ON bs.book_id = p.book_id
+        SET p.status = 'Paid', bs.status = 'booked'
+        WHERE p.status = 'Pending' AND p.book_id IN ({in_list})
+    """, tuple(locked_ids))
+
+    return None, 200, {row["showtime_id"] for row in pending}
+
+
 @booking_bp.route("/api/booking/confirm", methods=["POST"])
 def confirm_booking():
-    data = request.json
-    book_id = data.get("book_id")
-    if not book_id:
+    """
+    Pay for one booking ({"book_id": 1}) or several at once
+    ({"book_ids": [1, 2, 3]}, e.g. all seats of a bulk booking).
+    """
+    data = request.json or {}
+    book_ids = data.get("book_ids")
+    if book_ids is None and data.get("book_id"):
+        book_ids = [data["book_id"]]
+    if not book_ids or not isinstance(book_ids, list):
         return jsonify({"error": "book_id required"}), 400
+    try:
+        book_ids = list(dict.fromkeys(int(bid) for bid in book_ids))
+    except (TypeError, ValueError):
+        return jsonify({"error": "book_ids must be integers"}), 400
+    user_id = data.get("user_id")
+    if user_id is not None:
+        try:
+            user_id = int(user_id)
+        except (TypeError, ValueError):
+            return jsonify({"error": "user_id must be an integer"}), 400
 
     try:
         conn = get_connection()
         with conn.cursor() as cursor:
-            # lock payment
-            cursor.execute("""
-                SELECT amount FROM payments
-                WHERE book_id = %s AND status = 'Pending'
-                FOR UPDATE
-            """, (book_id,))
-            payment = cursor.fetchone()
-            if not payment:
-                return jsonify({"error": "no pending payment"}), 400
-            amount = float(payment["amount"])
-
-            # get user
-            cursor.execute(
-                "SELECT user_id FROM booking WHERE book_id = %s",
-                (book_id,)
-            )
-            b = cursor.fetchone()
-            if not b:
-                return jsonify({"error": "booking not found"}), 404
-            user_id = b["user_id"]
-
-            cursor.execute(
-                "SELECT balance FROM users WHERE user_id = %s FOR UPDATE",
-                (user_id,)
-            )
-            u = cursor.fetchone()
-            if not u or u["balance"] < amount:
-                return jsonify({"error": "insufficient balance"}), 400
-
-            # deduct balance
-            cursor.execute(
-                "UPDATE users SET balance = balance - %s WHERE user_id = %s",
-                (amount, user_id)
-            )
-
-            # update payment & seat
-            cursor.execute(
-                "UPDATE payments SET status = 'Paid' WHERE book_id = %s",
-                (book_id,)
-            )
-            cursor.execute(
-                "UPDATE book_seat SET status = 'booked' WHERE book_id = %s",
-                (book_id,)
+            error, status, showtime_ids = settle_pending_payments(
+                cursor, user_id=user_id, book_ids=book_ids
             )
+            if error:
+                conn.rollback()
+                return jsonify({"error": error}), status
 
         conn.commit()
-        return jsonify({"message": "Payment confirmed"})
+        seat_changed(*showtime_ids)
+        return jsonify({"message": "Payment confirmed", "book_ids": book_ids})
 
     except Exception as e:
         if 'conn' in locals(): conn.rollback()
@@ -313,46 +407,21 @@ def confirm_all_bookings():
     user_id = data.get("user_id")
     if not user_id:
         return jsonify({"error": "user_id required"}), 400
+    try:
+        user_id = int(user_id)
+    except (TypeError, ValueError):
+        return jsonify({"error": "user_id must be an integer"}), 400
 
     conn = get_connection()
     try:
         with conn.cursor() as cursor:
-            cursor.execute("""
-                SELECT b.book_id, p.amount
-                FROM booking b
-                JOIN payments p ON p.book_id = b.book_id
-                WHERE b.user_id = %s AND p.status = 'Pending'
-                FOR UPDATE
-            """, (user_id,))
-            pending = cursor.fetchall()
-            if not pending:
-                return jsonify({"error": "no pending payments"}), 400
-
-            total = sum(float(row["amount"]) for row in pending)
-            cursor.execute(
-                "SELECT balance FROM users WHERE user_id = %s FOR UPDATE",
-                (user_id,)
-            )
-            u = cursor.fetchone()
-            if not u or float(u["balance"]) < total:
-                return jsonify({"error": "insufficient balance"}), 400
-
-            cursor.execute(
-                "UPDATE users SET balance = balance - %s WHERE user_id = %s",
-                (total, user_id)
-            )
-            for row in pending:
-                bid = row["book_id"]
-                cursor.execute(
-                    "UPDATE payments SET status = 'Paid' WHERE book_id = %s",
-                    (bid,)
-                )
-                cursor.execute(
-                    "UPDATE book_seat SET status = 'booked' WHERE book_id = %s",
-                    (bid,)
-                )
+            error, status, showtime_ids = settle_pending_payments(cursor, user_id=user_id)
+            if error:
+                conn.rollback()
+                return jsonify({"error": error}), status
 
         conn.commit()
+        seat_changed(*showtime_ids)
         return jsonify({"message": "All payments confirmed"})
 
     except Exception as e:
@@ -373,10 +442,12 @@ def cancel_booking():
     conn = get_connection()
     try:
         with conn.cursor() as cursor:
-            cursor.execute(
-                "SELECT status FROM payments WHERE book_id = %s",
-                (book_id,)
-            )
+            cursor.execute("""
+                SELECT p.status, b.showtime_id
+                FROM payments p
+                JOIN booking b ON p.book_id = b.book_id
+                WHERE p.book_id = %s
+            """, (book_id,))
             pay = cursor.fetchone()
             if not pay or pay["status"] != "Pending":
                 return jsonify({"error": "cannot cancel"}), 400
@@ -387,6 +458,7 @@ def cancel_booking():
             cursor.execute("DELETE FROM booking WHERE book_id = %s", (book_id,))
 
         conn.commit()
+        seat_changed(pay["showtime_id"])
         return jsonify({"message": "Booking canceled"})
 
     except Exception as e:
@@ -397,12 +469,32 @@ def cancel_booking():
 
 
 # ================= TRANSACTIONS =================
+# Both listings page by (payment_time, payment_id), newest first. The page is
+# cut from payments first (indexed) and only those rows are joined/grouped.
+
+def _payment_keyset(cursor_values):
+    if not cursor_values:
+        return "", ()
+    return (" AND (p.payment_time < %s OR (p.payment_time = %s AND p.payment_id < %s))",
+            (cursor_values[0], cursor_values[0], cursor_values[1]))
+
+
+def _payment_key(row):
+    return [(row["payment_time"] or "").replace("T", " "), row["payment_id"]]
+
+
 @booking_bp.route("/api/transactions/<int:user_id>")
 def transactions(user_id):
+    try:
+        limit, after = page_args(2)
+    except BadCursor as e:
+        return jsonify({"error": str(e)}), 400
+    keyset_sql, keyset_params = _payment_keyset(after)
+
     conn = get_connection()
     try:
         with conn.cursor() as cursor:
-            cursor.execute("""
+            cursor.execute(f"""
                 SELECT p.payment_id,
                        p.book_id,
                        p.amount,
@@ -411,125 +503,78 @@ def transactions(user_id):
                        DATE_FORMAT(st.showtime, '%%Y-%%m-%%dT%%H:%%i:%%s') AS showtime,
                        st.movie_id,
                        st.theater_id,
-                       s.seat
-                FROM payments p
+                       GROUP_CONCAT(s.seat ORDER BY s.seat_id SEPARATOR ', ') AS seat,
+                       COUNT(bs.seat_id) AS seat_count
+                FROM (
+                    SELECT p.payment_id, p.book_id, p.amount, p.payment_time, p.status
+                    FROM payments p
+                    JOIN booking b ON p.book_id = b.book_id
+                    WHERE b.user_id = %s{keyset_sql}
+                    ORDER BY p.payment_time DESC, p.payment_id DESC
+                    LIMIT %s
+                ) p
                 JOIN booking b ON p.book_id = b.book_id
                 JOIN showtimes st ON b.showtime_id = st.showtime_id
                 JOIN book_seat bs ON b.book_id = bs.book_id
                 JOIN seats s ON bs.seat_id = s.seat_id
-                WHERE b.user_id = %s
-                ORDER BY p.payment_time DESC
-            """, (user_id,))
+                GROUP BY p.payment_id, p.book_id, p.amount, p.payment_time, p.status,
+                         st.showtime, st.movie_id, st.theater_id
+                ORDER BY p.payment_time DESC, p.payment_id DESC
+            """, (user_id, *keyset_params, limit + 1))
             result = cursor.fetchall()
             
         # Fetch movie titles and theater info from MongoDB
-        if result:
-            from db import get_mongo_db
-            from bson.objectid import ObjectId
-            mongo_db = get_mongo_db()
-            movie_ids = list(set([str(r["movie_id"]) for r in result if r.get("movie_id")]))
-            theater_ids = list(set([str(r["theater_id"]) for r in result if r.get("theater_id")]))
-            
-            # Map valid ObjectIds to their titles
-            movie_map = {}
-            for m_id in movie_ids:
-                try:
-                    obj_id = ObjectId(m_id)
-                    movie = mongo_db.movies.find_one({"_id": obj_id})
-                    if movie:
-                        movie_map[m_id] = movie.get("title", "Unknown Movie")
-                except Exception:
-                    movie_map[m_id] = "Unknown Movie"
-                    
-            # Map theaters
-            theater_map = {}
-            for t_id in theater_ids:
-                try:
-                    obj_id = ObjectId(t_id)
-                    theater = mongo_db.theaters.find_one({"_id": obj_id})
-                    if theater:
-                        theater_map[t_id] = {
-                            "name": theater.get("branch_name", "Unknown Screen"),
-                            "format": theater.get("format", "Standard")
-                        }
-                except Exception:
-                    theater_map[t_id] = {"name": "Unknown Screen", "format": "Standard"}
-
-            # Attach titles and theater formats to results
-            for row in result:
-                row["movie"] = movie_map.get(str(row["movie_id"]), "Unknown Movie")
-                t_info = theater_map.get(str(row["theater_id"]), {"name": "Unknown Screen", "format": "Standard"})
-                row["theater_name"] = t_info["name"]
-                row["theater_format"] = t_info["format"]
-
-        return jsonify(result)
+        enrich_transactions(result)
+
+        return page_response(result, limit, _payment_key)
     finally:
         conn.close()
 # ================= ADMIN: LIST ALL BOOKINGS =================
 @booking_bp.route("/api/admin/bookings")
 def list_bookings():
+    try:
+        limit, after = page_args(2)
+    except BadCursor as e:
+        return jsonify({"error": str(e)}), 400
+    keyset_sql, keyset_params = _payment_keyset(after)
+
     conn = get_connection()
     try:
         with conn.cursor() as cursor:
-            cursor.execute("""
+            cursor.execute(f"""
                 SELECT p.payment_id,
                        p.book_id,
                        p.amount,
-                       DATE_FORMAT(p.payment_time, '%Y-%m-%dT%H:%i:%s') AS payment_time,
+                       DATE_FORMAT(p.payment_time, '%%Y-%%m-%%dT%%H:%%i:%%s') AS payment_time,
                        p.status,
                        u.email as user_email,
-                       DATE_FORMAT(st.showtime, '%Y-%m-%dT%H:%i:%s') AS showtime,
+                       DATE_FORMAT(st.showtime, '%%Y-%%m-%%dT%%H:%%i:%%s') AS showtime,
                        st.movie_id,
                        st.theater_id,
-                       s.seat
-                FROM payments p
+                       GROUP_CONCAT(s.seat ORDER BY s.seat_id SEPARATOR ', ') AS seat,
+                       COUNT(bs.seat_id) AS seat_count
+                FROM (
+                    SELECT p.payment_id, p.book_id, p.amount, p.payment_time, p.status
+                    FROM payments p
+                    WHERE 1 = 1{keyset_sql}
+                    ORDER BY p.payment_time DESC, p.payment_id DESC
+                    LIMIT %s
+                ) p
                 JOIN booking b ON p.book_id = b.book_id
                 JOIN users u ON b.user_id = u.user_id
                 JOIN showtimes st ON b.showtime_id = st.showtime_id
                 JOIN book_seat bs ON b.book_id = bs.book_id
                 JOIN seats s ON bs.seat_id = s.seat_id
-                ORDER BY p.payment_time DESC
-            """)
+                GROUP BY p.payment_id, p.book_id, p.amount, p.payment_time, p.status,
+                         u.email, st.showtime, st.movie_id, st.theater_id
+                ORDER BY p.payment_time DESC, p.payment_id DESC
+            """, (*keyset_params, limit + 1))
             result = cursor.fetchall()
 
         # Fetch movie titles and theaters from MongoDB
-        if result:
-            from db import get_mongo_db
-            from bson.objectid import ObjectId
-            mongo_db = get_mongo_db()
-            movie_ids = list(set([str(r["movie_id"]) for r in result if r.get("movie_id")]))
-            theater_ids = list(set([str(r["theater_id"]) for r in result if r.get("theater_id")]))
-            
-            movie_map = {}
-            for m_id in movie_ids:
-                try:
-                    obj_id = ObjectId(m_id)
-                    movie = mongo_db.movies.find_one({"_id": obj_id})
-                    if movie:
-                        movie_map[m_id] = movie.get("title", "Unknown Movie")
-                except Exception:
-                    movie_map[m_id] = "Unknown Movie"
-
-            theater_map = {}
-            for t_id in theater_ids:
-                try:
-                    obj_id = ObjectId(t_id)
-                    theater = mongo_db.theaters.find_one({"_id": obj_id})
-                    if theater:
-                        theater_map[t_id] = {
-                            "name": theater.get("branch_name", "Unknown Screen"),
-                            "format": theater.get("format", "Standard")
-                        }
-                except Exception:
-                    theater_map[t_id] = {"name": "Unknown Screen", "format": "Standard"}
-
-            for row in result:
-                row["movie"] = movie_map.get(str(row["movie_id"]), "Unknown Movie")
-                t_info = theater_map.get(str(row["theater_id"]), {"name": "Unknown Screen", "format": "Standard"})
-                row["theater_name"] = t_info["name"]
-                row["theater_format"] = t_info["format"]
-
-        return jsonify(result)
+        enrich_transactions(result)
+
+        return page_response(result, limit, _payment_key)
     finally:
         conn.close()
 
@@ -547,7 +592,7 @@ def refund_booking():
         with conn.cursor() as cursor:
             # 1. Get payment and user details
             cursor.execute("""
-                SELECT p.amount, p.status, b.user_id
+                SELECT p.amount, p.status, b.user_id, b.showtime_id
                 FROM payments p
                 JOIN booking b ON p.book_id = b.book_id
                 WHERE p.book_id = %s
@@ -564,6 +609,7 @@ def refund_booking():
                 cursor.execute("DELETE FROM payments WHERE book_id = %s", (book_id,))
                 cursor.execute("DELETE FROM booking WHERE book_id = %s", (book_id,))
                 conn.commit()
+                seat_changed(payment["showtime_id"])
                 return jsonify({"message": "Pending booking cancelled (no refund needed)"})
 
             # 2. Refund balance
@@ -581,6 +627,7 @@ def refund_booking():
             cursor.execute("DELETE FROM booking WHERE book_id = %s", (book_id,))
 
         conn.commit()
+        seat_changed(payment["showtime_id"])
         return jsonify({"message": f"Booking refunded {amount} ฿ and cancelled successfully"})
 
     except Exception as e:
@@ -588,3 +635,17 @@ def refund_booking():
         return jsonify({"error": str(e)}), 400
     finally:
         conn.close()
+
+
+# ================= ADMIN: EXPIRED SEAT HOLDS =================
+@booking_bp.route("/api/admin/holds", methods=["GET"])
+def hold_reaper_stats():
+    return jsonify(hold_reaper.stats())
+
+
+@booking_bp.route("/api/admin/holds/release", methods=["POST"])
+def release_expired_holds_now():
+    released = hold_reaper.run_once()
+    if hold_reaper.last_error:
+        return jsonify({"error": hold_reaper.last_error}), 500
+    return jsonify({"message": f"Released {released} expired seat holds", "released": released})
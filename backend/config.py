@@ -0,0 +1,22 @@
+import os
+
+# Settings shared by the app and the command line tools (seed.py,
+# migrate.py, ...), kept free of Flask and database imports so the tools
+# can load it cheaply.
+
+# used when a movie has no duration_minutes
+DEFAULT_DURATION = 120
+
+
+def load_env():
+    # Only load .env if we are not running in a container (where DB_HOST is already set to something else)
+    if os.getenv("DB_HOST") in ["mysql_db", "cinema_mysql"]:
+        return
+
+    env_path = os.path.join(os.path.dirname(__file__), '.env')
+    if os.path.exists(env_path):
+        with open(env_path, 'r') as f:
+            for line in f:
+                if '=' in line:
+                    key, value = line.strip().split('=', 1)
+                    os.environ[key] = value
@@ -1,21 +1,356 @@
 import pymysql
 import os
+import threading
+import atexit
+import time
+from collections import deque
+from contextlib import contextmanager
 from pymongo import MongoClient
+from instrument import InstrumentedDictCursor, mongo_listener
 
-def get_connection():
+
+def _connect():
     return pymysql.connect(
         host=os.getenv("DB_HOST", "localhost"),
         user=os.getenv("DB_USER", "root"),
         password=os.getenv("DB_PASSWORD", ""),
         database=os.getenv("DB_NAME", "cinema_db"),
-        cursorclass=pymysql.cursors.DictCursor,
+        cursorclass=InstrumentedDictCursor,
         autocommit=False
     )
 
+
+class PoolTimeout(Exception):
+    """Raised when no connection could be checked out within the timeout."""
+
+
+class PooledConnection:
+    """
+    Thin wrapper around a pymysql connection borrowed from the pool.
+    Everything is delegated to the real connection except close(), which
+    hands the connection back to the pool instead of dropping the socket,
+    so the existing `finally: conn.close()` blocks keep working unchanged.
+    """
+
+    def __init__(self, pool, raw, created_at):
+        self._pool = pool
+        self._raw = raw
+        self._created_at = created_at
+
+    def __getattr__(self, name):
+        raw = self.__dict__.get("_raw")
+        if raw is None:
+            raise pymysql.err.InterfaceError("connection already returned to pool")
+        return getattr(raw, name)
+
+    def close(self):
+        raw, self._raw = self._raw, None
+        if raw is not None:
+            self._pool._release(raw, self._created_at)
+
+    def discard(self):
+        """Drop the socket instead of returning it, e.g. mid-way through an unbuffered result."""
+        raw, self._raw = self._raw, None
+        if raw is not None:
+            self._pool._release(raw, self._created_at, reuse=False)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+
+class ConnectionPool:
+    """
+    Bounded, thread-safe pool of MySQL connections.
+
+    - min_size connections are opened once by fill() (see init_worker) and
+      kept warm; beyond that, acquire() opens connections on demand
+    - at most max_size connections exist at once; extra borrowers wait
+      up to `timeout` seconds before PoolTimeout is raised
+    - idle connections are pinged on borrow and replaced if dead
+    - connections older than max_age seconds are recycled on release
+    """
+
+    def __init__(self, connect=_connect, min_size=1, max_size=10, timeout=10.0, max_age=1800):
+        if max_size < 1 or min_size < 0 or min_size > max_size:
+            raise ValueError("invalid pool size (need 0 <= min_size <= max_size, max_size >= 1)")
+        self._connect = connect
+        self.min_size = min_size
+        self.max_size = max_size
+        self.timeout = timeout
+        self.max_age = max_age
+        self._lock = threading.Condition(threading.Lock())
+        self._reset_state()
+
+    def _reset_state(self):
+        self._pid = os.getpid()
+        self._idle = deque()  # (raw_conn, created_at)
+        self._size = 0
+        self._in_use = 0
+        self._waiting = 0
+        self._checkouts = 0
+        self._timeouts = 0
+        self._created = 0
+        self._discarded = 0
+        self._wait_total = 0.0
+        self._wait_max = 0.0
+
+    def _check_pid(self):
+        # A forked worker must not share sockets with its parent: start over
+        # with an empty pool (the parent's idle sockets are simply abandoned).
+        if self._pid != os.getpid():
+            with self._lock:
+                if self._pid != os.getpid():
+                    self._reset_state()
+
+    def _open(self):
+        raw = self._connect()
+        self._created += 1
+        return raw, time.monotonic()
+
+    def _expired(self, created_at):
+        return self.max_age is not None and time.monotonic() - created_at > self.max_age
+
+    def _discard(self, raw):
+        self._discarded += 1
+        try:
+            raw.close()
+        except Exception:
+            pass
+
+    def acquire(self, timeout=None):
+        self._check_pid()
+        timeout = self.timeout if timeout is None else timeout
+        started = time.monotonic()
+        deadline = started + timeout
+
+        with self._lock:
+            self._waiting += 1
+            try:
+                while not self._idle and self._size >= self.max_size:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        self._timeouts += 1
+                        raise PoolTimeout(f"no MySQL connection available within {timeout}s")
+                    self._lock.wait(remaining)
+            finally:
+                self._waiting -= 1
+
+            waited = time.monotonic() - started
+            self._wait_total += waited
+            self._wait_max = max(self._wait_max, waited)
+            self._checkouts += 1
+            self._in_use += 1
+            idle = self._idle.popleft() if self._idle else None
+            if idle is None:
+                # reserve the slot before connecting outside the lock
+                self._size += 1
+
+        try:
+            if idle is not None:
+                raw, created_at = idle
+                if self._expired(created_at) or not self._alive(raw):
+                    self._discard(raw)
+                    raw, created_at = self._open()
+            else:
+                raw, created_at = self._open()
+        except Exception:
+            with self._lock:
+                self._size -= 1
+                self._in_use -= 1
+                self._lock.notify()
+            raise
+
+        return PooledConnection(self, raw, created_at)
+
+    def _alive(self, raw):
+        try:
+            raw.ping(reconnect=False)
+            return True
+        except Exception:
+            return False
+
+    def _release(self, raw, created_at, reuse=True):
+        if self._pid != os.getpid():
+            return
+        keep = reuse
+        if keep:
+            try:
+                # never hand out a connection with a half-finished transaction
+                raw.rollback()
+            except Exception:
+                keep = False
+
+        if keep and self._expired(created_at):
+            keep = False
+
+        with self._lock:
+            self._in_use -= 1
+            if keep:
+                self._idle.append((raw, created_at))
+            else:
+                self._size -= 1
+            self._lock.notify()
+
+        if not keep:
+            self._discard(raw)
+
+    def fill(self):
+        """Open connections until min_size are available."""
+        self._check_pid()
+        while True:
+            with self._lock:
+                if self._size >= self.min_size:
+                    return
+                self._size += 1
+            try:
+                raw, created_at = self._open()
+            except Exception:
+                with self._lock:
+                    self._size -= 1
+                raise
+            with self._lock:
+                self._idle.append((raw, created_at))
+                self._lock.notify()
+
+    @contextmanager
+    def connection(self, timeout=None):
+        conn = self.acquire(timeout)
+        try:
+            yield conn
+        finally:
+            conn.close()
+
+    def close_all(self):
+        with self._lock:
+            idle, self._idle = list(self._idle), deque()
+            self._size -= len(idle)
+        for raw, _ in idle:
+            self._discard(raw)
+
+    def stats(self):
+        with self._lock:
+            checkouts = self._checkouts
+            return {
+                "size": self._size,
+                "idle": len(self._idle),
+                "in_use": self._in_use,
+                "waiting": self._waiting,
+                "min_size": self.min_size,
+                "max_size": self.max_size,
+                "checkouts": checkouts,
+                "timeouts": self._timeouts,
+                "created": self._created,
+                "discarded": self._discarded,
+                "wait_time_total": round(self._wait_total, 6),
+                "wait_time_avg": round(self._wait_total / checkouts, 6) if checkouts else 0.0,
+                "wait_time_max": round(self._wait_max, 6),
+            }
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_pool():
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = ConnectionPool(
+                    min_size=int(os.getenv("DB_POOL_MIN", "1")),
+                    max_size=int(os.getenv("DB_POOL_MAX", "10")),
+                    timeout=float(os.getenv("DB_POOL_TIMEOUT", "10")),
+                    max_age=float(os.getenv("DB_POOL_MAX_AGE", "1800")),
+                )
+    return _pool
+
+
+def get_connection():
+    # Borrow a connection from the process-wide pool; conn.close() returns it.
+    # The pool is warmed once per worker by init_worker(); acquire() opens
+    # further connections on demand, so checkouts never call fill().
+    return get_pool().acquire()
+
+
+@contextmanager
+def db_connection(timeout=None):
+    """with db_connection() as conn: ... -- returned to the pool on exit."""
+    with get_pool().connection(timeout) as conn:
+        yield conn
+
+
+_mongo_client = None
+_mongo_pid = None
+_mongo_lock = threading.Lock()
+
+
+def get_mongo_client():
+    """
+    Process-wide MongoClient. MongoClient is thread-safe and keeps its own
+    connection pool, so it is created once and reused by every request.
+    After a fork (pre-forking servers) the child builds a fresh client, as
+    pymongo clients must not be shared across processes.
+    """
+    global _mongo_client, _mongo_pid
+    if _mongo_client is None or _mongo_pid != os.getpid():
+        with _mongo_lock:
+            if _mongo_client is None or _mongo_pid != os.getpid():
+                # Use environment variable for MongoDB URI, default to local if not set
+                # The default mongo_db from docker-compose is cinema_mongo
+                mongo_uri = os.getenv("MONGO_URI", "mongodb://localhost:27017/cinema_db")
+                _mongo_client = MongoClient(
+                    mongo_uri,
+                    maxPoolSize=int(os.getenv("MONGO_MAX_POOL_SIZE", "50")),
+                    minPoolSize=int(os.getenv("MONGO_MIN_POOL_SIZE", "0")),
+                    serverSelectionTimeoutMS=int(os.getenv("MONGO_SERVER_SELECTION_TIMEOUT_MS", "5000")),
+                    connectTimeoutMS=int(os.getenv("MONGO_CONNECT_TIMEOUT_MS", "5000")),
+                    socketTimeoutMS=int(os.getenv("MONGO_SOCKET_TIMEOUT_MS", "10000")),
+                    # don't open sockets/monitor threads until the first operation,
+                    # so importing this module before a fork stays safe
+                    connect=False,
+                    event_listeners=[mongo_listener],
+                )
+                _mongo_pid = os.getpid()
+    return _mongo_client
+
+
 def get_mongo_db():
-    # Use environment variable for MongoDB URI, default to local if not set
-    # The default mongo_db from docker-compose is cinema_mongo
-    mongo_uri = os.getenv("MONGO_URI", "mongodb://localhost:27017/cinema_db")
-    client = MongoClient(mongo_uri)
-    # The database name will be extracted from the URI or we can specify it
-    return client.get_database()
+    # The database name will be extracted from the URI
+    return get_mongo_client().get_database()
+
+
+def close_mongo_client():
+    global _mongo_client, _mongo_pid
+    with _mongo_lock:
+        client, _mongo_client = _mongo_client, None
+        owner, _mongo_pid = _mongo_pid, None
+    if client is not None and owner == os.getpid():
+        client.close()
+
+
+def init_worker():
+    """
+    Per-worker setup for pre-forking servers (gunicorn post_fork hook):
+    drop the MySQL pool state inherited from the master, open this worker's
+    own DB_POOL_MIN connections and its own MongoClient, so the first
+    requests of a fresh worker don't pay for connecting.
+    """
+    try:
+        get_pool().fill()
+    except Exception as e:
+        # the worker still serves; connections are retried on first use
+        print(f"Worker {os.getpid()}: MySQL pool warm-up failed: {e}")
+    get_mongo_client()
+
+
+def close_connections():
+    """Shutdown hook: drop idle MySQL connections and close the Mongo client."""
+    if _pool is not None:
+        _pool.close_all()
+    close_mongo_client()
+
+
+atexit.register(close_connections)
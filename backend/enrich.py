@@ -0,0 +1,81 @@
+from bson.objectid import ObjectId
+from db import get_mongo_db
+
+# Movies and theaters live in MongoDB while bookings live in MySQL, so every
+# booking listing needs titles / branch names attached afterwards. These
+# helpers collect the ids of a whole result set first and resolve each
+# collection with a single projected $in query, i.e. at most two Mongo round
+# trips per response no matter how many rows there are.
+
+UNKNOWN_MOVIE = "Unknown Movie"
+UNKNOWN_SCREEN = "Unknown Screen"
+DEFAULT_FORMAT = "Standard"
+
+
+def _object_ids(values):
+    ids = {}
+    for value in values:
+        if not value:
+            continue
+        key = str(value)
+        if key in ids:
+            continue
+        try:
+            ids[key] = ObjectId(key)
+        except Exception:
+            # ids that are not ObjectIds can never match, skip them
+            continue
+    return list(ids.values())
+
+
+def _find_by_ids(collection, values, projection):
+    obj_ids = _object_ids(values)
+    if not obj_ids:
+        return {}
+    cursor = collection.find({"_id": {"$in": obj_ids}}, projection)
+    return {str(doc["_id"]): doc for doc in cursor}
+
+
+def resolve_names(rows, movie_key="movie_id", theater_key="theater_id", mongo_db=None):
+    """
+    Look up movies and theaters referenced by `rows`.
+    Returns (movies, theaters) dicts keyed by the string id.
+    """
+    if not rows:
+        return {}, {}
+    mongo_db = mongo_db if mongo_db is not None else get_mongo_db()
+    movies = _find_by_ids(
+        mongo_db.movies,
+        (r.get(movie_key) for r in rows),
+        {"title": 1},
+    )
+    theaters = _find_by_ids(
+        mongo_db.theaters,
+        (r.get(theater_key) for r in rows),
+        {"branch_name": 1, "format": 1},
+    )
+    return movies, theaters
+
+
+def enrich_transactions(rows, mongo_db=None):
+    """Attach movie, theater_name and theater_format to payment rows."""
+    movies, theaters = resolve_names(rows, mongo_db=mongo_db)
+    for row in rows:
+        movie = movies.get(str(row.get("movie_id")))
+        theater = theaters.get(str(row.get("theater_id")))
+        row["movie"] = movie.get("title", UNKNOWN_MOVIE) if movie else UNKNOWN_MOVIE
+        row["theater_name"] = theater.get("branch_name", UNKNOWN_SCREEN) if theater else UNKNOWN_SCREEN
+        row["theater_format"] = theater.get("format", DEFAULT_FORMAT) if theater else DEFAULT_FORMAT
+    return rows
+
+
+def enrich_history(rows, mongo_db=None):
+    """Attach title and branch_name to watch history rows."""
+    movies, theaters = resolve_names(rows, mongo_db=mongo_db)
+    for row in rows:
+        movie = movies.get(str(row.get("movie_id")))
+        theater = theaters.get(str(row.get("theater_id")))
+        fallback = f"Theater {row.get('theater_id')}"
+        row["title"] = movie.get("title", UNKNOWN_MOVIE) if movie else UNKNOWN_MOVIE
+        row["branch_name"] = theater.get("branch_name", fallback) if theater else fallback
+    return rows
@@ -0,0 +1,202 @@
+import csv
+import io
+import json
+import os
+from datetime import datetime
+from flask import Blueprint, Response, request, jsonify, stream_with_context
+from db import get_connection
+from enrich import enrich_transactions
+from instrument import InstrumentedSSDictCursor
+from streams import stream_slots, streams_busy
+
+export_bp = Blueprint("export", __name__)
+
+# Streaming export of the booking ledger (one record per payment).
+#
+# /api/admin/bookings pages through the ledger for the UI; this endpoint is
+# for finance pulling everything at once. Rows are read with an unbuffered
+# server-side cursor (SSDictCursor) one seat per row, ordered by payment_id
+# so MySQL can walk the payments primary key without a temp table or sort;
+# consecutive rows of the same payment are folded into one record here.
+# Records are enriched with movie/theater names EXPORT_CHUNK_SIZE at a time
+# (two Mongo $in queries per chunk) and written out as NDJSON or CSV, so
+# memory stays flat no matter how large the ledger is and the first bytes
+# go out as soon as MySQL returns the first rows.
+
+EXPORT_CHUNK_SIZE = int(os.getenv("EXPORT_CHUNK_SIZE", "1000"))
+# a slow client stalls the unbuffered result; give MySQL room to wait on it
+EXPORT_NET_WRITE_TIMEOUT = int(os.getenv("EXPORT_NET_WRITE_TIMEOUT", "600"))
+
+FORMATS = {
+    "ndjson": "application/x-ndjson",
+    "csv": "text/csv",
+}
+PAYMENT_STATUSES = ("Failed", "Pending", "Paid")
+FIELDS = [
+    "payment_id", "book_id", "user_id", "user_email", "amount", "status",
+    "payment_time", "showtime_id", "showtime", "movie_id", "movie",
+    "theater_id", "theater_name", "theater_format", "seat", "seat_count",
+]
+
+
+def _parse_time(value):
+    for fmt in ("%Y-%m-%d %H:%M:%S", "%Y-%m-%dT%H:%M:%S", "%Y-%m-%d"):
+        try:
+            return datetime.strptime(value, fmt)
+        except ValueError:
+            continue
+    raise ValueError(f"invalid date: {value}")
+
+
+def _ledger_query(status=None, since=None, until=None):
+    where, params = [], []
+    if status:
+        where.append("p.status = %s")
+        params.append(status)
+    if since:
+        where.append("p.payment_time >= %s")
+        params.append(since)
+    if until:
+        where.append("p.payment_time < %s")
+        params.append(until)
+    sql = f"""
+        SELECT p.payment_id,
+               p.book_id,
+               b.user_id,
+               u.email AS user_email,
+               p.amount,
+               p.status,
+               DATE_FORMAT(p.payment_time, '%%Y-%%m-%%dT%%H:%%i:%%s') AS payment_time,
+               st.showtime_id,
+               DATE_FORMAT(st.showtime, '%%Y-%%m-%%dT%%H:%%i:%%s') AS showtime,
+               st.movie_id,
+               st.theater_id,
+               s.seat_id,
+               s.seat
+        FROM payments p
+        JOIN booking b ON p.book_id = b.book_id
+        JOIN users u ON b.user_id = u.user_id
+        JOIN showtimes st ON b.showtime_id = st.showtime_id
+        JOIN book_seat bs ON b.book_id = bs.book_id
+        JOIN seats s ON bs.seat_id = s.seat_id
+        {"WHERE " + " AND ".join(where) if where else ""}
+        ORDER BY p.payment_id
+    """
+    return sql, tuple(params)
+
+
+def group_payments(rows):
+    """Fold consecutive per-seat rows of the same payment into one record."""
+    record, seats = None, []
+    for row in rows:
+        if record is not None and row["payment_id"] != record["payment_id"]:
+            yield _finish(record, seats)
+            record = None
+        if record is None:
+            record = {k: v for k, v in row.items() if k not in ("seat_id", "seat")}
+            seats = []
+        seats.append((row["seat_id"], row["seat"]))
+    if record is not None:
+        yield _finish(record, seats)
+
+
+def _finish(record, seats):
+    seats.sort()
+    record["seat"] = ", ".join(seat for _, seat in seats)
+    record["seat_count"] = len(seats)
+    return record
+
+
+def _fetch_rows(cursor):
+    while True:
+        rows = cursor.fetchmany(EXPORT_CHUNK_SIZE)
+        if not rows:
+            return
+        yield from rows
+
+
+def _chunks(records):
+    chunk = []
+    for record in records:
+        chunk.append(record)
+        if len(chunk) >= EXPORT_CHUNK_SIZE:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def _encode_ndjson(chunk):
+    return "".join(json.dumps({k: r.get(k) for k in FIELDS}, default=str) + "\n" for r in chunk)
+
+
+def _encode_csv(chunk, header=False):
+    buf = io.StringIO()
+    writer = csv.DictWriter(buf, fieldnames=FIELDS, extrasaction="ignore")
+    if header:
+        writer.writeheader()
+    writer.writerows(chunk)
+    return buf.getvalue()
+
+
+def stream_ledger(fmt, status=None, since=None, until=None):
+    conn = get_connection()
+    finished = False
+    try:
+        with conn.cursor() as cursor:
+            cursor.execute("SELECT @@SESSION.net_write_timeout AS net_write_timeout")
+            previous_timeout = cursor.fetchone()["net_write_timeout"]
+            cursor.execute("SET SESSION net_write_timeout = %s", (EXPORT_NET_WRITE_TIMEOUT,))
+        cursor = conn.cursor(InstrumentedSSDictCursor)
+        sql, params = _ledger_query(status, since, until)
+        cursor.execute(sql, params)
+        if fmt == "csv":
+            yield _encode_csv([], header=True)
+        for chunk in _chunks(group_payments(_fetch_rows(cursor))):
+            enrich_transactions(chunk)
+            yield _encode_ndjson(chunk) if fmt == "ndjson" else _encode_csv(chunk)
+        cursor.close()
+        # the connection goes back to the pool; don't hand the raised timeout to the next borrower
+        with conn.cursor() as cursor:
+            cursor.execute("SET SESSION net_write_timeout = %s", (previous_timeout,))
+        finished = True
+    finally:
+        if finished:
+            conn.close()
+        else:
+            # client went away (or the query failed) with rows still unread;
+            # draining millions of rows just to reuse the socket is not worth it
+            conn.discard()
+
+
+@export_bp.route("/api/admin/export/bookings", methods=["GET"])
+def export_bookings():
+    fmt = request.args.get("format", "ndjson").lower()
+    if fmt not in FORMATS:
+        return jsonify({"error": f"format must be one of: {', '.join(FORMATS)}"}), 400
+
+    status = request.args.get("status")
+    if status and status not in PAYMENT_STATUSES:
+        return jsonify({"error": f"status must be one of: {', '.join(PAYMENT_STATUSES)}"}), 400
+
+    try:
+        since = _parse_time(request.args["since"]) if request.args.get("since") else None
+        until = _parse_time(request.args["until"]) if request.args.get("until") else None
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    if not stream_slots.acquire():
+        return streams_busy()
+    filename = f"bookings-{datetime.now().strftime('%Y%m%d-%H%M%S')}.{fmt}"
+    resp = Response(
+        stream_with_context(stream_ledger(fmt, status, since, until)),
+        mimetype=FORMATS[fmt],
+        headers={
+            "Content-Disposition": f'attachment; filename="{filename}"',
+            # keep reverse proxies from buffering the whole export
+            "X-Accel-Buffering": "no",
+            "Cache-Control": "no-store",
+        },
+    )
+    resp.call_on_close(stream_slots.release)
+    return resp
@@ -0,0 +1,54 @@
+import multiprocessing
+import os
+
+# Production serving: gunicorn -c gunicorn.conf.py app:app
+#
+# Pre-forking server with gthread workers: WEB_CONCURRENCY processes, each
+# running GUNICORN_THREADS request threads. Every worker builds its own
+# MySQL pool and MongoClient right after the fork (post_fork ->
+# db.init_worker) and, with HOLD_REAPER=1, its own hold reaper thread (the
+# reaper claims rows with SKIP LOCKED, so running one per worker is safe).
+#
+# Threads matter here: /api/seats/stream and the export endpoint hold their
+# thread for as long as the client is connected. streams.py caps them at
+# MAX_STREAMS per worker (default threads // 2) and answers the rest with
+# 503, so the other threads stay free for the API. Stream capacity is
+# WEB_CONCURRENCY x MAX_STREAMS; raise GUNICORN_THREADS with it.
+#
+# Metrics (/api/admin/metrics, /api/admin/db/pool) are kept per worker and
+# labelled with its pid; sum over pids for totals.
+#
+# `kill -HUP <master pid>` reloads code gracefully: new workers are started
+# and old ones finish their in-flight requests (up to graceful_timeout).
+# This needs GUNICORN_PRELOAD=0 (the default); preloading shares the
+# imported code between workers but then HUP cannot pick up new code.
+
+bind = f"{os.getenv('HOST', '0.0.0.0')}:{os.getenv('PORT', '5000')}"
+workers = int(os.getenv("WEB_CONCURRENCY", multiprocessing.cpu_count() * 2 + 1))
+threads = int(os.getenv("GUNICORN_THREADS", "4"))
+worker_class = "gthread"
+
+keepalive = int(os.getenv("GUNICORN_KEEPALIVE", "5"))
+timeout = int(os.getenv("GUNICORN_TIMEOUT", "60"))
+graceful_timeout = int(os.getenv("GUNICORN_GRACEFUL_TIMEOUT", "30"))
+# recycle workers now and then so slow leaks can't build up
+max_requests = int(os.getenv("GUNICORN_MAX_REQUESTS", "5000"))
+max_requests_jitter = int(os.getenv("GUNICORN_MAX_REQUESTS_JITTER", "500"))
+preload_app = os.getenv("GUNICORN_PRELOAD", "0") == "1"
+
+accesslog = os.getenv("GUNICORN_ACCESS_LOG", "-")
+errorlog = "-"
+forwarded_allow_ips = os.getenv("FORWARDED_ALLOW_IPS", "127.0.0.1")
+
+
+def post_fork(server, worker):
+    from db import init_worker
+    init_worker()
+    if os.getenv("HOLD_REAPER", "1") == "1":
+        from hold_reaper import hold_reaper
+        hold_reaper.start()
+
+
+def worker_exit(server, worker):
+    from db import close_connections
+    close_connections()
@@ -0,0 +1,138 @@
+import os
+import threading
+import time
+from db import get_connection
+from seat_events import seat_changed
+
+# Pending seat holds (book_seat.status = 'pending' with a Pending payment)
+# expire HOLD_TTL_SECONDS after they were created. The reaper releases
+# expired holds in batches of whole bookings, deleting the book_seat,
+# payments and booking rows just like a user cancellation would. Bookings
+# are claimed through their pending payment with FOR UPDATE SKIP LOCKED, so
+# several app processes can run the reaper at the same time and a hold
+# that is being paid right now is left alone.
+
+
+def hold_ttl():
+    return int(os.getenv("HOLD_TTL_SECONDS", "900"))
+
+
+def release_expired_holds(ttl_seconds=None, batch_size=500):
+    """Release every expired hold. Returns the number of seats freed."""
+    ttl_seconds = hold_ttl() if ttl_seconds is None else ttl_seconds
+    released = 0
+    while True:
+        conn = get_connection()
+        try:
+            with conn.cursor() as cursor:
+                # claim whole bookings through their pending payment (confirm
+                # locks the same row first, so a booking being paid is skipped);
+                # the payment is written in the same transaction as the hold
+                cursor.execute("""
+                    SELECT book_id
+                    FROM payments
+                    WHERE status = 'Pending'
+                      AND payment_time < NOW() - INTERVAL %s SECOND
+                    ORDER BY payment_time
+                    LIMIT %s
+                    FOR UPDATE SKIP LOCKED
+                """, (ttl_seconds, batch_size))
+                book_ids = [row["book_id"] for row in cursor.fetchall()]
+                if not book_ids:
+                    conn.rollback()
+                    return released
+
+                # lock every seat of the claimed bookings before deleting anything
+                in_list = ','.join(['%s'] * len(book_ids))
+                cursor.execute(
+                    f"SELECT showtime_id FROM book_seat WHERE book_id IN ({in_list}) AND status = 'pending' FOR UPDATE",
+                    tuple(book_ids)
+                )
+                showtime_ids = {row["showtime_id"] for row in cursor.fetchall()}
+                cursor.execute(
+                    f"DELETE FROM book_seat WHERE book_id IN ({in_list}) AND status = 'pending'",
+                    tuple(book_ids)
+                )
+                released += cursor.rowcount
+                cursor.execute(
+                    f"DELETE FROM payments WHERE book_id IN ({in_list}) AND status = 'Pending'",
+                    tuple(book_ids)
+                )
+                cursor.execute(
+                    f"DELETE FROM booking WHERE book_id IN ({in_list})",
+                    tuple(book_ids)
+                )
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            conn.close()
+
+        if showtime_ids:
+            seat_changed(*showtime_ids)
+        if len(book_ids) < batch_size:
+            return released
+
+
+class HoldReaper:
+    def __init__(self, interval=None, ttl_seconds=None, batch_size=500):
+        self.interval = interval if interval is not None else float(os.getenv("HOLD_REAPER_INTERVAL", "60"))
+        self.ttl_seconds = ttl_seconds
+        self.batch_size = batch_size
+        self.runs = 0
+        self.released_total = 0
+        self.last_released = 0
+        self.last_run = None
+        self.last_error = None
+        self._stop = threading.Event()
+        self._thread = None
+
+    def run_once(self):
+        try:
+            released = release_expired_holds(self.ttl_seconds, self.batch_size)
+            self.last_error = None
+        except Exception as e:
+            released = 0
+            self.last_error = str(e)
+            print(f"Hold reaper failed: {e}")
+        self.runs += 1
+        self.last_run = time.time()
+        self.last_released = released
+        self.released_total += released
+        if released:
+            print(f"Hold reaper released {released} expired seat holds")
+        return released
+
+    def _loop(self):
+        while not self._stop.wait(self.interval):
+            self.run_once()
+
+    def start(self):
+        if self._thread is None or not self._thread.is_alive():
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._loop, name="hold-reaper", daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def stats(self):
+        return {
+            "running": bool(self._thread and self._thread.is_alive()),
+            "interval": self.interval,
+            "ttl_seconds": self.ttl_seconds if self.ttl_seconds is not None else hold_ttl(),
+            "runs": self.runs,
+            "released_total": self.released_total,
+            "last_released": self.last_released,
+            "last_run": self.last_run,
+            "last_error": self.last_error,
+        }
+
+
+hold_reaper = HoldReaper()
+
+
+if __name__ == "__main__":
+    count = release_expired_holds()
+    print(f"Released {count} expired seat holds.")
@@ -0,0 +1,105 @@
+import threading
+import time
+from pymongo import monitoring
+from pymysql.cursors import DictCursor, SSDictCursor
+
+# Hooks into every MySQL statement and MongoDB command the app runs.
+#
+# db.py opens MySQL connections with InstrumentedDictCursor and registers
+# mongo_listener on the shared MongoClient. Each statement / command is
+# timed and handed to the functions registered with on_sql() / on_mongo(),
+# in the thread that ran it, so subscribers (metrics.py, ...) can attribute
+# it to the current request. With no subscribers the cost is two
+# perf_counter() calls per statement.
+#
+#   on_sql(fn):   fn(query, seconds, rowcount, error)
+#   on_mongo(fn): fn(command_name, collection, seconds, error, docs)
+#
+# `query` is the SQL as written in the code (before parameters are filled
+# in); docs is the number of documents returned or written (None when the
+# reply does not say); error is the exception, or None.
+
+_sql_hooks = []
+_mongo_hooks = []
+
+
+def on_sql(fn):
+    _sql_hooks.append(fn)
+    return fn
+
+
+def on_mongo(fn):
+    _mongo_hooks.append(fn)
+    return fn
+
+
+def _notify(hooks, *args):
+    for fn in hooks:
+        try:
+            fn(*args)
+        except Exception as e:
+            print(f"Instrumentation hook {getattr(fn, '__name__', fn)} failed: {e}")
+
+
+class _InstrumentedCursorMixin:
+    # executemany() and callproc() go through execute(), so this sees every round trip
+
+    def execute(self, query, args=None):
+        started = time.perf_counter()
+        try:
+            result = super().execute(query, args)
+        except Exception as e:
+            if _sql_hooks:
+                _notify(_sql_hooks, query, time.perf_counter() - started, -1, e)
+            raise
+        if _sql_hooks:
+            _notify(_sql_hooks, query, time.perf_counter() - started, self.rowcount, None)
+        return result
+
+
+class InstrumentedDictCursor(_InstrumentedCursorMixin, DictCursor):
+    pass
+
+
+class InstrumentedSSDictCursor(_InstrumentedCursorMixin, SSDictCursor):
+    """Unbuffered variant: the time covers sending the query and the first packet only."""
+
+
+class _MongoListener(monitoring.CommandListener):
+    # started/succeeded/failed fire on the thread running the operation;
+    # the collection name is only in the started event, so keep it until the end
+    def __init__(self):
+        self._pending = {}
+        self._lock = threading.Lock()
+
+    def started(self, event):
+        if not _mongo_hooks:
+            return
+        collection = event.command.get(event.command_name)
+        with self._lock:
+            self._pending[(event.connection_id, event.request_id)] = (
+                collection if isinstance(collection, str) else None
+            )
+
+    def _finish(self, event, error, docs=None):
+        with self._lock:
+            collection = self._pending.pop((event.connection_id, event.request_id), None)
+        if _mongo_hooks:
+            _notify(_mongo_hooks, event.command_name, collection, event.duration_micros / 1e6, error, docs)
+
+    def succeeded(self, event):
+        if not _mongo_hooks:
+            return self._finish(event, None)
+        reply = event.reply or {}
+        cursor = reply.get("cursor")
+        if isinstance(cursor, dict):
+            docs = len(cursor.get("firstBatch", cursor.get("nextBatch", [])))
+        else:
+            docs = reply.get("n")
+        self._finish(event, None, docs)
+
+    def failed(self, event):
+        self._finish(event, event.failure)
+
+
+mongo_listener = _MongoListener()
@@ -0,0 +1,258 @@
+import os
+import threading
+import time
+from bisect import bisect_left
+from flask import Blueprint, Response, request
+from db import get_pool
+from instrument import on_sql, on_mongo
+from streams import stream_slots
+
+metrics_bp = Blueprint("metrics", __name__)
+
+# Per-route request metrics in Prometheus text format (/api/admin/metrics).
+#
+# For every request we record latency (histogram), status code, and how many
+# MySQL statements / Mongo commands it ran and how long they took, so a slow
+# route can be split into database time and Python time. Statement timings
+# come from instrument.py; they are summed in a per-thread accumulator while
+# the request runs and merged into the shared tables under one lock when it
+# ends, so the hot path never contends on a lock per statement.
+#
+# Routes are labelled by their URL rule (/api/transactions/<int:user_id>),
+# not the concrete path, to keep label cardinality bounded.
+#
+# Under gunicorn every worker process keeps its own tables and a scrape is
+# answered by whichever worker accepts it. Every series therefore carries a
+# pid label: each one stays monotonic within its process, and totals are
+# sum without (pid) over the series of all workers. Scrape often enough
+# that every worker is hit, or run WEB_CONCURRENCY=1 with more threads.
+# Set METRICS_ENABLED=0 to turn the request and database hooks off.
+
+ENABLED = os.getenv("METRICS_ENABLED", "1") == "1"
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+STORES = ("mysql", "mongo")
+
+
+class _Histogram:
+    __slots__ = ("counts", "total", "count")
+
+    def __init__(self):
+        self.counts = [0] * (len(BUCKETS) + 1)
+        self.total = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect_left(BUCKETS, value)] += 1
+        self.total += value
+        self.count += 1
+
+    def merge(self, other):
+        for i, n in enumerate(other.counts):
+            self.counts[i] += n
+        self.total += other.total
+        self.count += other.count
+
+
+class _RequestStats:
+    """What one request did, filled in without locks by the thread serving it."""
+    __slots__ = ("started", "db", "recorded")
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        # store -> [statements, seconds, errors, histogram]
+        self.db = {store: [0, 0.0, 0, _Histogram()] for store in STORES}
+        self.recorded = False
+
+    def add(self, store, seconds, error):
+        entry = self.db[store]
+        entry[0] += 1
+        entry[1] += seconds
+        if error is not None:
+            entry[2] += 1
+        entry[3].observe(seconds)
+
+
+class Metrics:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.requests = {}   # (method, route, status) -> count
+        self.latency = {}    # (method, route) -> _Histogram
+        self.db = {}         # (method, route, store) -> [statements, seconds]
+        self.db_latency = {store: _Histogram() for store in STORES}
+        self.db_errors = {store: 0 for store in STORES}
+        self._local = threading.local()
+
+    # ----- collection -----
+
+    def begin(self):
+        self._local.current = _RequestStats()
+
+    def current(self):
+        return getattr(self._local, "current", None)
+
+    def end(self, method, route, status):
+        stats = self.current()
+        if stats is None or stats.recorded:
+            return
+        stats.recorded = True
+        elapsed = time.perf_counter() - stats.started
+        with self._lock:
+            key = (method, route, str(status))
+            self.requests[key] = self.requests.get(key, 0) + 1
+            hist = self.latency.get((method, route))
+            if hist is None:
+                hist = self.latency[(method, route)] = _Histogram()
+            hist.observe(elapsed)
+            for store, (count, seconds, errors, statements) in stats.db.items():
+                if not count:
+                    continue
+                totals = self.db.setdefault((method, route, store), [0, 0.0])
+                totals[0] += count
+                totals[1] += seconds
+                self.db_errors[store] += errors
+                self.db_latency[store].merge(statements)
+
+    def clear_current(self):
+        self._local.current = None
+
+    def observe_db(self, store, seconds, error):
+        stats = self.current()
+        if stats is not None and not stats.recorded:
+            stats.add(store, seconds, error)
+            return
+        # outside a request (background threads, streamed responses)
+        with self._lock:
+            self.db_latency[store].observe(seconds)
+            if error is not None:
+                self.db_errors[store] += 1
+
+    def reset(self):
+        with self._lock:
+            self.requests.clear()
+            self.latency.clear()
+            self.db.clear()
+            self.db_latency = {store: _Histogram() for store in STORES}
+            self.db_errors = {store: 0 for store in STORES}
+
+    # ----- exposition -----
+
+    def render(self, pool_stats=None, stream_stats=None):
+        with self._lock:
+            requests = dict(self.requests)
+            latency = {k: (list(h.counts), h.total, h.count) for k, h in self.latency.items()}
+            db = {k: list(v) for k, v in self.db.items()}
+            db_latency = {k: (list(h.counts), h.total, h.count) for k, h in self.db_latency.items()}
+            db_errors = dict(self.db_errors)
+
+        out = []
+        out.append("# HELP cinema_http_requests_total HTTP requests by route and status code.")
+        out.append("# TYPE cinema_http_requests_total counter")
+        for (method, route, status), n in sorted(requests.items()):
+            out.append(f"cinema_http_requests_total{_labels(method=method, route=route, status=status)} {n}")
+
+        out.append("# HELP cinema_http_request_duration_seconds Request latency by route.")
+        out.append("# TYPE cinema_http_request_duration_seconds histogram")
+        for (method, route), hist in sorted(latency.items()):
+            _histogram_lines(out, "cinema_http_request_duration_seconds", hist, method=method, route=route)
+
+        out.append("# HELP cinema_db_queries_total Database statements/commands run by route.")
+        out.append("# TYPE cinema_db_queries_total counter")
+        for (method, route, store), (count, _) in sorted(db.items()):
+            out.append(f"cinema_db_queries_total{_labels(method=method, route=route, db=store)} {count}")
+
+        out.append("# HELP cinema_db_query_seconds_total Time spent in database calls by route.")
+        out.append("# TYPE cinema_db_query_seconds_total counter")
+        for (method, route, store), (_, seconds) in sorted(db.items()):
+            out.append(f"cinema_db_query_seconds_total{_labels(method=method, route=route, db=store)} {seconds:.6f}")
+
+        out.append("# HELP cinema_db_query_duration_seconds Latency of single database calls.")
+        out.append("# TYPE cinema_db_query_duration_seconds histogram")
+        for store, hist in sorted(db_latency.items()):
+            _histogram_lines(out, "cinema_db_query_duration_seconds", hist, db=store)
+
+        out.append("# HELP cinema_db_errors_total Database calls that raised an error.")
+        out.append("# TYPE cinema_db_errors_total counter")
+        for store, n in sorted(db_errors.items()):
+            out.append(f"cinema_db_errors_total{_labels(db=store)} {n}")
+
+        if pool_stats:
+            for key in ("size", "idle", "in_use", "waiting"):
+                out.append(f"# TYPE cinema_mysql_pool_{key} gauge")
+                out.append(f"cinema_mysql_pool_{key}{_labels()} {pool_stats[key]}")
+            for key in ("checkouts", "timeouts", "created", "discarded"):
+                out.append(f"# TYPE cinema_mysql_pool_{key}_total counter")
+                out.append(f"cinema_mysql_pool_{key}_total{_labels()} {pool_stats[key]}")
+            out.append("# TYPE cinema_mysql_pool_wait_seconds_total counter")
+            out.append(f"cinema_mysql_pool_wait_seconds_total{_labels()} {pool_stats['wait_time_total']}")
+
+        if stream_stats:
+            out.append("# HELP cinema_streams_active Open streaming responses (seat feed, exports).")
+            out.append("# TYPE cinema_streams_active gauge")
+            out.append(f"cinema_streams_active{_labels()} {stream_stats['active']}")
+            out.append("# TYPE cinema_streams_limit gauge")
+            out.append(f"cinema_streams_limit{_labels()} {stream_stats['limit']}")
+            out.append("# TYPE cinema_streams_rejected_total counter")
+            out.append(f"cinema_streams_rejected_total{_labels()} {stream_stats['rejected']}")
+        return "\n".join(out) + "\n"
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(**labels):
+    labels = {"pid": os.getpid(), **labels}
+    return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in labels.items()) + "}"
+
+
+def _histogram_lines(out, name, hist, **labels):
+    counts, total, count = hist
+    cumulative = 0
+    for bound, n in zip(BUCKETS, counts):
+        cumulative += n
+        out.append(f"{name}_bucket{_labels(**labels, le=repr(bound))} {cumulative}")
+    out.append(f"{name}_bucket{_labels(**labels, le='+Inf')} {count}")
+    out.append(f"{name}_sum{_labels(**labels)} {total:.6f}")
+    out.append(f"{name}_count{_labels(**labels)} {count}")
+
+
+metrics = Metrics()
+
+
+def _route():
+    return request.url_rule.rule if request.url_rule is not None else "unmatched"
+
+
+if ENABLED:
+    @on_sql
+    def _record_sql(query, seconds, rowcount, error):
+        metrics.observe_db("mysql", seconds, error)
+
+    @on_mongo
+    def _record_mongo(command_name, collection, seconds, error, docs):
+        metrics.observe_db("mongo", seconds, error)
+
+    @metrics_bp.before_app_request
+    def _start_request():
+        metrics.begin()
+
+    @metrics_bp.after_app_request
+    def _finish_request(response):
+        metrics.end(request.method, _route(), response.status_code)
+        return response
+
+    @metrics_bp.teardown_app_request
+    def _teardown_request(exc):
+        # unhandled exceptions skip after_request
+        if exc is not None:
+            metrics.end(request.method, _route(), 500)
+        metrics.clear_current()
+
+
+@metrics_bp.route("/api/admin/metrics", methods=["GET"])
+def prometheus_metrics():
+    try:
+        pool_stats = get_pool().stats()
+    except Exception:
+        pool_stats = None
+    return Response(metrics.render(pool_stats, stream_slots.stats()), mimetype="text/plain; version=0.0.4")
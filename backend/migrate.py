@@ -0,0 +1,268 @@
+import argparse
+import time
+from bson.objectid import ObjectId
+from pymongo import ASCENDING, DESCENDING
+from pymongo.errors import DuplicateKeyError
+from config import DEFAULT_DURATION, load_env
+from db import get_connection, get_mongo_db
+from review_stats import rebuild_review_stats
+
+# Versioned schema migrations for both stores.
+#
+# Each migration has a version number, a short name and a function that is
+# given a MySQL cursor (store "mysql") or the Mongo database (store "mongo").
+# Applied versions are recorded per store: in the MySQL table
+# schema_migrations and in the Mongo collection schema_migrations. Running
+# `python migrate.py` applies everything that is missing, in order; steps
+# are written so they are safe on databases created from a newer init.sql.
+#
+# To add a migration append it to MIGRATIONS with the next version number;
+# never renumber or edit one that has shipped.
+
+
+def wait_for_databases(max_retries=10, retry_delay=5):
+    # the container runs migrations first, possibly before MySQL/Mongo accept connections
+    for i in range(max_retries):
+        try:
+            get_connection().close()
+            get_mongo_db().command("ping")
+            return True
+        except Exception as e:
+            print(f"Wait for DB... ({e})")
+            if i < max_retries - 1:
+                time.sleep(retry_delay)
+    return False
+
+
+# ---------- helpers ----------
+
+def column_exists(cursor, table, column):
+    cursor.execute("""
+        SELECT 1 FROM information_schema.columns
+        WHERE table_schema = DATABASE() AND table_name = %s AND column_name = %s
+    """, (table, column))
+    return cursor.fetchone() is not None
+
+
+def index_exists(cursor, table, index):
+    cursor.execute("""
+        SELECT 1 FROM information_schema.statistics
+        WHERE table_schema = DATABASE() AND table_name = %s AND index_name = %s
+        LIMIT 1
+    """, (table, index))
+    return cursor.fetchone() is not None
+
+
+def add_index(cursor, table, index, columns):
+    if not index_exists(cursor, table, index):
+        cursor.execute(f"ALTER TABLE {table} ADD INDEX {index} ({columns})")
+
+
+# ---------- migrations ----------
+
+def m001_topup_requests(cursor):
+    # formerly migrate_wallet.py
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS topup_requests (
+            request_id INT AUTO_INCREMENT PRIMARY KEY,
+            user_id INT NOT NULL,
+            amount DECIMAL(10, 2) NOT NULL,
+            status ENUM('Pending', 'Approved', 'Rejected') DEFAULT 'Pending',
+            created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY (user_id) REFERENCES users (user_id)
+        );
+    """)
+
+
+def m002_book_seat_created_at(cursor):
+    # seat holds expire HOLD_TTL_SECONDS after creation (hold_reaper.py)
+    if not column_exists(cursor, "book_seat", "created_at"):
+        cursor.execute("ALTER TABLE book_seat ADD COLUMN created_at DATETIME DEFAULT CURRENT_TIMESTAMP")
+    add_index(cursor, "book_seat", "idx_book_seat_status_created", "status, created_at")
+
+
+def m003_secondary_indexes(cursor):
+    add_index(cursor, "booking", "idx_booking_user", "user_id")
+    add_index(cursor, "payments", "idx_payments_book_status", "book_id, status")
+    add_index(cursor, "showtimes", "idx_showtimes_movie_time", "movie_id, showtime")
+    add_index(cursor, "showtimes", "idx_showtimes_theater_time", "theater_id, showtime")
+    add_index(cursor, "seats", "idx_seats_theater", "theater_id")
+    add_index(cursor, "topup_requests", "idx_topup_status_created", "status, created_at")
+
+
+def m004_showtime_end_time(cursor):
+    # create_showtime checks overlaps with an indexed range query on end_time
+    if not column_exists(cursor, "showtimes", "end_time"):
+        cursor.execute("ALTER TABLE showtimes ADD COLUMN end_time DATETIME NULL AFTER showtime")
+    add_index(cursor, "showtimes", "idx_showtimes_theater_end", "theater_id, end_time")
+
+    # backfill from the movie durations stored in Mongo
+    cursor.execute("SELECT DISTINCT movie_id FROM showtimes WHERE end_time IS NULL")
+    movie_ids = [row["movie_id"] for row in cursor.fetchall()]
+    durations = {}
+    obj_ids = []
+    for movie_id in movie_ids:
+        try:
+            obj_ids.append(ObjectId(movie_id))
+        except Exception:
+            pass
+    if obj_ids:
+        for movie in get_mongo_db().movies.find({"_id": {"$in": obj_ids}}, {"duration_minutes": 1}):
+            durations[str(movie["_id"])] = movie.get("duration_minutes")
+    for movie_id in movie_ids:
+        cursor.execute(
+            "UPDATE showtimes SET end_time = showtime + INTERVAL %s MINUTE "
+            "WHERE movie_id = %s AND end_time IS NULL",
+            (durations.get(movie_id) or DEFAULT_DURATION, movie_id)
+        )
+
+
+def m005_pagination_indexes(cursor):
+    # keyset pagination of the booking ledger and top-up requests, newest first
+    add_index(cursor, "payments", "idx_payments_time", "payment_time")
+    add_index(cursor, "topup_requests", "idx_topup_created", "created_at")
+
+
+def dedupe_documents(collection, keys):
+    """
+    Keep only the newest document (highest _id) for each value of `keys`,
+    ignoring documents without mysql_user_id. Returns the duplicate keys.
+    """
+    duplicates = []
+    for row in collection.aggregate([
+        {"$match": {"mysql_user_id": {"$exists": True}}},
+        {"$sort": {"_id": -1}},
+        {"$group": {"_id": {k: f"${k}" for k in keys}, "ids": {"$push": "$_id"}, "count": {"$sum": 1}}},
+        {"$match": {"count": {"$gt": 1}}},
+    ], allowDiskUse=True):
+        collection.delete_many({"_id": {"$in": row["ids"][1:]}})
+        duplicates.append(row["_id"])
+    if duplicates:
+        print(f"{collection.name}: removed older duplicates for {len(duplicates)} keys, "
+              f"e.g. {duplicates[:10]}")
+    return duplicates
+
+
+def create_unique_index(collection, keys, name):
+    # documents without mysql_user_id would all index as null and collide
+    try:
+        collection.create_index(
+            [(k, ASCENDING) for k in keys], name=name, unique=True,
+            partialFilterExpression={"mysql_user_id": {"$exists": True}}
+        )
+    except DuplicateKeyError as e:
+        conflict = (e.details or {}).get("keyValue")
+        raise RuntimeError(f"unique index {collection.name}.{name} failed: duplicate key {conflict}") from e
+
+
+def m101_mongo_indexes(mongo_db):
+    mongo_db.reviews.create_index(
+        [("movie_id", ASCENDING), ("created_at", DESCENDING)],
+        name="movie_created"
+    )
+    # one review per user per movie (api_create_review upserts on this pair);
+    # both API writes are upserts, so the newest duplicate is the one that counts
+    duplicates = dedupe_documents(mongo_db.reviews, ["movie_id", "mysql_user_id"])
+    if duplicates:
+        rebuild_review_stats(mongo_db, list({d["movie_id"] for d in duplicates}))
+    create_unique_index(mongo_db.reviews, ["movie_id", "mysql_user_id"], "movie_user")
+    dedupe_documents(mongo_db.user_profiles, ["mysql_user_id"])
+    create_unique_index(mongo_db.user_profiles, ["mysql_user_id"], "mysql_user_id")
+
+
+MIGRATIONS = [
+    (1, "mysql", "topup_requests table", m001_topup_requests),
+    (2, "mysql", "book_seat.created_at for hold expiry", m002_book_seat_created_at),
+    (3, "mysql", "secondary indexes for booking/seat/showtime lookups", m003_secondary_indexes),
+    (4, "mysql", "showtimes.end_time for range overlap checks", m004_showtime_end_time),
+    (5, "mysql", "indexes for keyset pagination", m005_pagination_indexes),
+    (101, "mongo", "reviews and user_profiles indexes", m101_mongo_indexes),
+]
+
+
+# ---------- runner ----------
+
+def _mysql_applied(cursor):
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS schema_migrations (
+            version INT PRIMARY KEY,
+            name VARCHAR(255) NOT NULL,
+            applied_at DATETIME DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+    cursor.execute("SELECT version FROM schema_migrations")
+    return {row["version"] for row in cursor.fetchall()}
+
+
+def _mongo_applied(mongo_db):
+    return {doc["version"] for doc in mongo_db.schema_migrations.find({}, {"version": 1})}
+
+
+def pending_migrations(conn, mongo_db):
+    with conn.cursor() as cursor:
+        mysql_done = _mysql_applied(cursor)
+    conn.commit()
+    mongo_done = _mongo_applied(mongo_db)
+    return [
+        m for m in MIGRATIONS
+        if m[0] not in (mysql_done if m[1] == "mysql" else mongo_done)
+    ]
+
+
+def migrate(conn=None, mongo_db=None):
+    """Apply every pending migration. Returns the versions applied."""
+    own_conn = conn is None
+    conn = conn or get_connection()
+    mongo_db = mongo_db if mongo_db is not None else get_mongo_db()
+    applied = []
+    try:
+        for version, store, name, step in pending_migrations(conn, mongo_db):
+            print(f"Applying migration {version} ({store}): {name}")
+            if store == "mysql":
+                # DDL auto-commits in MySQL, so each step is recorded right after it runs
+                with conn.cursor() as cursor:
+                    step(cursor)
+                    cursor.execute(
+                        "INSERT INTO schema_migrations (version, name) VALUES (%s, %s)",
+                        (version, name)
+                    )
+                conn.commit()
+            else:
+                step(mongo_db)
+                mongo_db.schema_migrations.insert_one({"version": version, "name": name})
+            applied.append(version)
+    finally:
+        if own_conn:
+            conn.close()
+    return applied
+
+
+def status():
+    conn = get_connection()
+    try:
+        pending = {m[0] for m in pending_migrations(conn, get_mongo_db())}
+    finally:
+        conn.close()
+    for version, store, name, _ in MIGRATIONS:
+        state = "pending" if version in pending else "applied"
+        print(f"{version:>4}  {store:<5}  {state:<7}  {name}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Apply versioned MySQL/MongoDB schema migrations")
+    parser.add_argument("--status", action="store_true", help="list migrations and whether they are applied")
+    args = parser.parse_args()
+
+    load_env()
+    if not wait_for_databases():
+        print("Could not connect to database after several attempts.")
+        raise SystemExit(1)
+    if args.status:
+        status()
+    else:
+        try:
+            done = migrate()
+            print(f"Migration successful: {len(done)} applied." if done else "Database is up to date.")
+        except Exception as e:
+            print(f"Migration failed: {e}")
+            raise SystemExit(1)
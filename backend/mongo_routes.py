@@ -1,7 +1,10 @@
 import datetime
 from flask import Blueprint, request, jsonify
 from bson.objectid import ObjectId
+from pymongo import ReturnDocument
 from db import get_mongo_db, get_connection
+from review_stats import apply_review_delta, empty_stats, has_incremental_stats
+from seat_layout import DEFAULT_TEMPLATE, TEMPLATES, describe_templates, insert_theater_seats
 
 mongo_bp = Blueprint('mongo', __name__)
 
@@ -30,29 +33,37 @@ def serialize_list(cursor):
 # MOVIES
 # ==============================
 
+def ratings_by_movie(mongo_db, movie_ids=None):
+    """
+    Average rating and review count for many movies in one grouped
+    aggregation, keyed by movie ObjectId.
+    """
+    pipeline = []
+    if movie_ids is not None:
+        pipeline.append({"$match": {"movie_id": {"$in": list(movie_ids)}}})
+    pipeline.append({"$group": {
+        "_id": "$movie_id",
+        "avg_rating": {"$avg": "$rating"},
+        "count": {"$sum": 1}
+    }})
+    return {row["_id"]: row for row in mongo_db.reviews.aggregate(pipeline)}
+
 @mongo_bp.route('/api/movies', methods=['GET'])
 def api_get_movies():
     """Get all movies from MongoDB with average ratings"""
     mongo_db = get_mongo_db()
     movies = list(mongo_db.movies.find())
-    
-    # Calculate average ratings from reviews collection
-    for movie in movies:
-        movie_id_str = str(movie["_id"])
-        # Aggregate reviews for this movie
-        pipeline = [
-            {"$match": {"movie_id": movie["_id"]}},
-            {"$group": {
-                "_id": "$movie_id",
-                "avg_rating": {"$avg": "$rating"},
-                "count": {"$sum": 1}
-            }}
-        ]
-        stats = list(mongo_db.reviews.aggregate(pipeline))
+
+    # Movies with incrementally maintained stats are served as stored; any
+    # legacy ones are rated together in a single grouped aggregation
+    legacy = [m for m in movies if not has_incremental_stats(m)]
+    ratings = ratings_by_movie(mongo_db, [m["_id"] for m in legacy]) if legacy else {}
+    for movie in legacy:
+        stats = ratings.get(movie["_id"])
         if stats:
             movie["stats"] = {
-                "average_rating": round(stats[0]["avg_rating"], 1),
-                "total_reviews": stats[0]["count"]
+                "average_rating": round(stats["avg_rating"], 1),
+                "total_reviews": stats["count"]
             }
         else:
             movie["stats"] = {"average_rating": None, "total_reviews": 0}
@@ -76,7 +87,7 @@ def api_create_movie():
         "content_rating": data.get('content_rating', 'PG-13'),
         "cast": data.get('cast', []),
         "media": data.get('media', {}),
-        "stats": data.get('stats', {"average_rating": 0.0, "total_reviews": 0})
+        "stats": empty_stats()
     }
     result = mongo_db.movies.insert_one(movie_doc)
     created = mongo_db.movies.find_one({"_id": result.inserted_id})
@@ -122,6 +133,11 @@ def api_get_theaters():
     theaters = mongo_db.theaters.find()
     return jsonify(serialize_list(theaters)), 200
 
+@mongo_bp.route('/api/mongo/theaters/layouts', methods=['GET'])
+def api_get_seat_layouts():
+    """Seat layout templates a new theater can be created with"""
+    return jsonify(describe_templates()), 200
+
 @mongo_bp.route('/api/mongo/theaters', methods=['POST'])
 def api_create_theater():
     """Create a new Theater (previously Screen)"""
@@ -130,36 +146,25 @@ def api_create_theater():
     if any(field not in data for field in required):
         return jsonify({"error": "Theater name is required"}), 400
 
+    layout = data.get('layout') or DEFAULT_TEMPLATE
+    if layout not in TEMPLATES:
+        return jsonify({"error": f"unknown layout, expected one of: {', '.join(TEMPLATES)}"}), 400
+
     mongo_db = get_mongo_db()
     theater_doc = {
         "branch_name": data['branch_name'],
         "format": data.get('format', 'Standard'),
+        "layout": layout,
         "updated_at": data.get('updated_at') or datetime.datetime.utcnow()
     }
     result = mongo_db.theaters.insert_one(theater_doc)
     theater_id_str = str(result.inserted_id)
 
-    # Automatically generate 112 seats (16x7 grid) in MySQL
-    tiers = [
-        (['A', 'B', 'C'], 16, (200.00, 350.00, 380.00)),  # Front
-        (['D', 'E', 'F'], 16, (250.00, 450.00, 500.00)),  # Middle
-        (['G'], 16, (450.00, 750.00, 800.00))             # Back/Premium
-    ]
-    format_to_idx = {"Standard": 0, "IMAX": 1, "4DX": 2}
-    p_idx = format_to_idx.get(theater_doc["format"], 0)
-
+    # Automatically generate the seats of the layout in MySQL (one multi-row insert)
     conn = get_connection()
     try:
         with conn.cursor() as cursor:
-            for rows, num_seats, prices in tiers:
-                seat_price = prices[p_idx]
-                for row in rows:
-                    for num in range(1, num_seats + 1):
-                        seat_label = f"{row}{num}"
-                        cursor.execute(
-                            "INSERT INTO seats (theater_id, seat, price) VALUES (%s, %s, %s)",
-                            (theater_id_str, seat_label, seat_price)
-                        )
+            insert_theater_seats(cursor, theater_id_str, theater_doc["format"], layout)
         conn.commit()
     except Exception as e:
         if 'conn' in locals() and conn: conn.rollback()
@@ -255,38 +260,27 @@ def api_create_review(movie_id):
     try:
         movie_obj_id = ObjectId(movie_id)
         mysql_user_id = int(data['mysql_user_id'])
+        rating = int(data.get('rating', 5))
+        if rating < 1 or rating > 5:
+            return jsonify({"error": "rating must be between 1 and 5"}), 400
         mongo_db = get_mongo_db()
         
-        # Use upsert to ensure one review per user per movie
-        mongo_db.reviews.update_one(
+        # Use upsert to ensure one review per user per movie; the previous
+        # version (if any) tells us how to adjust the movie stats
+        previous = mongo_db.reviews.find_one_and_update(
             {"movie_id": movie_obj_id, "mysql_user_id": mysql_user_id},
             {"$set": {
-                "rating": int(data.get('rating', 5)),
+                "rating": rating,
                 "comment": data['comment'],
                 "created_at": datetime.datetime.utcnow()
             }},
-            upsert=True
+            projection={"rating": 1},
+            upsert=True,
+            return_document=ReturnDocument.BEFORE
         )
         
-        # Update movie stats for performance
-        pipeline = [
-            {"$match": {"movie_id": movie_obj_id}},
-            {"$group": {
-                "_id": "$movie_id",
-                "avg_rating": {"$avg": "$rating"},
-                "count": {"$sum": 1}
-            }}
-        ]
-        stats = list(mongo_db.reviews.aggregate(pipeline))
-        if stats:
-            avg = stats[0]["avg_rating"]
-            mongo_db.movies.update_one(
-                {"_id": movie_obj_id},
-                {"$set": {
-                    "stats.average_rating": round(avg, 1) if avg is not None else None,
-                    "stats.total_reviews": stats[0]["count"]
-                }}
-            )
+        # Update movie stats incrementally (O(1) regardless of review count)
+        apply_review_delta(mongo_db, movie_obj_id, rating, previous.get("rating") if previous else None)
 
         created = mongo_db.reviews.find_one({"movie_id": movie_obj_id, "mysql_user_id": mysql_user_id})
         return jsonify(serialize_document(created)), 201
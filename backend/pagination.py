@@ -0,0 +1,75 @@
+import base64
+import json
+import os
+from urllib.parse import urlencode
+from flask import request, jsonify
+
+# Keyset (cursor) pagination for listing endpoints.
+#
+# Pages are ordered by a stable, unique sort key (e.g. payment_time plus
+# payment_id as tie breaker). The cursor is an opaque token holding the sort
+# key of the last row of the previous page; the next page is fetched with
+# WHERE key < cursor ORDER BY key LIMIT n, so every page costs the same no
+# matter how deep the client has scrolled.
+#
+# The response body stays a plain JSON array (so existing clients keep
+# working) and the cursor for the next page is sent in the X-Next-Cursor
+# header and a Link: <...>; rel="next" header. No next cursor = last page.
+# Requests without ?limit= get DEFAULT_LIMIT rows; the frontend list views
+# (frontend/src/paging.js) follow X-Next-Cursor with a "Load more" button.
+
+DEFAULT_LIMIT = int(os.getenv("PAGE_DEFAULT_LIMIT", "100"))
+MAX_LIMIT = int(os.getenv("PAGE_MAX_LIMIT", "500"))
+
+
+class BadCursor(ValueError):
+    pass
+
+
+def encode_cursor(values):
+    raw = json.dumps(values, separators=(",", ":"), default=str).encode()
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def decode_cursor(token, size):
+    try:
+        raw = base64.urlsafe_b64decode(token + "=" * (-len(token) % 4))
+        values = json.loads(raw)
+    except Exception:
+        raise BadCursor("invalid cursor")
+    if not isinstance(values, list) or len(values) != size:
+        raise BadCursor("invalid cursor")
+    return values
+
+
+def page_args(key_size):
+    """
+    Read ?limit= and ?cursor= from the request.
+    Returns (limit, cursor_values or None); raises BadCursor on bad input.
+    """
+    try:
+        limit = int(request.args.get("limit", DEFAULT_LIMIT))
+    except ValueError:
+        raise BadCursor("limit must be an integer")
+    limit = max(1, min(limit, MAX_LIMIT))
+    token = request.args.get("cursor")
+    return limit, (decode_cursor(token, key_size) if token else None)
+
+
+def page_response(rows, limit, key):
+    """
+    rows: up to limit + 1 rows fetched in page order.
+    key: function returning the sort key (list) of a row.
+    """
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor(key(rows[-1]))
+    resp = jsonify(rows)
+    if next_cursor:
+        args = request.args.to_dict()
+        args["cursor"] = next_cursor
+        args["limit"] = str(limit)
+        resp.headers["X-Next-Cursor"] = next_cursor
+        resp.headers["Link"] = f'<{request.path}?{urlencode(args)}>; rel="next"'
+    return resp
@@ -0,0 +1,122 @@
+import os
+import re
+import threading
+import traceback
+from flask import Blueprint, request
+from instrument import on_sql, on_mongo
+
+querylog_bp = Blueprint("querylog", __name__)
+
+# N+1 detector and slow-query log (opt-in, for development and canaries).
+#
+# With QUERY_DEBUG=1 every MySQL statement and Mongo command seen by
+# instrument.py is reduced to its shape (literals and IN lists collapsed,
+# Mongo as "<command> <collection>") and counted per request. When one shape
+# runs more than N_PLUS_ONE_THRESHOLD times in a single request a warning is
+# printed at the end of the request with the route, the count and the line
+# of app code that issued it. Independently, any statement slower than
+# SLOW_QUERY_MS is printed with its duration and call site.
+#
+# Nothing is registered when QUERY_DEBUG is off, so production pays nothing.
+
+ENABLED = os.getenv("QUERY_DEBUG", "0") == "1"
+N_PLUS_ONE_THRESHOLD = int(os.getenv("N_PLUS_ONE_THRESHOLD", "5"))
+SLOW_QUERY_MS = float(os.getenv("SLOW_QUERY_MS", "200"))
+
+_BACKEND_DIR = os.path.dirname(os.path.abspath(__file__))
+_SKIP_FILES = {"instrument.py", "querylog.py", "metrics.py", "db.py", "tracing.py"}
+
+_STRING = re.compile(r"'(?:[^'\\]|\\.|'')*'|\"(?:[^\"\\]|\\.)*\"")
+_NUMBER = re.compile(r"\b\d+(?:\.\d+)?\b")
+_IN_LIST = re.compile(r"\bIN\s*\(\s*(?:\?|%s)(?:\s*,\s*(?:\?|%s))*\s*\)", re.IGNORECASE)
+_VALUES_LIST = re.compile(r"\bVALUES\s*(\([^()]*\))(?:\s*,\s*\([^()]*\))+", re.IGNORECASE)
+_SPACE = re.compile(r"\s+")
+
+
+def sql_shape(query):
+    """Normalize a SQL statement so repeats with different values compare equal."""
+    shape = _STRING.sub("?", query)
+    shape = _NUMBER.sub("?", shape)
+    shape = _SPACE.sub(" ", shape).strip()
+    shape = _IN_LIST.sub("IN (...)", shape)
+    shape = _VALUES_LIST.sub(r"VALUES \1, ...", shape)
+    return shape
+
+
+def call_site():
+    """file:line of the innermost frame in app code (not db/instrumentation/libraries)."""
+    for frame in reversed(traceback.extract_stack()[:-1]):
+        path = os.path.abspath(frame.filename)
+        if os.path.dirname(path) == _BACKEND_DIR and os.path.basename(path) not in _SKIP_FILES:
+            return f"{os.path.basename(path)}:{frame.lineno} in {frame.name}"
+    return "unknown"
+
+
+class QueryLog:
+    def __init__(self, threshold=N_PLUS_ONE_THRESHOLD, slow_ms=SLOW_QUERY_MS, out=print):
+        self.threshold = threshold
+        self.slow_ms = slow_ms
+        self.out = out
+        self._local = threading.local()
+
+    def begin(self):
+        # shape -> [count, total seconds, call site of the first repeat past the threshold]
+        self._local.shapes = {}
+
+    def observe(self, store, shape, seconds):
+        if seconds * 1000 >= self.slow_ms:
+            self.out(f"[slow-query] {store} {seconds * 1000:.1f} ms at {call_site()}{self._where()}: {shape}")
+        shapes = getattr(self._local, "shapes", None)
+        if shapes is None:
+            return
+        entry = shapes.get((store, shape))
+        if entry is None:
+            shapes[(store, shape)] = [1, seconds, None]
+            return
+        entry[0] += 1
+        entry[1] += seconds
+        if entry[0] == self.threshold + 1:
+            entry[2] = call_site()
+
+    def end(self):
+        """Report repeated shapes of the finished request; returns them for tests."""
+        shapes = getattr(self._local, "shapes", None)
+        self._local.shapes = None
+        if not shapes:
+            return []
+        repeated = [
+            (store, shape, count, seconds, site)
+            for (store, shape), (count, seconds, site) in shapes.items()
+            if count > self.threshold
+        ]
+        for store, shape, count, seconds, site in sorted(repeated, key=lambda r: -r[2]):
+            self.out(f"[n+1] {store} statement ran {count}x ({seconds * 1000:.1f} ms total) "
+                     f"in one request at {site}{self._where()}: {shape}")
+        return repeated
+
+    def _where(self):
+        try:
+            return f" ({request.method} {request.path})"
+        except RuntimeError:
+            return ""
+
+
+querylog = QueryLog()
+
+
+if ENABLED:
+    @on_sql
+    def _log_sql(query, seconds, rowcount, error):
+        querylog.observe("mysql", sql_shape(query), seconds)
+
+    @on_mongo
+    def _log_mongo(command_name, collection, seconds, error, docs):
+        querylog.observe("mongo", f"{command_name} {collection or ''}".strip(), seconds)
+
+    @querylog_bp.before_app_request
+    def _begin_request():
+        querylog.begin()
+
+    @querylog_bp.teardown_app_request
+    def _end_request(exc):
+        querylog.end()
@@ -0,0 +1,109 @@
+from pymongo import UpdateOne
+from db import get_mongo_db
+
+# Review statistics are stored on the movie document:
+#   stats.total_reviews, stats.rating_sum, stats.average_rating and
+#   stats.histogram ({"1": n, ..., "5": n})
+# and kept up to date incrementally on every review write, so a write costs the
+# same no matter how many reviews the movie already has.
+
+RATINGS = range(1, 6)
+
+
+def empty_stats():
+    return {
+        "average_rating": None,
+        "total_reviews": 0,
+        "rating_sum": 0,
+        "histogram": {str(r): 0 for r in RATINGS},
+    }
+
+
+def _average(rating_sum, count):
+    return round(rating_sum / count, 1) if count else None
+
+
+def has_incremental_stats(movie):
+    stats = (movie or {}).get("stats") or {}
+    return "rating_sum" in stats and "histogram" in stats
+
+
+def apply_review_delta(mongo_db, movie_obj_id, new_rating, old_rating=None):
+    """
+    Adjust a movie's stats for one upserted review.
+    old_rating is None when the review is new, otherwise the rating it replaced.
+    The counters and the average are written in one pipeline update, so
+    concurrent reviews of the same movie can't leave a stale average behind.
+    """
+    inc = {f"stats.histogram.{new_rating}": 1, "stats.rating_sum": new_rating}
+    if old_rating is None:
+        inc["stats.total_reviews"] = 1
+    elif old_rating == new_rating:
+        return
+    else:
+        inc[f"stats.histogram.{old_rating}"] = -1
+        inc["stats.rating_sum"] = new_rating - old_rating
+
+    result = mongo_db.movies.update_one(
+        {"_id": movie_obj_id, "stats.rating_sum": {"$exists": True}},
+        [
+            {"$set": {
+                field: {"$add": [{"$ifNull": [f"${field}", 0]}, delta]}
+                for field, delta in inc.items()
+            }},
+            {"$set": {"stats.average_rating": {"$cond": [
+                {"$gt": ["$stats.total_reviews", 0]},
+                {"$round": [{"$divide": ["$stats.rating_sum", "$stats.total_reviews"]}, 1]},
+                None,
+            ]}}},
+        ],
+    )
+    if result.matched_count == 0:
+        # movie predates incremental stats (or is gone): seed it from scratch once
+        rebuild_review_stats(mongo_db, [movie_obj_id])
+
+
+def rebuild_review_stats(mongo_db, movie_ids=None):
+    """
+    Recompute stats from the reviews collection in bulk (one aggregation and
+    one bulk write). Pass movie_ids to limit the repair to some movies.
+    Returns the number of movies updated.
+    """
+    pipeline = []
+    if movie_ids is not None:
+        pipeline.append({"$match": {"movie_id": {"$in": list(movie_ids)}}})
+    pipeline.append({"$group": {
+        "_id": {"movie_id": "$movie_id", "rating": "$rating"},
+        "count": {"$sum": 1},
+    }})
+
+    per_movie = {}
+    for row in mongo_db.reviews.aggregate(pipeline):
+        movie_id = row["_id"]["movie_id"]
+        rating = row["_id"]["rating"]
+        stats = per_movie.setdefault(movie_id, empty_stats())
+        stats["total_reviews"] += row["count"]
+        stats["rating_sum"] += rating * row["count"]
+        key = str(rating)
+        if key in stats["histogram"]:
+            stats["histogram"][key] += row["count"]
+
+    if movie_ids is None:
+        targets = [m["_id"] for m in mongo_db.movies.find({}, {"_id": 1})]
+    else:
+        targets = list(movie_ids)
+
+    ops = []
+    for movie_id in targets:
+        stats = per_movie.get(movie_id) or empty_stats()
+        stats["average_rating"] = _average(stats["rating_sum"], stats["total_reviews"])
+        ops.append(UpdateOne({"_id": movie_id}, {"$set": {"stats": stats}}))
+
+    if not ops:
+        return 0
+    return mongo_db.movies.bulk_write(ops, ordered=False).matched_count
+
+
+if __name__ == "__main__":
+    count = rebuild_review_stats(get_mongo_db())
+    print(f"Review stats rebuilt for {count} movies.")
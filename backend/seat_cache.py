@@ -0,0 +1,139 @@
+import os
+import threading
+import time
+from collections import OrderedDict
+
+# In-process cache of seat maps.
+#
+# A seat map has two parts:
+#   - the layout (seat_id, seat label, price), which depends only on the
+#     theater and never changes; it is cached once per theater, and each
+#     showtime only remembers which theater it plays in
+#   - the status overlay ({seat_id: 'pending'|'booked'}), per showtime, which
+#     booking.py invalidates whenever it holds, confirms, cancels or refunds
+#     seats
+#
+# The overlay also expires after SEAT_CACHE_TTL seconds so that, when the
+# app runs in several worker processes, a write handled by another worker
+# is picked up quickly. Booking itself always re-checks seats with
+# SELECT ... FOR UPDATE, so a stale overlay can never cause a double booking.
+#
+# Showtime-keyed entries are kept for the SEAT_CACHE_MAX_SHOWTIMES most
+# recently used showtimes, so memory does not grow with the schedule history.
+
+
+class SeatMapCache:
+    def __init__(self, status_ttl=2.0, max_showtimes=10000):
+        self.status_ttl = status_ttl
+        self.max_showtimes = max_showtimes
+        self._lock = threading.Lock()
+        self._layouts = {}  # theater_id -> [seat rows]
+        self._theaters = OrderedDict()  # showtime_id -> theater_id (LRU)
+        self._status = OrderedDict()  # showtime_id -> (loaded_at, {seat_id: status}) (LRU)
+        self._loading = {}  # showtime_id -> [status loads in flight, invalidation counter]
+        self.hits = 0
+        self.misses = 0
+
+    def _remember(self, entries, key, value):
+        entries[key] = value
+        entries.move_to_end(key)
+        while len(entries) > self.max_showtimes:
+            entries.popitem(last=False)
+
+    def layout(self, showtime_id, theater_loader, layout_loader):
+        """
+        Seat layout of a showtime's theater.
+        theater_loader(showtime_id) -> theater_id or None (unknown showtime);
+        layout_loader(theater_id) -> seat rows.
+        """
+        key = str(showtime_id)
+        with self._lock:
+            theater_id = self._theaters.get(key)
+            if theater_id is not None:
+                self._theaters.move_to_end(key)
+                layout = self._layouts.get(theater_id)
+                if layout is not None:
+                    self.hits += 1
+                    return layout
+            self.misses += 1
+        if theater_id is None:
+            theater_id = theater_loader(showtime_id)
+            if theater_id is None:
+                return []
+            theater_id = str(theater_id)
+            with self._lock:
+                self._remember(self._theaters, key, theater_id)
+                layout = self._layouts.get(theater_id)
+            if layout is not None:
+                return layout
+        layout = layout_loader(theater_id)
+        # a theater without seats may still be being set up; don't pin that
+        if layout:
+            with self._lock:
+                self._layouts[theater_id] = layout
+        return layout
+
+    def status(self, showtime_id, loader):
+        key = str(showtime_id)
+        now = time.monotonic()
+        with self._lock:
+            entry = self._status.get(key)
+            if entry is not None and now - entry[0] < self.status_ttl:
+                self._status.move_to_end(key)
+                self.hits += 1
+                return entry[1]
+            self.misses += 1
+            loading = self._loading.setdefault(key, [0, 0])
+            loading[0] += 1
+            version = loading[1]
+        try:
+            status = loader(showtime_id)
+        except Exception:
+            with self._lock:
+                self._done_loading(key)
+            raise
+        with self._lock:
+            # skip the store if a booking invalidated this showtime meanwhile
+            if self._loading[key][1] == version:
+                self._remember(self._status, key, (now, status))
+            self._done_loading(key)
+        return status
+
+    def _done_loading(self, key):
+        loading = self._loading[key]
+        loading[0] -= 1
+        if loading[0] == 0:
+            del self._loading[key]
+
+    def invalidate(self, *showtime_ids):
+        with self._lock:
+            for showtime_id in showtime_ids:
+                key = str(showtime_id)
+                self._status.pop(key, None)
+                # only loads already running need to know about it
+                loading = self._loading.get(key)
+                if loading is not None:
+                    loading[1] += 1
+
+    def clear(self):
+        with self._lock:
+            self._layouts.clear()
+            self._theaters.clear()
+            self._status.clear()
+
+    def stats(self):
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "layouts": len(self._layouts),
+                "showtimes": len(self._theaters),
+                "status_entries": len(self._status),
+                "status_ttl": self.status_ttl,
+            }
+
+
+seat_cache = SeatMapCache(
+    status_ttl=float(os.getenv("SEAT_CACHE_TTL", "2")),
+    max_showtimes=int(os.getenv("SEAT_CACHE_MAX_SHOWTIMES", "10000")),
+)
@@ -0,0 +1,165 @@
+import os
+import threading
+import uuid
+from collections import deque
+from seat_cache import seat_cache
+
+# Seat status change feed used by the /api/seats/stream SSE endpoint.
+#
+# Every showtime that has at least one listener gets a channel holding the
+# last known status of its seats and a bounded buffer of delta events.
+# booking.py calls seat_changed() after committing a hold/confirm/cancel/
+# refund; the next listener to wake up reloads the status overlay (one query
+# per change, shared by all listeners of the showtime), diffs it against the
+# channel state and appends a single delta event. Listeners also re-sync on
+# every heartbeat, so changes made by other worker processes are picked up
+# within one heartbeat (plus SEAT_CACHE_TTL).
+#
+# Event ids are "<process epoch>-<seq>". A client resuming with an id from
+# this process that is still in the buffer gets the missed deltas replayed;
+# anything else gets a fresh snapshot.
+
+FREE = "free"
+
+
+class _Channel:
+    def __init__(self, loader):
+        self.loader = loader
+        self.state = None  # {seat_id: 'pending'|'booked'}
+        self.events = deque(maxlen=int(os.getenv("SEAT_EVENTS_BUFFER", "256")))
+        self.seq = 0
+        self.listeners = 0
+        self.dirty = False
+        self.syncing = False
+
+
+class SeatEventHub:
+    def __init__(self):
+        self.epoch = uuid.uuid4().hex[:8]
+        self._cond = threading.Condition()
+        self._channels = {}
+
+    def event_id(self, seq):
+        return f"{self.epoch}-{seq}"
+
+    def parse_event_id(self, value):
+        """Return the seq of an event id issued by this process, else None."""
+        if not value:
+            return None
+        epoch, _, seq = value.partition("-")
+        if epoch != self.epoch or not seq.isdigit():
+            return None
+        return int(seq)
+
+    def subscribe(self, showtime_id, loader):
+        key = str(showtime_id)
+        with self._cond:
+            ch = self._channels.get(key)
+            if ch is None:
+                ch = self._channels[key] = _Channel(loader)
+            ch.listeners += 1
+        try:
+            self._wait_for_state(key)
+        except Exception:
+            self.unsubscribe(key)
+            raise
+        return key
+
+    def _wait_for_state(self, key):
+        # the first listener loads the state; others arriving meanwhile wait
+        # for that load instead of snapshotting an empty channel
+        while True:
+            with self._cond:
+                ch = self._channels[key]
+                self._cond.wait_for(lambda: ch.state is not None or not ch.syncing)
+                if ch.state is not None:
+                    return
+            self.sync(key)
+
+    def unsubscribe(self, key):
+        with self._cond:
+            ch = self._channels.get(key)
+            if ch is None:
+                return
+            ch.listeners -= 1
+            if ch.listeners <= 0:
+                del self._channels[key]
+
+    def changed(self, *showtime_ids):
+        seat_cache.invalidate(*showtime_ids)
+        with self._cond:
+            woke = False
+            for showtime_id in showtime_ids:
+                ch = self._channels.get(str(showtime_id))
+                if ch is not None:
+                    ch.dirty = True
+                    woke = True
+            if woke:
+                self._cond.notify_all()
+
+    def sync(self, key):
+        """Reload the status overlay and record what changed as one event."""
+        with self._cond:
+            ch = self._channels.get(key)
+            if ch is None or ch.syncing:
+                return
+            ch.syncing = True
+            ch.dirty = False
+        try:
+            status = dict(seat_cache.status(key, ch.loader))
+        except Exception:
+            with self._cond:
+                ch.syncing = False
+            raise
+
+        with self._cond:
+            ch.syncing = False
+            if ch.state is not None:
+                delta = [[seat_id, st] for seat_id, st in status.items() if ch.state.get(seat_id) != st]
+                delta += [[seat_id, FREE] for seat_id in ch.state if seat_id not in status]
+                if delta:
+                    ch.seq += 1
+                    ch.events.append((ch.seq, delta))
+            ch.state = status
+            self._cond.notify_all()
+
+    def snapshot(self, key):
+        with self._cond:
+            ch = self._channels[key]
+            return ch.seq, dict(ch.state or {})
+
+    def replay(self, key, after):
+        """Events newer than `after`, or None if they are no longer buffered."""
+        with self._cond:
+            ch = self._channels[key]
+            if after > ch.seq:
+                return None
+            if after == ch.seq:
+                return []
+            if not ch.events or ch.events[0][0] > after + 1:
+                return None
+            return [(seq, delta) for seq, delta in ch.events if seq > after]
+
+    def wait(self, key, after, timeout):
+        """
+        Block until there are events newer than `after` or the timeout
+        expires. Returns the new events (possibly empty), or None when the
+        client fell too far behind and needs a snapshot.
+        """
+        with self._cond:
+            ch = self._channels[key]
+            ready = lambda: ch.seq > after or (ch.dirty and not ch.syncing)
+            if not ready():
+                self._cond.wait_for(ready, timeout)
+            needs_sync = ch.dirty and not ch.syncing
+        if needs_sync:
+            self.sync(key)
+        return self.replay(key, after)
+
+
+seat_events = SeatEventHub()
+
+
+def seat_changed(*showtime_ids):
+    """Called by booking.py after committing a change to seat holds."""
+    seat_events.changed(*showtime_ids)
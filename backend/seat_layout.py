@@ -0,0 +1,92 @@
+import os
+
+# Seat layouts for theaters.
+#
+# A template is a list of tiers; each tier names its rows, the number of
+# seats per row and the seat price for every theater format. Materializing
+# a theater writes all of its seats with one multi-row INSERT (or a few,
+# --batch-size rows each, when many theaters are created at once) instead
+# of one statement per seat.
+#
+# "standard" is the original 7 x 16 grid (112 seats) every theater had.
+
+DEFAULT_TEMPLATE = os.getenv("SEAT_LAYOUT_DEFAULT", "standard")
+DEFAULT_FORMAT = "Standard"
+INSERT_BATCH_SIZE = 5000
+
+TEMPLATES = {
+    "standard": [
+        # rows,            seats/row, price per format
+        (["A", "B", "C"], 16, {"Standard": 200.00, "IMAX": 350.00, "4DX": 380.00}),  # Front
+        (["D", "E", "F"], 16, {"Standard": 250.00, "IMAX": 450.00, "4DX": 500.00}),  # Middle
+        (["G"], 16, {"Standard": 450.00, "IMAX": 750.00, "4DX": 800.00}),            # Back/Premium
+    ],
+    "compact": [
+        (["A", "B"], 10, {"Standard": 180.00, "IMAX": 320.00, "4DX": 350.00}),
+        (["C", "D", "E"], 12, {"Standard": 220.00, "IMAX": 400.00, "4DX": 450.00}),
+    ],
+    "grand": [
+        (["A", "B", "C", "D"], 24, {"Standard": 200.00, "IMAX": 350.00, "4DX": 380.00}),
+        (["E", "F", "G", "H", "J"], 24, {"Standard": 250.00, "IMAX": 450.00, "4DX": 500.00}),
+        (["K", "L"], 20, {"Standard": 450.00, "IMAX": 750.00, "4DX": 800.00}),
+    ],
+}
+
+
+class UnknownTemplate(ValueError):
+    pass
+
+
+def seat_rows(template=DEFAULT_TEMPLATE, theater_format=DEFAULT_FORMAT):
+    """[(row, seat label, price)] in seat order for a template and theater format."""
+    tiers = TEMPLATES.get(template)
+    if tiers is None:
+        raise UnknownTemplate(f"unknown seat layout: {template}")
+    layout = []
+    for rows, num_seats, prices in tiers:
+        price = prices.get(theater_format, prices[DEFAULT_FORMAT])
+        for row in rows:
+            for num in range(1, num_seats + 1):
+                layout.append((row, f"{row}{num}", price))
+    return layout
+
+
+def describe_templates():
+    """Summary of every template, for the admin UI."""
+    out = []
+    for name, tiers in TEMPLATES.items():
+        out.append({
+            "name": name,
+            "seats": sum(len(rows) * num_seats for rows, num_seats, _ in tiers),
+            "tiers": [
+                {"rows": rows, "seats_per_row": num_seats, "prices": prices}
+                for rows, num_seats, prices in tiers
+            ],
+        })
+    return out
+
+
+def insert_seats(cursor, theaters, batch_size=INSERT_BATCH_SIZE):
+    """
+    Create the seats of several theaters.
+    theaters: iterable of (theater_id, format, template).
+    Returns the number of seats inserted.
+    """
+    values = [
+        (str(theater_id), label, price)
+        for theater_id, theater_format, template in theaters
+        for _, label, price in seat_rows(template or DEFAULT_TEMPLATE, theater_format or DEFAULT_FORMAT)
+    ]
+    for start in range(0, len(values), batch_size):
+        batch = values[start:start + batch_size]
+        cursor.execute(
+            "INSERT INTO seats (theater_id, seat, price) VALUES "
+            + ','.join(['(%s, %s, %s)'] * len(batch)),
+            [v for row in batch for v in row]
+        )
+    return len(values)
+
+
+def insert_theater_seats(cursor, theater_id, theater_format=DEFAULT_FORMAT, template=DEFAULT_TEMPLATE):
+    """Create one theater's seats with a single multi-row INSERT."""
+    return insert_seats(cursor, [(theater_id, theater_format, template)])
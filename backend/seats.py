@@ -1,37 +1,75 @@
-from flask import Blueprint, request, jsonify
+import base64
+import json
+import os
+import zlib
+from flask import Blueprint, request, jsonify, Response
 from db import get_connection
+from seat_cache import seat_cache
+from seat_events import seat_events
+from streams import stream_slots, streams_busy
 
 seats_bp = Blueprint("seats", __name__)
 
-@seats_bp.route("/api/seats")
-def get_seats():
-    showtime_id = request.args.get("showtime_id")
 
+def load_showtime_theater(showtime_id):
+    conn = get_connection()
+    try:
+        with conn.cursor() as cursor:
+            cursor.execute("SELECT theater_id FROM showtimes WHERE showtime_id = %s", (showtime_id,))
+            row = cursor.fetchone()
+            return row["theater_id"] if row else None
+    finally:
+        conn.close()
+
+
+def load_theater_layout(theater_id):
+    conn = get_connection()
     try:
-        conn = get_connection()
         with conn.cursor() as cursor:
-            # Get only the seats belonging to the theater used in this showtime
             cursor.execute("""
-                SELECT s.seat_id, s.seat, s.price 
-                FROM seats s
-                JOIN showtimes st ON s.theater_id = st.theater_id
-                WHERE st.showtime_id = %s
-            """, (showtime_id,))
-            seats = cursor.fetchall()
+                SELECT seat_id, seat, price
+                FROM seats
+                WHERE theater_id = %s
+                ORDER BY seat_id
+            """, (theater_id,))
+            return cursor.fetchall()
+    finally:
+        conn.close()
+
+
+def seat_layout(showtime_id):
+    """Seats of the theater a showtime plays in (cached per theater)."""
+    return seat_cache.layout(showtime_id, load_showtime_theater, load_theater_layout)
 
+
+def load_seat_status(showtime_id):
+    conn = get_connection()
+    try:
+        with conn.cursor() as cursor:
             # reservations (pending/booked)
             cursor.execute("""
                 SELECT seat_id, status
                 FROM book_seat
                 WHERE showtime_id = %s
             """, (showtime_id,))
-            reserved = {row["seat_id"]: row["status"] for row in cursor.fetchall()}
+            return {row["seat_id"]: row["status"] for row in cursor.fetchall()}
+    finally:
+        conn.close()
+
+
+@seats_bp.route("/api/seats")
+def get_seats():
+    showtime_id = request.args.get("showtime_id")
+
+    try:
+        layout = seat_layout(showtime_id)
+        reserved = seat_cache.status(showtime_id, load_seat_status)
     except Exception as e:
         return jsonify({"error": f"Database error: {str(e)}"}), 500
-    finally:
-        if 'conn' in locals(): conn.close()
 
-    for seat in seats:
+    seats = []
+    for seat in layout:
+        seat = dict(seat)
         st = reserved.get(seat["seat_id"])
         if st == "booked":
             seat["status"] = "booked"
@@ -42,5 +80,161 @@ def get_seats():
         else:
             seat["status"] = "free"
             seat["available"] = True
+        seats.append(seat)
 
     return jsonify(seats)
+
+
+# ---------- compact representation ----------
+# Seats of a showtime are numbered by their ordinal in the layout (ordered by
+# seat_id). Status is sent as two bitsets, pending and booked, where bit i
+# (LSB first within each byte) describes seat ordinal i. The layout itself
+# rarely changes and is served separately with an ETag so clients fetch it once.
+
+def layout_version(layout):
+    return format(zlib.crc32(",".join(str(s["seat_id"]) for s in layout).encode()), "08x")
+
+
+def pack_status(layout, reserved):
+    size = (len(layout) + 7) // 8
+    pending = bytearray(size)
+    booked = bytearray(size)
+    for i, seat in enumerate(layout):
+        st = reserved.get(seat["seat_id"])
+        if st == "booked":
+            booked[i >> 3] |= 1 << (i & 7)
+        elif st == "pending":
+            pending[i >> 3] |= 1 << (i & 7)
+    return bytes(pending), bytes(booked)
+
+
+@seats_bp.route("/api/seats/layout")
+def get_seat_layout():
+    showtime_id = request.args.get("showtime_id", type=int)
+    if showtime_id is None:
+        return jsonify({"error": "showtime_id required"}), 400
+    try:
+        layout = seat_layout(showtime_id)
+    except Exception as e:
+        return jsonify({"error": f"Database error: {str(e)}"}), 500
+    if not layout:
+        return jsonify({"error": "showtime not found"}), 404
+
+    version = layout_version(layout)
+    if request.if_none_match.contains(version):
+        return Response(status=304, headers={"ETag": f'"{version}"'})
+
+    resp = jsonify({
+        "showtime_id": showtime_id,
+        "version": version,
+        "count": len(layout),
+        "seats": [[s["seat_id"], s["seat"], float(s["price"])] for s in layout],
+    })
+    resp.headers["ETag"] = f'"{version}"'
+    resp.headers["Cache-Control"] = "public, max-age=3600"
+    return resp
+
+
+@seats_bp.route("/api/seats/bitmap")
+def get_seat_bitmap():
+    """
+    Packed seat status for a showtime.
+    ?format=raw returns application/octet-stream: pending bytes followed by
+    booked bytes; otherwise JSON with base64 encoded bitsets.
+    """
+    showtime_id = request.args.get("showtime_id", type=int)
+    if showtime_id is None:
+        return jsonify({"error": "showtime_id required"}), 400
+    try:
+        layout = seat_layout(showtime_id)
+        reserved = seat_cache.status(showtime_id, load_seat_status)
+    except Exception as e:
+        return jsonify({"error": f"Database error: {str(e)}"}), 500
+    if not layout:
+        return jsonify({"error": "showtime not found"}), 404
+
+    pending, booked = pack_status(layout, reserved)
+    version = layout_version(layout)
+    if request.args.get("format") == "raw":
+        return Response(pending + booked, mimetype="application/octet-stream", headers={
+            "X-Seat-Count": str(len(layout)),
+            "X-Layout-Version": version,
+            "Cache-Control": "no-cache",
+        })
+
+    return jsonify({
+        "showtime_id": showtime_id,
+        "version": version,
+        "count": len(layout),
+        "pending": base64.b64encode(pending).decode("ascii"),
+        "booked": base64.b64encode(booked).decode("ascii"),
+    })
+
+
+# ---------- live updates ----------
+
+def _sse(event, data, event_id=None):
+    msg = f"event: {event}\n"
+    if event_id is not None:
+        msg += f"id: {event_id}\n"
+    return msg + f"data: {json.dumps(data, separators=(',', ':'))}\n\n"
+
+
+@seats_bp.route("/api/seats/stream")
+def stream_seats():
+    """
+    Server-Sent Events feed of seat status changes for one showtime.
+    First message is a `snapshot` ({seat_id: status} for held/booked seats),
+    followed by `delta` messages ([[seat_id, 'pending'|'booked'|'free'], ...]).
+    Reconnecting clients send Last-Event-ID to get only what they missed.
+    """
+    showtime_id = request.args.get("showtime_id", type=int)
+    if showtime_id is None:
+        return jsonify({"error": "showtime_id required"}), 400
+    heartbeat = float(os.getenv("SEAT_STREAM_HEARTBEAT", "15"))
+    last_id = request.headers.get("Last-Event-ID") or request.args.get("last_event_id")
+
+    # each open stream holds a server thread; see streams.py
+    if not stream_slots.acquire():
+        return streams_busy()
+    try:
+        key = seat_events.subscribe(showtime_id, load_seat_status)
+    except Exception as e:
+        stream_slots.release()
+        return jsonify({"error": f"Database error: {str(e)}"}), 500
+
+    def generate():
+        after = seat_events.parse_event_id(last_id)
+        backlog = seat_events.replay(key, after) if after is not None else None
+        yield f"retry: {int(heartbeat * 1000)}\n\n"
+        while True:
+            if backlog is None:
+                after, state = seat_events.snapshot(key)
+                yield _sse("snapshot", state, seat_events.event_id(after))
+            else:
+                for seq, delta in backlog:
+                    yield _sse("delta", delta, seat_events.event_id(seq))
+                    after = seq
+            backlog = seat_events.wait(key, after, heartbeat)
+            if backlog == []:
+                # nothing happened locally; catch writes made by other workers
+                seat_events.sync(key)
+                backlog = seat_events.replay(key, after)
+                if backlog == []:
+                    yield ": heartbeat\n\n"
+
+    resp = Response(generate(), mimetype="text/event-stream", headers={
+        "Cache-Control": "no-cache",
+        "X-Accel-Buffering": "no",
+    })
+    def close():
+        seat_events.unsubscribe(key)
+        stream_slots.release()
+
+    resp.call_on_close(close)
+    return resp
+
+
+@seats_bp.route("/api/admin/seats/cache", methods=["GET"])
+def seat_cache_stats():
+    return jsonify(seat_cache.stats())
@@ -1,7 +1,12 @@
+import argparse
 import datetime
 import os
+import random
 import pymysql
-from pymongo import MongoClient
+from config import load_env
+from db import get_mongo_db
+from review_stats import empty_stats, rebuild_review_stats
+from seat_layout import DEFAULT_TEMPLATE, insert_seats, seat_rows
 
 def get_mysql_connection():
     return pymysql.connect(
@@ -13,25 +18,9 @@ def get_mysql_connection():
         autocommit=False
     )
 
-def get_mongo_db():
-    mongo_uri = os.getenv("MONGO_URI", "mongodb://localhost:27017/cinema_db")
-    client = MongoClient(mongo_uri)
-    return client.get_database()
-                    
+
 import time
 
-def load_env():
-    # Only load .env if we are not running in a container (where DB_HOST is already set to something else)
-    if os.getenv("DB_HOST") in ["mysql_db", "cinema_mysql"]:
-        return
-        
-    env_path = os.path.join(os.path.dirname(__file__), '.env')
-    if os.path.exists(env_path):
-        with open(env_path, 'r') as f:
-            for line in f:
-                if '=' in line:
-                    key, value = line.strip().split('=', 1)
-                    os.environ[key] = value
 
 def seed_database():
     load_env()
@@ -90,7 +79,7 @@ def seed_database():
             "content_rating": "PG-13",
             "cast": [{"name": "Timothee Chalamet"}],
             "media": {"poster_url": "https://upload.wikimedia.org/wikipedia/en/5/52/Dune_Part_Two_poster.jpeg"},
-            "stats": {"average_rating": None, "total_reviews": 0}
+            "stats": empty_stats()
         },
         {
             "title": "Oppenheimer",
@@ -100,7 +89,7 @@ def seed_database():
             "content_rating": "R",
             "cast": [{"name": "Cillian Murphy"}],
             "media": {"poster_url": "https://upload.wikimedia.org/wikipedia/en/4/4a/Oppenheimer_%28film%29.jpg"},
-            "stats": {"average_rating": None, "total_reviews": 0}
+            "stats": empty_stats()
         },
 # 1. Barbie
         {
@@ -111,7 +100,7 @@ def seed_database():
             "content_rating": "PG-13",
             "cast": [{"name": "Margot Robbie"}, {"name": "Ryan Gosling"}],
             "media": {"poster_url": "https://upload.wikimedia.org/wikipedia/en/0/0b/Barbie_2023_poster.jpg"},
-            "stats": {"average_rating": None, "total_reviews": 0}
+            "stats": empty_stats()
         },
     # 2. The Dark Knight (แทน Dune)
         {
@@ -122,7 +111,7 @@ def seed_database():
             "content_rating": "PG-13",
             "cast": [{"name": "Christian Bale"}, {"name": "Heath Ledger"}],
             "media": {"poster_url": "https://upload.wikimedia.org/wikipedia/en/1/1c/The_Dark_Knight_%282008_film%29.jpg"},
-            "stats": {"average_rating": None, "total_reviews": 0}
+            "stats": empty_stats()
         },
     # 3. Spider-Man: Across the Spider-Verse
         {
@@ -133,7 +122,7 @@ def seed_database():
             "content_rating": "PG",
             "cast": [{"name": "Shameik Moore"}, {"name": "Hailee Steinfeld"}],
             "media": {"poster_url": "https://upload.wikimedia.org/wikipedia/en/b/b4/Spider-Man-_Across_the_Spider-Verse_poster.jpg"},
-            "stats": {"average_rating": None, "total_reviews": 0}
+            "stats": empty_stats()
         }
     ]
 
@@ -212,10 +201,12 @@ def seed_database():
                 # Avoid duplicating if already seeded
                 cursor.execute("SELECT COUNT(*) as count FROM showtimes WHERE movie_id = %s", (m_id,))
                 if cursor.fetchone()['count'] == 0:
+                    duration = next((m["duration_minutes"] for m in movies_data if m["title"] == movie_title), None) or 120
                     for st_time, th_id in times:
                         cursor.execute(
-                            "INSERT INTO showtimes (movie_id, theater_id, showtime) VALUES (%s, %s, %s)",
-                            (m_id, th_id, st_time)
+                            "INSERT INTO showtimes (movie_id, theater_id, showtime, end_time) "
+                            "VALUES (%s, %s, %s, %s + INTERVAL %s MINUTE)",
+                            (m_id, th_id, st_time, st_time, duration)
                         )
             
         # 4. Insert Default Seats for Theaters
@@ -226,40 +217,282 @@ def seed_database():
         cursor.execute("TRUNCATE TABLE seats")
         cursor.execute("SET FOREIGN_KEY_CHECKS = 1")
         
-        # Define Tiers: row_prefix (list), num_seats, (standard_price, imax_price, 4dx_price)
-        # Note: Index 0=Standard, 1=IMAX, 2=4DX
-        tiers = [
-            (['A', 'B', 'C'], 16, (200.00, 350.00, 380.00)),  # Front
-            (['D', 'E', 'F'], 16, (250.00, 450.00, 500.00)),  # Middle
-            (['G'], 16, (450.00, 750.00, 800.00))             # Back/Premium
-        ]
-        
-        # Mapping theater IDs to their price index (0=Standard, 1=IMAX, 2=4DX)
+        # Theater formats decide the seat prices (see seat_layout.py)
         theater_list = [
-            (theater_1_id, "IMAX"),
-            (theater_2_id, "4DX"),
-            (theater_3_id, "Standard")
+            (theater_1_id, "IMAX", DEFAULT_TEMPLATE),
+            (theater_2_id, "4DX", DEFAULT_TEMPLATE),
+            (theater_3_id, "Standard", DEFAULT_TEMPLATE)
         ]
-        
-        format_to_idx = {"Standard": 0, "IMAX": 1, "4DX": 2}
-
-        for tid, t_format in theater_list:
-            price_idx = format_to_idx.get(t_format, 0)
-            for rows, num_seats, p_set in tiers:
-                seat_price = p_set[price_idx]
-                for row in rows:
-                    for num in range(1, num_seats + 1):
-                        seat_label = f"{row}{num}"
-                        cursor.execute(
-                            "INSERT INTO seats (theater_id, seat, price) VALUES (%s, %s, %s)",
-                            (tid, seat_label, seat_price)
-                        )
-        
+        insert_seats(cursor, theater_list)
+
         mysql_conn.commit()
 
     mysql_conn.close()
 
     print("Data seeding completed successfully!")
 
+
+# ================= SYNTHETIC DATA GENERATOR =================
+#
+# `python seed.py --generate ...` fills the databases with a synthetic data
+# set of any size for benchmarking the real query paths. Everything random
+# comes from one random.Random(--seed), so the same flags (including
+# --start) always produce the same rows. MySQL rows are written with
+# executemany, which pymysql turns into multi-row INSERTs, and Mongo
+# documents with insert_many, --batch-size rows per round trip and one
+# commit per batch. MySQL primary keys are assigned here (continuing after
+# the current maximum) so no ids have to be read back; run it against a
+# database nobody else is writing to.
+
+GEN_FORMATS = ["Standard", "Standard", "IMAX", "4DX"]
+GEN_LAYOUTS = [DEFAULT_TEMPLATE, DEFAULT_TEMPLATE, "compact", "grand"]
+GEN_GENRES = ["Action", "Adventure", "Animation", "Comedy", "Crime", "Drama",
+              "Fantasy", "Horror", "Romance", "Sci-Fi", "Thriller"]
+GEN_RATINGS = ["G", "PG", "PG-13", "R"]
+GEN_COMMENTS = ["Loved it", "Not bad", "Too long", "Great visuals",
+                "Would watch again", "Meh", "Masterpiece", "Fell asleep"]
+GEN_PASSWORD = "password123"
+OPEN_HOUR, CLOSE_HOUR = 10, 23
+CLEANING_MINUTES = 30
+
+
+def _batches(rows, size):
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def _insert_rows(conn, sql, rows, batch_size, label=None):
+    started = time.time()
+    count = 0
+    with conn.cursor() as cursor:
+        for batch in _batches(rows, batch_size):
+            cursor.executemany(sql, batch)
+            conn.commit()
+            count += len(batch)
+    if label:
+        elapsed = time.time() - started
+        print(f"  {label}: {count} rows in {elapsed:.1f}s ({count / max(elapsed, 1e-6):.0f} rows/s)")
+    return count
+
+
+def _insert_documents(collection, docs, batch_size, label):
+    started = time.time()
+    ids = []
+    for batch in _batches(docs, batch_size):
+        ids.extend(collection.insert_many(batch, ordered=False).inserted_ids)
+    elapsed = time.time() - started
+    print(f"  {label}: {len(ids)} documents in {elapsed:.1f}s ({len(ids) / max(elapsed, 1e-6):.0f} docs/s)")
+    return ids
+
+
+def _next_id(conn, table, column):
+    with conn.cursor() as cursor:
+        cursor.execute(f"SELECT COALESCE(MAX({column}), 0) + 1 AS next_id FROM {table}")
+        return cursor.fetchone()["next_id"]
+
+
+def _pick_seats(rng, layout, taken, count):
+    """Indexes of `count` free seats, side by side in one row when possible."""
+    for _ in range(8):
+        start = rng.randrange(len(layout) - count + 1)
+        block = range(start, start + count)
+        if layout[start][0] == layout[start + count - 1][0] and not any(taken[i] for i in block):
+            return list(block)
+    free = [i for i in range(len(layout)) if not taken[i]]
+    if len(free) < count:
+        return None
+    return sorted(rng.sample(free, count))
+
+
+def generate_dataset(movies=50, theaters=20, days=14, users=10000, bookings=100000,
+                     reviews=50000, seed=42, start=None, batch_size=5000, prefix="gen"):
+    rng = random.Random(seed)
+    start = start or datetime.date.today()
+    # bookings are never dated after the start day, so runs are repeatable
+    horizon = datetime.datetime.combine(start, datetime.time(OPEN_HOUR))
+    mongo_db = get_mongo_db()
+    conn = get_mysql_connection()
+    print(f"Generating synthetic data (seed={seed}, start={start}, batch={batch_size})...")
+    try:
+        with conn.cursor() as cursor:
+            cursor.execute("SELECT 1 FROM users WHERE email = %s", (f"{prefix}1@synthetic.test",))
+            if cursor.fetchone():
+                raise SystemExit(f"Users with prefix '{prefix}' already exist; pick another --prefix.")
+            # the generator only writes consistent rows; skip per-row FK lookups
+            cursor.execute("SET SESSION foreign_key_checks = 0")
+
+        # --- movies and theaters (MongoDB) ---
+        movie_docs = [{
+            "title": f"Synthetic Movie {i:05d}",
+            "synopsis": "Generated for load testing.",
+            "duration_minutes": rng.randint(85, 180),
+            "genres": rng.sample(GEN_GENRES, 2),
+            "content_rating": rng.choice(GEN_RATINGS),
+            "cast": [],
+            "media": {"poster_url": ""},
+            "stats": empty_stats(),
+        } for i in range(1, movies + 1)]
+        movie_obj_ids = _insert_documents(mongo_db.movies, movie_docs, batch_size, "movies")
+        movie_list = [(str(oid), doc["duration_minutes"]) for oid, doc in zip(movie_obj_ids, movie_docs)]
+        # a few blockbusters take most of the screenings and bookings
+        movie_weights = [1.0 / (rank + 1) for rank in range(len(movie_list))]
+
+        theater_docs = [{
+            "branch_name": f"Synthetic Branch {i:04d}",
+            "format": rng.choice(GEN_FORMATS),
+            "layout": rng.choice(GEN_LAYOUTS),
+            "updated_at": datetime.datetime.utcnow(),
+        } for i in range(1, theaters + 1)]
+        theater_obj_ids = _insert_documents(mongo_db.theaters, theater_docs, batch_size, "theaters")
+
+        # --- seats ---
+        seat_id = _next_id(conn, "seats", "seat_id")
+        theater_seats = {}  # theater_id -> (layout, first seat_id)
+        seat_values = []
+        for oid, doc in zip(theater_obj_ids, theater_docs):
+            layout = seat_rows(doc["layout"], doc["format"])
+            theater_seats[str(oid)] = (layout, seat_id)
+            for row, label, price in layout:
+                seat_values.append((seat_id, str(oid), label, price))
+                seat_id += 1
+        _insert_rows(conn, "INSERT INTO seats (seat_id, theater_id, seat, price) VALUES (%s, %s, %s, %s)",
+                     seat_values, batch_size, "seats")
+
+        # --- showtimes: back to back from opening to closing, every day ---
+        showtime_id = _next_id(conn, "showtimes", "showtime_id")
+        showtime_list = []  # (showtime_id, theater_id, showtime, weight)
+        showtime_rows = []
+        for theater_id in theater_seats:
+            for day in range(days):
+                date = start + datetime.timedelta(days=day)
+                slot = datetime.datetime.combine(date, datetime.time(OPEN_HOUR))
+                closing = datetime.datetime.combine(date, datetime.time(CLOSE_HOUR))
+                while slot < closing:
+                    movie_idx = rng.choices(range(len(movie_list)), movie_weights)[0]
+                    movie_id, duration = movie_list[movie_idx]
+                    end = slot + datetime.timedelta(minutes=duration)
+                    showtime_rows.append((showtime_id, movie_id, theater_id, slot, end))
+                    # evening shows sell better
+                    weight = movie_weights[movie_idx] * (2.0 if slot.hour >= 18 else 1.0)
+                    showtime_list.append((showtime_id, theater_id, slot, weight))
+                    showtime_id += 1
+                    gap = end + datetime.timedelta(minutes=CLEANING_MINUTES)
+                    slot = gap + datetime.timedelta(minutes=-gap.minute % 15)
+        _insert_rows(conn, "INSERT INTO showtimes (showtime_id, movie_id, theater_id, showtime, end_time) "
+                           "VALUES (%s, %s, %s, %s, %s)",
+                     showtime_rows, batch_size, "showtimes")
+        del showtime_rows
+
+        # --- users (one precomputed hash; hashing per row would dominate) ---
+        from werkzeug.security import generate_password_hash
+        password_hash = generate_password_hash(GEN_PASSWORD)
+        first_user = _next_id(conn, "users", "user_id")
+        user_ids = range(first_user, first_user + users)
+        _insert_rows(conn, "INSERT INTO users (user_id, email, password, balance, role) VALUES (%s, %s, %s, %s, 'user')",
+                     ((uid, f"{prefix}{n}@synthetic.test", password_hash, rng.randrange(0, 5000, 50))
+                      for n, uid in enumerate(user_ids, 1)),
+                     batch_size, "users")
+
+        # --- bookings, payments and book_seat, one showtime at a time ---
+        per_showtime = [0] * len(showtime_list)
+        if showtime_list and users:
+            weights = [w for *_, w in showtime_list]
+            for idx in rng.choices(range(len(showtime_list)), weights, k=bookings):
+                per_showtime[idx] += 1
+
+        book_id = _next_id(conn, "booking", "book_id")
+        booking_rows, payment_rows, seat_hold_rows = [], [], []
+        created = 0
+        seats_held = 0
+        started = time.time()
+
+        def flush():
+            nonlocal seats_held
+            _insert_rows(conn, "INSERT INTO booking (book_id, user_id, showtime_id, created_at) VALUES (%s, %s, %s, %s)",
+                         booking_rows, batch_size)
+            _insert_rows(conn, "INSERT INTO payments (book_id, amount, status, payment_time) VALUES (%s, %s, %s, %s)",
+                         payment_rows, batch_size)
+            seats_held += _insert_rows(conn, "INSERT INTO book_seat (showtime_id, book_id, seat_id, status, created_at) "
+                                             "VALUES (%s, %s, %s, %s, %s)",
+                                       seat_hold_rows, batch_size)
+            booking_rows.clear()
+            payment_rows.clear()
+            seat_hold_rows.clear()
+            print(f"  bookings: {created} bookings / {seats_held} seats ({time.time() - started:.1f}s)")
+
+        for (st_id, theater_id, slot, _), wanted in zip(showtime_list, per_showtime):
+            layout, first_seat = theater_seats[theater_id]
+            taken = bytearray(len(layout))
+            for _ in range(wanted):
+                picked = _pick_seats(rng, layout, taken, rng.choices((1, 2, 3, 4), (3, 5, 2, 1))[0])
+                if picked is None:
+                    break  # sold out
+                for i in picked:
+                    taken[i] = 1
+                booked_at = min(slot - datetime.timedelta(minutes=rng.randint(30, 14 * 24 * 60)), horizon)
+                paid = rng.random() < 0.9
+                booking_rows.append((book_id, rng.choice(user_ids), st_id, booked_at))
+                payment_rows.append((book_id, sum(layout[i][2] for i in picked),
+                                     "Paid" if paid else "Pending", booked_at))
+                for i in picked:
+                    seat_hold_rows.append((st_id, book_id, first_seat + i, "booked" if paid else "pending", booked_at))
+                book_id += 1
+                created += 1
+            if len(seat_hold_rows) >= batch_size * 20:
+                flush()
+        flush()
+        if created < bookings:
+            print(f"  note: {bookings - created} bookings did not fit (sold-out showtimes)")
+
+        # --- reviews, one per (movie, user) pair ---
+        reviews = min(reviews, len(movie_obj_ids) * users)
+        pairs = set()
+        while len(pairs) < reviews:
+            pairs.add((rng.randrange(len(movie_obj_ids)), rng.choice(user_ids)))
+
+        def review_docs():
+            for movie_idx, user_id in sorted(pairs):
+                yield {
+                    "movie_id": movie_obj_ids[movie_idx],
+                    "mysql_user_id": user_id,
+                    # popular movies review better, with plenty of noise
+                    "rating": max(1, min(5, round(rng.gauss(4.2 - movie_idx / max(len(movie_obj_ids), 1), 1)))),
+                    "comment": rng.choice(GEN_COMMENTS),
+                    "created_at": horizon - datetime.timedelta(minutes=rng.randint(0, 90 * 24 * 60)),
+                }
+        _insert_documents(mongo_db.reviews, review_docs(), batch_size, "reviews")
+        rebuild_review_stats(mongo_db, movie_obj_ids)
+    finally:
+        conn.close()
+    print(f"Synthetic data generated. Users can log in as {prefix}N@synthetic.test / {GEN_PASSWORD}")
+
+
 if __name__ == "__main__":
-    seed_database()
+    parser = argparse.ArgumentParser(description="Seed the cinema databases")
+    parser.add_argument("--generate", action="store_true",
+                        help="generate a synthetic data set of the given size instead of the demo data")
+    parser.add_argument("--movies", type=int, default=50)
+    parser.add_argument("--theaters", type=int, default=20)
+    parser.add_argument("--days", type=int, default=14, help="days of showtimes per theater")
+    parser.add_argument("--users", type=int, default=10000)
+    parser.add_argument("--bookings", type=int, default=100000)
+    parser.add_argument("--reviews", type=int, default=50000)
+    parser.add_argument("--seed", type=int, default=42, help="random seed; same flags give the same data")
+    parser.add_argument("--start", type=datetime.date.fromisoformat, default=None,
+                        help="first showtime day (YYYY-MM-DD, default today)")
+    parser.add_argument("--batch-size", type=int, default=5000, help="rows per multi-row INSERT / insert_many")
+    parser.add_argument("--prefix", default="gen", help="email prefix of generated users")
+    args = parser.parse_args()
+
+    if args.generate:
+        load_env()
+        generate_dataset(args.movies, args.theaters, args.days, args.users, args.bookings,
+                         args.reviews, args.seed, args.start, args.batch_size, args.prefix)
+    else:
+        seed_database()
@@ -1,10 +1,21 @@
 from flask import Blueprint, request, jsonify
+from config import DEFAULT_DURATION
 from db import get_connection, get_mongo_db
 from bson.objectid import ObjectId
+import bisect
 import datetime
 
 showtimes_bp = Blueprint("showtimes", __name__)
 
+
+def parse_showtime(value):
+    value = value.replace('T', ' ')
+    try:
+        return datetime.datetime.strptime(value, "%Y-%m-%d %H:%M:%S")
+    except ValueError:
+        return datetime.datetime.strptime(value, "%Y-%m-%d %H:%M")
+
+
 @showtimes_bp.route("/api/showtimes", methods=["GET"])
 def get_showtimes():
     movie_id = request.args.get("movie_id")
@@ -43,53 +54,54 @@ def create_showtime():
 
     mongo_db = get_mongo_db()
     try:
-        movie = mongo_db.movies.find_one({"_id": ObjectId(data['movie_id'])})
+        movie = mongo_db.movies.find_one({"_id": ObjectId(data['movie_id'])}, {"duration_minutes": 1})
     except Exception:
         movie = None
         
     if not movie:
         return jsonify({"error": "Movie not found"}), 404
         
-    new_duration = movie.get('duration_minutes') or 120
+    new_duration = movie.get('duration_minutes') or DEFAULT_DURATION
+
+    try:
+        new_start = parse_showtime(data['showtime'])
+    except ValueError:
+        return jsonify({"error": "showtime must be YYYY-MM-DD HH:MM[:SS]"}), 400
+    new_end = new_start + datetime.timedelta(minutes=new_duration)
 
     conn = get_connection()
     try:
         with conn.cursor() as cursor:
-            st_time = data['showtime'].replace('T', ' ')
-            try:
-                new_start = datetime.datetime.strptime(st_time, "%Y-%m-%d %H:%M:%S")
-            except ValueError:
-                new_start = datetime.datetime.strptime(st_time, "%Y-%m-%d %H:%M")
-                st_time += ":00"
-
-            new_end = new_start + datetime.timedelta(minutes=new_duration)
-
-            cursor.execute("SELECT movie_id, showtime FROM showtimes WHERE theater_id = %s", (data['theater_id'],))
-            existing_showtimes = cursor.fetchall()
-
-            for ext in existing_showtimes:
-                try:
-                    ext_movie = mongo_db.movies.find_one({"_id": ObjectId(ext['movie_id'])})
-                    ext_duration = ext_movie.get('duration_minutes') or 120 if ext_movie else 120
-                except Exception:
-                    ext_duration = 120
-                
-                ext_start = ext['showtime']
-                if isinstance(ext_start, str):
-                    try:
-                        ext_start = datetime.datetime.strptime(ext_start, "%Y-%m-%d %H:%M:%S")
-                    except ValueError:
-                        ext_start = datetime.datetime.strptime(ext_start, "%Y-%m-%d %H:%M")
-                        
-                ext_end = ext_start + datetime.timedelta(minutes=ext_duration)
-
-                if max(new_start, ext_start) < min(new_end, ext_end):
-                    return jsonify({"error": f"Overlapping showtime detected. Screen is busy from {ext_start.strftime('%H:%M')} to {ext_end.strftime('%H:%M')}."}), 409
+            # Only slots that end after the new one starts can overlap, so the
+            # (theater_id, end_time) index keeps this independent of how many
+            # past screenings the theater has. FOR UPDATE locks the window so
+            # two admins can't book the same gap concurrently.
+            cursor.execute("""
+                SELECT showtime_id, movie_id, showtime, end_time
+                FROM showtimes
+                WHERE theater_id = %s AND end_time > %s AND showtime < %s
+                ORDER BY showtime
+                LIMIT 1
+                FOR UPDATE
+            """, (data['theater_id'], new_start, new_end))
+            conflict = cursor.fetchone()
+            if conflict:
+                conn.rollback()
+                ext_start, ext_end = conflict['showtime'], conflict['end_time']
+                return jsonify({
+                    "error": f"Overlapping showtime detected. Screen is busy from {ext_start.strftime('%H:%M')} to {ext_end.strftime('%H:%M')}.",
+                    "conflict": {
+                        "showtime_id": conflict['showtime_id'],
+                        "movie_id": conflict['movie_id'],
+                        "showtime": ext_start.strftime('%Y-%m-%dT%H:%M:%S'),
+                        "end_time": ext_end.strftime('%Y-%m-%dT%H:%M:%S')
+                    }
+                }), 409
 
             cursor.execute("""
-                INSERT INTO showtimes (movie_id, theater_id, showtime)
-                VALUES (%s, %s, %s)
-            """, (data['movie_id'], data['theater_id'], st_time))
+                INSERT INTO showtimes (movie_id, theater_id, showtime, end_time)
+                VALUES (%s, %s, %s, %s)
+            """, (data['movie_id'], data['theater_id'], new_start, new_end))
             new_id = cursor.lastrowid
         conn.commit()
         return jsonify({"message": "Showtime created", "showtime_id": new_id}), 201
@@ -100,6 +112,176 @@ def create_showtime():
         if 'conn' in locals(): conn.close()
 
 
+# ================= BULK SCHEDULING =================
+MAX_BULK_SHOWTIMES = 1000
+
+
+class TheaterSchedule:
+    """
+    Busy slots of one theater kept sorted by start time. A new slot can only
+    collide with slots starting before it ends and no earlier than
+    (its start - longest slot), so a conflict check is a bisect plus a short
+    scan back instead of a pass over the whole schedule.
+    """
+
+    def __init__(self):
+        self._starts = []
+        self._slots = []  # (start, end, info), same order as _starts
+        self._longest = datetime.timedelta(0)
+
+    def conflict(self, start, end):
+        i = bisect.bisect_left(self._starts, end)
+        while i > 0:
+            i -= 1
+            slot_start, slot_end, info = self._slots[i]
+            if slot_start + self._longest <= start:
+                break
+            if slot_end > start:
+                return slot_start, slot_end, info
+        return None
+
+    def add(self, start, end, info=None):
+        i = bisect.bisect_right(self._starts, start)
+        self._starts.insert(i, start)
+        self._slots.insert(i, (start, end, info))
+        self._longest = max(self._longest, end - start)
+
+
+@showtimes_bp.route("/api/showtimes/bulk", methods=["POST"])
+def create_showtimes_bulk():
+    """
+    Schedule many showtimes at once, e.g. a theater's whole week.
+    Body: {"showtimes": [{"movie_id", "theater_id", "showtime"}, ...],
+           "all_or_nothing": false}
+    Every entry is checked against the existing schedule and against the
+    other entries of the batch; accepted ones are inserted together.
+    The response lists the outcome of each entry in request order.
+    """
+    data = request.get_json() or {}
+    entries = data.get("showtimes")
+    all_or_nothing = bool(data.get("all_or_nothing"))
+    if not isinstance(entries, list) or not entries:
+        return jsonify({"error": "showtimes[] is required"}), 400
+    if len(entries) > MAX_BULK_SHOWTIMES:
+        return jsonify({"error": f"at most {MAX_BULK_SHOWTIMES} showtimes per request"}), 400
+
+    results = [{"index": i} for i in range(len(entries))]
+
+    # resolve all movie durations with one query
+    obj_ids = {}
+    for entry in entries:
+        try:
+            obj_ids[str(entry["movie_id"])] = ObjectId(str(entry["movie_id"]))
+        except Exception:
+            pass
+    durations = {}
+    if obj_ids:
+        mongo_db = get_mongo_db()
+        for movie in mongo_db.movies.find({"_id": {"$in": list(obj_ids.values())}}, {"duration_minutes": 1}):
+            durations[str(movie["_id"])] = movie.get("duration_minutes") or DEFAULT_DURATION
+
+    candidates = []  # (index, movie_id, theater_id, start, end)
+    for i, entry in enumerate(entries):
+        if not isinstance(entry, dict) or any(k not in entry for k in ("movie_id", "theater_id", "showtime")):
+            results[i].update(status="invalid", error="movie_id, theater_id, showtime are required")
+            continue
+        movie_id = str(entry["movie_id"])
+        if movie_id not in durations:
+            results[i].update(status="invalid", error="Movie not found")
+            continue
+        try:
+            start = parse_showtime(str(entry["showtime"]))
+        except ValueError:
+            results[i].update(status="invalid", error="showtime must be YYYY-MM-DD HH:MM[:SS]")
+            continue
+        end = start + datetime.timedelta(minutes=durations[movie_id])
+        candidates.append((i, movie_id, str(entry["theater_id"]), start, end))
+
+    conn = get_connection()
+    try:
+        with conn.cursor() as cursor:
+            accepted = []
+            if candidates:
+                # load (and lock) the existing slots inside each theater's window
+                windows = {}
+                for _, _, theater_id, start, end in candidates:
+                    lo, hi = windows.get(theater_id, (start, end))
+                    windows[theater_id] = (min(lo, start), max(hi, end))
+                where = " OR ".join(["(theater_id = %s AND end_time > %s AND showtime < %s)"] * len(windows))
+                params = [v for theater_id, (lo, hi) in windows.items() for v in (theater_id, lo, hi)]
+                cursor.execute(f"""
+                    SELECT showtime_id, movie_id, theater_id, showtime, end_time
+                    FROM showtimes
+                    WHERE {where}
+                    FOR UPDATE
+                """, params)
+
+                schedules = {theater_id: TheaterSchedule() for theater_id in windows}
+                for row in cursor.fetchall():
+                    schedules[row["theater_id"]].add(row["showtime"], row["end_time"], {
+                        "showtime_id": row["showtime_id"], "movie_id": row["movie_id"]
+                    })
+
+                for i, movie_id, theater_id, start, end in candidates:
+                    schedule = schedules[theater_id]
+                    hit = schedule.conflict(start, end)
+                    if hit:
+                        slot_start, slot_end, info = hit
+                        results[i].update(
+                            status="conflict",
+                            error=f"Screen is busy from {slot_start.strftime('%H:%M')} to {slot_end.strftime('%H:%M')}.",
+                            conflict=dict(info,
+                                          showtime=slot_start.strftime('%Y-%m-%dT%H:%M:%S'),
+                                          end_time=slot_end.strftime('%Y-%m-%dT%H:%M:%S'))
+                        )
+                        continue
+                    schedule.add(start, end, {"showtime_id": None, "movie_id": movie_id, "index": i})
+                    accepted.append((i, movie_id, theater_id, start, end))
+
+            rejected = len(entries) - len(accepted)
+            if accepted and not (all_or_nothing and rejected):
+                # one multi-row insert; its ids start at lastrowid but need not
+                # be consecutive, so match them back by (theater, start), which
+                # the conflict check above keeps unique
+                cursor.execute(
+                    "INSERT INTO showtimes (movie_id, theater_id, showtime, end_time) VALUES "
+                    + ",".join(["(%s, %s, %s, %s)"] * len(accepted)),
+                    [v for _, movie_id, theater_id, start, end in accepted for v in (movie_id, theater_id, start, end)]
+                )
+                theater_ids = sorted({theater_id for _, _, theater_id, _, _ in accepted})
+                cursor.execute(f"""
+                    SELECT showtime_id, theater_id, showtime
+                    FROM showtimes
+                    WHERE showtime_id >= %s AND theater_id IN ({','.join(['%s'] * len(theater_ids))})
+                    ORDER BY showtime_id
+                """, (cursor.lastrowid, *theater_ids))
+                new_ids = {(row["theater_id"], row["showtime"]): row["showtime_id"] for row in cursor.fetchall()}
+                for i, _movie_id, theater_id, start, _end in accepted:
+                    showtime_id = new_ids.get((theater_id, start))
+                    if showtime_id is None:
+                        raise RuntimeError("could not read back the new showtime ids")
+                    results[i].update(status="created", showtime_id=showtime_id)
+                conn.commit()
+            else:
+                for i, *_rest in accepted:
+                    results[i].update(status="skipped", error="batch rejected (all_or_nothing)")
+                conn.rollback()
+    except Exception as e:
+        conn.rollback()
+        return jsonify({"error": f"Database error: {str(e)}"}), 500
+    finally:
+        conn.close()
+
+    created = sum(1 for r in results if r.get("status") == "created")
+    if created:
+        code = 201
+    elif all(r.get("status") == "invalid" for r in results):
+        code = 400
+    else:
+        code = 409
+    return jsonify({"created": created, "rejected": len(entries) - created, "results": results}), code
+
+
 @showtimes_bp.route("/api/showtimes/<int:showtime_id>", methods=["DELETE"])
 def delete_showtime(showtime_id):
     conn = get_connection()
@@ -0,0 +1,53 @@
+import os
+import threading
+from flask import jsonify
+
+# Cap on long-lived streaming responses per process.
+#
+# Under gunicorn's gthread workers every open /api/seats/stream client and
+# every running export holds one of the worker's GUNICORN_THREADS threads
+# for as long as it is connected. Without a cap, a handful of seat-picker
+# tabs per worker would leave no thread for ordinary API requests. At most
+# MAX_STREAMS streams run at once per process (default: half the threads,
+# at least 1); further stream requests get 503 with Retry-After straight
+# away, so the remaining threads always serve the rest of the API.
+#
+# Total stream capacity is WEB_CONCURRENCY x MAX_STREAMS.
+
+MAX_STREAMS = int(os.getenv("MAX_STREAMS", max(1, int(os.getenv("GUNICORN_THREADS", "4")) // 2)))
+RETRY_AFTER = os.getenv("STREAM_RETRY_AFTER", "5")
+
+
+class StreamSlots:
+    def __init__(self, limit=MAX_STREAMS):
+        self.limit = limit
+        self._lock = threading.Lock()
+        self.active = 0
+        self.rejected = 0
+
+    def acquire(self):
+        """Take a slot without waiting; False when all slots are in use."""
+        with self._lock:
+            if self.active >= self.limit:
+                self.rejected += 1
+                return False
+            self.active += 1
+            return True
+
+    def release(self):
+        with self._lock:
+            self.active = max(0, self.active - 1)
+
+    def stats(self):
+        with self._lock:
+            return {"limit": self.limit, "active": self.active, "rejected": self.rejected}
+
+
+stream_slots = StreamSlots()
+
+
+def streams_busy():
+    resp = jsonify({"error": "Too many open streams, try again shortly"})
+    resp.status_code = 503
+    resp.headers["Retry-After"] = RETRY_AFTER
+    return resp
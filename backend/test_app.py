@@ -93,3 +93,834 @@ def test_fallback_route(mock_exists, client):
     # Based on app.py, if frontend build isn't found, it returns ("Frontend not built", 404)
     assert response.status_code == 404
     assert b"Frontend not built" in response.data
+
+def _fake_pool(**kwargs):
+    from db import ConnectionPool
+    return ConnectionPool(connect=MagicMock, **kwargs)
+
+def test_pool_reuses_connections():
+    """
+    6. test_pool_reuses_connections
+    สิ่งที่ทำ: ตรวจสอบว่า connection pool นำการเชื่อมต่อเดิมกลับมาใช้ซ้ำ เมื่อเรียก close() แล้วยืมใหม่
+    ผลลัพธ์ที่คาดหวัง: ได้การเชื่อมต่อตัวเดิม มีการสร้างการเชื่อมต่อเพียงครั้งเดียว และมีการ rollback ตอนคืน
+    """
+    pool = _fake_pool(min_size=0, max_size=2)
+    conn = pool.acquire()
+    raw = conn._raw
+    conn.close()
+    raw.rollback.assert_called_once()
+
+    conn2 = pool.acquire()
+    assert conn2._raw is raw
+    stats = pool.stats()
+    assert stats["created"] == 1
+    assert stats["in_use"] == 1
+    assert stats["checkouts"] == 2
+    conn2.close()
+    assert pool.stats()["in_use"] == 0
+
+def test_pool_timeout_when_exhausted():
+    """
+    7. test_pool_timeout_when_exhausted
+    สิ่งที่ทำ: ตรวจสอบพฤติกรรมของ pool เมื่อการเชื่อมต่อถูกยืมไปครบ max_size แล้ว
+    ผลลัพธ์ที่คาดหวัง: ผู้ยืมรายถัดไปต้องได้รับ PoolTimeout หลังรอครบเวลาที่กำหนด และสถิติ timeouts เพิ่มขึ้น
+    """
+    from db import PoolTimeout
+    pool = _fake_pool(min_size=0, max_size=1, timeout=0.05)
+    with pool.connection():
+        with pytest.raises(PoolTimeout):
+            pool.acquire()
+    assert pool.stats()["timeouts"] == 1
+    assert pool.stats()["in_use"] == 0
+
+def test_pool_replaces_dead_connection():
+    """
+    8. test_pool_replaces_dead_connection
+    สิ่งที่ทำ: ตรวจสอบ health-check ตอนยืม เมื่อการเชื่อมต่อที่ว่างอยู่ตอบ ping ไม่ได้
+    ผลลัพธ์ที่คาดหวัง: pool ต้องทิ้งการเชื่อมต่อที่เสียและเปิดการเชื่อมต่อใหม่แทน
+    """
+    pool = _fake_pool(min_size=0, max_size=1)
+    conn = pool.acquire()
+    dead = conn._raw
+    conn.close()
+    dead.ping.side_effect = Exception("gone away")
+
+    conn = pool.acquire()
+    assert conn._raw is not dead
+    dead.close.assert_called_once()
+    assert pool.stats()["discarded"] == 1
+    conn.close()
+
+def test_enrich_transactions_batches_lookups():
+    """
+    9. test_enrich_transactions_batches_lookups
+    สิ่งที่ทำ: ตรวจสอบการเติมชื่อหนังและชื่อโรงให้กับรายการจอง โดยจำลอง MongoDB (Mocking)
+    ผลลัพธ์ที่คาดหวัง: ต้อง query MongoDB เพียงครั้งเดียวต่อ collection ไม่ว่าจะมีกี่แถว และใช้ค่า default เมื่อหาไม่เจอ
+    """
+    from bson.objectid import ObjectId
+    from enrich import enrich_transactions
+    movie_id, theater_id = ObjectId(), ObjectId()
+    mongo_db = MagicMock()
+    mongo_db.movies.find.return_value = [{"_id": movie_id, "title": "Dune"}]
+    mongo_db.theaters.find.return_value = [{"_id": theater_id, "branch_name": "Theater 1", "format": "IMAX"}]
+
+    rows = [{"movie_id": str(movie_id), "theater_id": str(theater_id)} for _ in range(50)]
+    rows.append({"movie_id": "not-an-object-id", "theater_id": str(ObjectId())})
+    enrich_transactions(rows, mongo_db=mongo_db)
+
+    assert mongo_db.movies.find.call_count == 1
+    assert mongo_db.theaters.find.call_count == 1
+    assert rows[0]["movie"] == "Dune"
+    assert rows[0]["theater_name"] == "Theater 1"
+    assert rows[0]["theater_format"] == "IMAX"
+    assert rows[-1]["movie"] == "Unknown Movie"
+    assert rows[-1]["theater_name"] == "Unknown Screen"
+
+@patch('mongo_routes.get_mongo_db')
+def test_get_movies_single_rating_aggregation(mock_get_mongo_db, client):
+    """
+    10. test_get_movies_single_rating_aggregation
+    สิ่งที่ทำ: ตรวจสอบว่า GET /api/movies คำนวณคะแนนเฉลี่ยของหนังทุกเรื่องด้วย aggregation เพียงครั้งเดียว
+    ผลลัพธ์ที่คาดหวัง: reviews.aggregate ถูกเรียกครั้งเดียว และหนังที่ไม่มีรีวิวได้ average_rating เป็น None
+    """
+    from bson.objectid import ObjectId
+    rated, unrated = ObjectId(), ObjectId()
+    mongo_db = MagicMock()
+    mock_get_mongo_db.return_value = mongo_db
+    mongo_db.movies.find.return_value = [{"_id": rated, "title": "Dune"}, {"_id": unrated, "title": "Barbie"}]
+    mongo_db.reviews.aggregate.return_value = [{"_id": rated, "avg_rating": 4.25, "count": 4}]
+
+    response = client.get('/api/movies')
+    data = response.get_json()
+    assert response.status_code == 200
+    assert mongo_db.reviews.aggregate.call_count == 1
+    assert data[0]["stats"] == {"average_rating": 4.2, "total_reviews": 4}
+    assert data[1]["stats"] == {"average_rating": None, "total_reviews": 0}
+
+def test_review_delta_updates_stats_incrementally():
+    """
+    11. test_review_delta_updates_stats_incrementally
+    สิ่งที่ทำ: ตรวจสอบการปรับสถิติรีวิวของหนังแบบ incremental เมื่อผู้ใช้แก้ไขคะแนนรีวิวเดิม (จาก 2 ดาวเป็น 5 ดาว)
+    ผลลัพธ์ที่คาดหวัง: ปรับ histogram และผลรวมตามส่วนต่าง พร้อมคำนวณค่าเฉลี่ยใหม่ใน update เดียว โดยไม่ aggregate รีวิวทั้งหมดใหม่
+    """
+    from bson.objectid import ObjectId
+    from review_stats import apply_review_delta
+    movie_id = ObjectId()
+    mongo_db = MagicMock()
+    mongo_db.movies.update_one.return_value.matched_count = 1
+
+    apply_review_delta(mongo_db, movie_id, 5, old_rating=2)
+
+    mongo_db.movies.update_one.assert_called_once()
+    query, pipeline = mongo_db.movies.update_one.call_args[0]
+    assert query == {"_id": movie_id, "stats.rating_sum": {"$exists": True}}
+    counters, average = pipeline
+    assert counters["$set"]["stats.histogram.5"] == {"$add": [{"$ifNull": ["$stats.histogram.5", 0]}, 1]}
+    assert counters["$set"]["stats.histogram.2"] == {"$add": [{"$ifNull": ["$stats.histogram.2", 0]}, -1]}
+    assert counters["$set"]["stats.rating_sum"] == {"$add": [{"$ifNull": ["$stats.rating_sum", 0]}, 3]}
+    assert "stats.total_reviews" not in counters["$set"]
+    # ค่าเฉลี่ยคำนวณจากผลรวม/จำนวนหลังปรับ ใน update เดียวกัน (atomic)
+    assert average["$set"]["stats.average_rating"]["$cond"][1] == {
+        "$round": [{"$divide": ["$stats.rating_sum", "$stats.total_reviews"]}, 1]
+    }
+    mongo_db.reviews.aggregate.assert_not_called()
+
+def test_seat_cache_invalidation():
+    """
+    12. test_seat_cache_invalidation
+    สิ่งที่ทำ: ตรวจสอบ cache ของแผนผังที่นั่ง ว่าเรียกฐานข้อมูลเฉพาะตอน miss และโหลดสถานะใหม่หลังการจองสั่ง invalidate
+    ผลลัพธ์ที่คาดหวัง: layout ถูกโหลดครั้งเดียว ส่วนสถานะที่นั่งถูกโหลดใหม่หลัง invalidate และนับ hit/miss ถูกต้อง
+    """
+    from seat_cache import SeatMapCache
+    cache = SeatMapCache(status_ttl=60, max_showtimes=2)
+    theater_loader = MagicMock(side_effect=lambda showtime_id: "t1")
+    layout_loader = MagicMock(return_value=[{"seat_id": 1, "seat": "A1", "price": 200}])
+    status_loader = MagicMock(side_effect=[{}, {1: "pending"}])
+
+    for _ in range(3):
+        cache.layout(7, theater_loader, layout_loader)
+        assert cache.status(7, status_loader) == {}
+    cache.invalidate(7)
+    assert cache.status(7, status_loader) == {1: "pending"}
+
+    assert layout_loader.call_count == 1
+    assert status_loader.call_count == 2
+    assert cache.stats()["hits"] == 4
+    assert cache.stats()["misses"] == 3
+
+    # layout เก็บต่อโรง: รอบฉายอื่นของโรงเดียวกันใช้ layout ชุดเดิม และจำรอบฉายได้ไม่เกิน max_showtimes
+    for showtime_id in (8, 9):
+        assert cache.layout(showtime_id, theater_loader, layout_loader) is cache.layout(7, theater_loader, layout_loader)
+    assert layout_loader.call_count == 1
+    assert cache.stats()["layouts"] == 1
+    assert cache.stats()["showtimes"] == 2
+    assert cache._loading == {}
+
+def test_pack_seat_status_bits():
+    """
+    13. test_pack_seat_status_bits
+    สิ่งที่ทำ: ตรวจสอบการแปลงสถานะที่นั่งเป็น bitset แบบกะทัดรัด (pending / booked) ตามลำดับที่นั่งใน layout
+    ผลลัพธ์ที่คาดหวัง: ที่นั่ง 112 ที่ใช้ 14 ไบต์ต่อ bitset และบิตของที่นั่งที่ถูกจองตรงกับลำดับที่นั่ง
+    """
+    from seats import pack_status
+    layout = [{"seat_id": 100 + i} for i in range(112)]
+    pending, booked = pack_status(layout, {100: "pending", 109: "booked", 211: "booked"})
+    assert len(pending) == len(booked) == 14
+    assert pending[0] == 0b00000001
+    assert booked[1] == 0b00000010
+    assert booked[13] == 0b10000000
+    assert sum(bin(b).count("1") for b in pending + booked) == 3
+
+def test_seat_events_emit_deltas():
+    """
+    14. test_seat_events_emit_deltas
+    สิ่งที่ทำ: ตรวจสอบตัวกระจายเหตุการณ์สถานะที่นั่ง (SSE) เมื่อมีการจองและยกเลิกที่นั่งในรอบฉาย
+    ผลลัพธ์ที่คาดหวัง: ได้เฉพาะที่นั่งที่เปลี่ยนสถานะ (pending / free) และ event id เดิมใช้ resume ต่อได้
+    """
+    from seat_events import SeatEventHub
+    hub = SeatEventHub()
+    loader = MagicMock(side_effect=[{}, {5: "pending"}, {}])
+    key = hub.subscribe(9001, loader)
+    seq, state = hub.snapshot(key)
+    assert state == {}
+
+    hub.changed(9001)
+    events = hub.wait(key, seq, timeout=1)
+    assert events == [(seq + 1, [[5, "pending"]])]
+
+    hub.changed(9001)
+    events = hub.wait(key, seq + 1, timeout=1)
+    assert events == [(seq + 2, [[5, "free"]])]
+
+    assert hub.parse_event_id(hub.event_id(seq + 1)) == seq + 1
+    assert hub.replay(key, seq) == [(seq + 1, [[5, "pending"]]), (seq + 2, [[5, "free"]])]
+    assert hub.parse_event_id("otherproc-3") is None
+    hub.unsubscribe(key)
+
+    # ผู้ชมคนที่สองที่เข้ามาระหว่างการโหลดครั้งแรก ต้องได้ snapshot เดียวกัน ไม่ใช่ที่นั่งว่างทั้งหมด
+    import threading
+    started, release = threading.Event(), threading.Event()
+    def slow_loader(showtime_id):
+        started.set()
+        release.wait(5)
+        return {1: "booked", 2: "pending"}
+    first = threading.Thread(target=hub.subscribe, args=(9002, slow_loader))
+    first.start()
+    started.wait(5)
+    second = {}
+    waiter = threading.Thread(target=lambda: second.update(key=hub.subscribe(9002, slow_loader)))
+    waiter.start()
+    while hub._channels["9002"].listeners < 2:
+        threading.Event().wait(0.01)
+    release.set()
+    first.join(5)
+    waiter.join(5)
+    assert hub.snapshot(second["key"]) == (0, {1: "booked", 2: "pending"})
+
+    # โหลดไม่สำเร็จ: ต้องคืน channel ไม่ค้าง listener ไว้
+    with pytest.raises(RuntimeError):
+        hub.subscribe(9003, MagicMock(side_effect=RuntimeError("db down")))
+    assert "9003" not in hub._channels
+
+@patch('booking.seat_changed')
+@patch('booking.get_connection')
+def test_bulk_booking_constant_round_trips(mock_get_connection, mock_seat_changed, client):
+    """
+    15. test_bulk_booking_constant_round_trips
+    สิ่งที่ทำ: ตรวจสอบการจองหลายที่นั่ง (10 ที่นั่ง) ว่าใช้จำนวนคำสั่ง SQL คงที่ โดยจำลองฐานข้อมูล (Mocking)
+    ผลลัพธ์ที่คาดหวัง: ระบบตอบ HTTP 201 ใช้คำสั่ง SQL คงที่ 6 คำสั่ง และจับคู่ book_id ที่อ่านกลับจากฐานข้อมูล (อาจไม่ต่อเนื่อง) กับที่นั่งตามลำดับ
+    """
+    mock_conn = MagicMock()
+    mock_cursor = MagicMock()
+    mock_get_connection.return_value = mock_conn
+    mock_conn.cursor.return_value.__enter__.return_value = mock_cursor
+
+    seat_ids = list(range(1, 11))
+    book_ids = list(range(500, 520, 2))
+    mock_cursor.fetchall.side_effect = [
+        [{"seat_id": s, "price": 250} for s in seat_ids],
+        [{"book_id": b} for b in book_ids],
+    ]
+    mock_cursor.fetchone.return_value = None
+    mock_cursor.lastrowid = 500
+
+    response = client.post('/api/booking/bulk', json={
+        "user_id": 2, "showtime_id": 3, "seat_ids": seat_ids
+    })
+    data = response.get_json()
+    assert response.status_code == 201
+    assert mock_cursor.execute.call_count == 6
+    assert [(item["book_id"], item["seat_id"]) for item in data["items"]] == list(zip(book_ids, seat_ids))
+    hold = [c for c in mock_cursor.execute.call_args_list if "INSERT INTO book_seat" in c[0][0]][0]
+    assert hold[0][1][:6] == [500, 3, 1, 502, 3, 2]
+    mock_conn.commit.assert_called_once()
+    mock_seat_changed.assert_called_once_with(3)
+
+@patch('booking.seat_changed')
+@patch('booking.get_connection')
+def test_confirm_multiple_bookings_set_based(mock_get_connection, mock_seat_changed, client):
+    """
+    16. test_confirm_multiple_bookings_set_based
+    สิ่งที่ทำ: ตรวจสอบการชำระเงินหลายการจองพร้อมกันผ่าน book_ids โดยจำลองฐานข้อมูล (Mocking)
+    ผลลัพธ์ที่คาดหวัง: ตัดยอดเงินครั้งเดียวตามยอดรวม และใช้จำนวนคำสั่ง SQL คงที่ไม่ขึ้นกับจำนวนที่นั่ง
+    """
+    mock_conn = MagicMock()
+    mock_cursor = MagicMock()
+    mock_get_connection.return_value = mock_conn
+    mock_conn.cursor.return_value.__enter__.return_value = mock_cursor
+
+    book_ids = [11, 12, 13, 14]
+    mock_cursor.fetchall.return_value = [
+        {"book_id": bid, "user_id": 2, "showtime_id": 3, "amount": 250} for bid in book_ids
+    ]
+    mock_cursor.fetchone.return_value = {"balance": 5000}
+
+    response = client.post('/api/booking/confirm', json={"book_ids": book_ids})
+    assert response.status_code == 200
+    assert mock_cursor.execute.call_count == 4
+    charge = [c for c in mock_cursor.execute.call_args_list if "balance - %s" in c[0][0]]
+    assert charge[0][0][1] == (1000.0, 2)
+    mock_seat_changed.assert_called_once_with(3)
+
+    mock_cursor.fetchone.return_value = {"balance": 10}
+    response = client.post('/api/booking/confirm', json={"book_ids": book_ids})
+    assert response.status_code == 400
+    assert response.get_json()["error"] == "insufficient balance"
+
+    # user_id ที่ไม่ใช่ตัวเลข: ตอบ 400 ก่อนเปิด transaction ไม่ใช่ 500
+    calls = mock_get_connection.call_count
+    response = client.post('/api/booking/confirm', json={"book_ids": book_ids, "user_id": "abc"})
+    assert response.status_code == 400
+    assert mock_get_connection.call_count == calls
+
+@patch('booking.seat_changed')
+@patch('booking.get_connection')
+def test_bulk_booking_basket_mode(mock_get_connection, mock_seat_changed, client):
+    """
+    17. test_bulk_booking_basket_mode
+    สิ่งที่ทำ: ตรวจสอบการจองแบบตะกร้า (basket) ที่รวมหลายที่นั่งไว้ในการจองเดียว โดยจำลองฐานข้อมูล (Mocking)
+    ผลลัพธ์ที่คาดหวัง: สร้าง booking เดียวและ payment เดียวด้วยยอดรวมของทุกที่นั่ง
+    """
+    mock_conn = MagicMock()
+    mock_cursor = MagicMock()
+    mock_get_connection.return_value = mock_conn
+    mock_conn.cursor.return_value.__enter__.return_value = mock_cursor
+
+    mock_cursor.fetchall.return_value = [{"seat_id": 1, "price": 200}, {"seat_id": 2, "price": 450}]
+    mock_cursor.fetchone.return_value = None
+    mock_cursor.lastrowid = 77
+
+    response = client.post('/api/booking/bulk', json={
+        "user_id": 2, "showtime_id": 3, "seat_ids": [1, 2], "mode": "basket"
+    })
+    data = response.get_json()
+    assert response.status_code == 201
+    assert data["book_id"] == 77
+    assert data["amount"] == 650.0
+    assert {item["book_id"] for item in data["items"]} == {77}
+    payment = [c for c in mock_cursor.execute.call_args_list if "INSERT INTO payments" in c[0][0]]
+    assert len(payment) == 1 and payment[0][0][1] == (77, 650.0)
+
+@patch('hold_reaper.seat_changed')
+@patch('hold_reaper.get_connection')
+def test_release_expired_holds(mock_get_connection, mock_seat_changed):
+    """
+    18. test_release_expired_holds
+    สิ่งที่ทำ: ตรวจสอบการคืนที่นั่งที่ถูกจองค้างไว้ (pending) เกินเวลาที่กำหนด โดยจำลองฐานข้อมูล (Mocking)
+    ผลลัพธ์ที่คาดหวัง: ลบ book_seat / payments / booking ของการจองที่หมดเวลาเป็นชุด และรายงานจำนวนที่นั่งที่คืนได้
+    """
+    from hold_reaper import release_expired_holds
+    mock_conn = MagicMock()
+    mock_cursor = MagicMock()
+    mock_get_connection.return_value = mock_conn
+    mock_conn.cursor.return_value.__enter__.return_value = mock_cursor
+    mock_cursor.fetchall.side_effect = [
+        [{"book_id": 1}, {"book_id": 2}],
+        [{"showtime_id": 3}, {"showtime_id": 3}, {"showtime_id": 4}],
+    ]
+    mock_cursor.rowcount = 3
+
+    released = release_expired_holds(ttl_seconds=600, batch_size=100)
+
+    assert released == 3
+    statements = [c[0][0] for c in mock_cursor.execute.call_args_list]
+    # จองทั้ง booking ผ่าน payment ที่ค้างอยู่ แล้วล็อกที่นั่งทั้งหมดของ booking นั้นก่อนลบ
+    assert "FROM payments" in statements[0] and "SKIP LOCKED" in statements[0]
+    assert mock_cursor.execute.call_args_list[0][0][1] == (600, 100)
+    assert "FROM book_seat" in statements[1] and "FOR UPDATE" in statements[1]
+    assert mock_cursor.execute.call_args_list[1][0][1] == (1, 2)
+    assert [s.split(" WHERE")[0] for s in statements[2:]] == [
+        "DELETE FROM book_seat", "DELETE FROM payments", "DELETE FROM booking"
+    ]
+    mock_conn.commit.assert_called_once()
+    assert set(mock_seat_changed.call_args[0]) == {3, 4}
+
+def test_migrate_applies_only_pending_versions():
+    """
+    19. test_migrate_applies_only_pending_versions
+    สิ่งที่ทำ: ตรวจสอบตัวรัน migration แบบมีเวอร์ชัน เมื่อบางเวอร์ชันถูกรันไปแล้ว โดยจำลอง MySQL และ MongoDB (Mocking)
+    ผลลัพธ์ที่คาดหวัง: รันเฉพาะเวอร์ชันที่ยังไม่ถูกบันทึกตามลำดับ และบันทึกเวอร์ชันที่รันแล้วลงในแต่ละฐานข้อมูล
+    """
+    import migrate
+    mock_conn = MagicMock()
+    mock_cursor = MagicMock()
+    mock_conn.cursor.return_value.__enter__.return_value = mock_cursor
+    mock_cursor.fetchall.return_value = [{"version": 1}, {"version": 2}]
+    mongo_db = MagicMock()
+    mongo_db.schema_migrations.find.return_value = []
+
+    steps = [MagicMock(), MagicMock(), MagicMock()]
+    fake = [
+        (1, "mysql", "one", steps[0]),
+        (3, "mysql", "three", steps[1]),
+        (101, "mongo", "mongo one", steps[2]),
+    ]
+    with patch.object(migrate, "MIGRATIONS", fake):
+        applied = migrate.migrate(conn=mock_conn, mongo_db=mongo_db)
+
+    assert applied == [3, 101]
+    steps[0].assert_not_called()
+    steps[1].assert_called_once_with(mock_cursor)
+    steps[2].assert_called_once_with(mongo_db)
+    mock_cursor.execute.assert_any_call(
+        "INSERT INTO schema_migrations (version, name) VALUES (%s, %s)", (3, "three")
+    )
+    mongo_db.schema_migrations.insert_one.assert_called_once_with({"version": 101, "name": "mongo one"})
+
+    # m101: ลบรีวิวซ้ำ (เก็บอันใหม่สุด) ก่อนสร้าง unique index และไม่นับเอกสารที่ไม่มี mysql_user_id
+    mongo_db = MagicMock()
+    mongo_db.reviews.name = "reviews"
+    mongo_db.reviews.aggregate.return_value = [{"_id": {"movie_id": "m1", "mysql_user_id": 7}, "ids": ["new", "old"], "count": 2}]
+    mongo_db.user_profiles.aggregate.return_value = []
+    with patch.object(migrate, "rebuild_review_stats") as mock_rebuild:
+        migrate.m101_mongo_indexes(mongo_db)
+    mongo_db.reviews.delete_many.assert_called_once_with({"_id": {"$in": ["old"]}})
+    mock_rebuild.assert_called_once_with(mongo_db, ["m1"])
+    unique = [c for c in mongo_db.reviews.create_index.call_args_list if c[1].get("unique")]
+    assert unique[0][1]["partialFilterExpression"] == {"mysql_user_id": {"$exists": True}}
+    mongo_db.user_profiles.delete_many.assert_not_called()
+
+@patch('showtimes.get_connection')
+@patch('showtimes.get_mongo_db')
+def test_create_showtime_overlap_range_query(mock_get_mongo_db, mock_get_connection, client):
+    """
+    20. test_create_showtime_overlap_range_query
+    สิ่งที่ทำ: ตรวจสอบการสร้างรอบฉายที่ชนกับรอบเดิมในโรงเดียวกัน โดยจำลอง MySQL และ MongoDB (Mocking)
+    ผลลัพธ์ที่คาดหวัง: ใช้ query ช่วงเวลาเพียงครั้งเดียว (ไม่วนหาข้อมูลหนังทุกรอบ) และตอบ HTTP 409 พร้อมรอบที่ชนกัน
+    """
+    import datetime
+    from bson.objectid import ObjectId
+    mongo_db = MagicMock()
+    mock_get_mongo_db.return_value = mongo_db
+    mongo_db.movies.find_one.return_value = {"_id": ObjectId(), "duration_minutes": 150}
+
+    mock_conn = MagicMock()
+    mock_cursor = MagicMock()
+    mock_get_connection.return_value = mock_conn
+    mock_conn.cursor.return_value.__enter__.return_value = mock_cursor
+    mock_cursor.fetchone.return_value = {
+        "showtime_id": 8, "movie_id": "abc",
+        "showtime": datetime.datetime(2026, 3, 4, 19, 0),
+        "end_time": datetime.datetime(2026, 3, 4, 22, 0),
+    }
+
+    response = client.post('/api/showtimes', json={
+        "movie_id": str(ObjectId()), "theater_id": "t1", "showtime": "2026-03-04T18:00"
+    })
+    data = response.get_json()
+    assert response.status_code == 409
+    assert data["conflict"]["showtime_id"] == 8
+    assert mongo_db.movies.find_one.call_count == 1
+    assert mock_cursor.execute.call_count == 1
+    assert mock_cursor.execute.call_args[0][1] == (
+        "t1", datetime.datetime(2026, 3, 4, 18, 0), datetime.datetime(2026, 3, 4, 20, 30)
+    )
+
+@patch('showtimes.get_connection')
+@patch('showtimes.get_mongo_db')
+def test_bulk_showtimes_conflicts_within_batch(mock_get_mongo_db, mock_get_connection, client):
+    """
+    21. test_bulk_showtimes_conflicts_within_batch
+    สิ่งที่ทำ: ตรวจสอบการสร้างรอบฉายหลายรอบพร้อมกัน ที่มีรอบชนกับรอบเดิมในฐานข้อมูลและชนกันเองในชุดเดียวกัน (Mocking)
+    ผลลัพธ์ที่คาดหวัง: รอบที่ไม่ชนถูกเพิ่มด้วย INSERT ครั้งเดียว ส่วนรอบที่ชนถูกรายงานเป็น conflict รายรายการ
+    """
+    import datetime
+    from bson.objectid import ObjectId
+    movie_id = ObjectId()
+    mongo_db = MagicMock()
+    mock_get_mongo_db.return_value = mongo_db
+    mongo_db.movies.find.return_value = [{"_id": movie_id, "duration_minutes": 120}]
+
+    mock_conn = MagicMock()
+    mock_cursor = MagicMock()
+    mock_get_connection.return_value = mock_conn
+    mock_conn.cursor.return_value.__enter__.return_value = mock_cursor
+    mock_cursor.fetchall.side_effect = [
+        [{
+            "showtime_id": 5, "movie_id": "x", "theater_id": "t1",
+            "showtime": datetime.datetime(2026, 3, 4, 10, 0),
+            "end_time": datetime.datetime(2026, 3, 4, 12, 0),
+        }],
+        # ids ที่อ่านกลับหลัง INSERT ไม่จำเป็นต้องต่อเนื่อง (auto_increment_increment = 2)
+        [
+            {"showtime_id": 40, "theater_id": "t1", "showtime": datetime.datetime(2026, 3, 4, 12, 0)},
+            {"showtime_id": 42, "theater_id": "t2", "showtime": datetime.datetime(2026, 3, 4, 13, 30)},
+        ],
+    ]
+    mock_cursor.lastrowid = 40
+
+    entries = [
+        {"movie_id": str(movie_id), "theater_id": "t1", "showtime": "2026-03-04T11:00"},  # clashes with DB slot
+        {"movie_id": str(movie_id), "theater_id": "t1", "showtime": "2026-03-04T12:00"},
+        {"movie_id": str(movie_id), "theater_id": "t1", "showtime": "2026-03-04T13:30"},  # clashes with entry 1
+        {"movie_id": str(movie_id), "theater_id": "t2", "showtime": "2026-03-04T13:30"},
+        {"movie_id": "bad", "theater_id": "t2", "showtime": "2026-03-04T13:30"},
+    ]
+    response = client.post('/api/showtimes/bulk', json={"showtimes": entries})
+    data = response.get_json()
+    assert response.status_code == 201
+    assert [r["status"] for r in data["results"]] == ["conflict", "created", "conflict", "created", "invalid"]
+    assert data["results"][0]["conflict"]["showtime_id"] == 5
+    assert data["results"][1]["showtime_id"] == 40
+    assert data["results"][3]["showtime_id"] == 42
+    assert mongo_db.movies.find.call_count == 1
+    assert mock_cursor.execute.call_count == 3
+
+@patch('users.get_connection')
+def test_admin_users_keyset_pagination(mock_get_connection, client):
+    """
+    22. test_admin_users_keyset_pagination
+    สิ่งที่ทำ: ตรวจสอบการแบ่งหน้าแบบ keyset ของรายชื่อผู้ใช้ฝั่งแอดมิน โดยจำลองฐานข้อมูล (Mocking)
+    ผลลัพธ์ที่คาดหวัง: ได้ไม่เกิน limit แถว มี X-Next-Cursor สำหรับหน้าถัดไป และ cursor นั้นใช้ต่อจาก user_id สุดท้ายได้
+    """
+    mock_conn = MagicMock()
+    mock_cursor = MagicMock()
+    mock_get_connection.return_value = mock_conn
+    mock_conn.cursor.return_value.__enter__.return_value = mock_cursor
+    mock_cursor.fetchall.return_value = [
+        {"user_id": i, "email": f"u{i}@gmail.com", "balance": 0, "role": "user"} for i in (1, 2, 3)
+    ]
+
+    response = client.get('/api/admin/users?limit=2')
+    assert response.status_code == 200
+    assert [u["user_id"] for u in response.get_json()] == [1, 2]
+    assert mock_cursor.execute.call_args[0][1] == (0, 3)
+    cursor_token = response.headers["X-Next-Cursor"]
+
+    mock_cursor.fetchall.return_value = [{"user_id": 3, "email": "u3@gmail.com", "balance": 0, "role": "user"}]
+    response = client.get(f'/api/admin/users?limit=2&cursor={cursor_token}')
+    assert mock_cursor.execute.call_args[0][1] == (2, 3)
+    assert "X-Next-Cursor" not in response.headers
+
+    response = client.get('/api/admin/users?cursor=garbage')
+    assert response.status_code == 400
+
+    # ไม่ส่ง limit: ใช้ขนาดหน้าเริ่มต้น ไม่ดึงทั้งตาราง
+    from pagination import DEFAULT_LIMIT
+    response = client.get('/api/admin/users')
+    assert response.status_code == 200
+    assert mock_cursor.execute.call_args[0][1] == (0, DEFAULT_LIMIT + 1)
+
+@patch('export.enrich_transactions')
+@patch('export.get_connection')
+def test_export_bookings_streams_ndjson(mock_get_connection, mock_enrich, client):
+    """
+    23. test_export_bookings_streams_ndjson
+    สิ่งที่ทำ: ส่งออกรายการจองทั้งหมดแบบ NDJSON ผ่าน cursor แบบ unbuffered โดยจำลองฐานข้อมูล (Mocking)
+    ผลลัพธ์ที่คาดหวัง: แถวที่นั่งของ payment เดียวกันถูกรวมเป็นบรรทัดเดียว ใช้ SSDictCursor และคืน connection เมื่อส่งครบ
+    """
+    from instrument import InstrumentedSSDictCursor
+    mock_conn = MagicMock()
+    ss_cursor = MagicMock()
+    mock_get_connection.return_value = mock_conn
+    mock_conn.cursor.return_value = ss_cursor
+    session_cursor = ss_cursor.__enter__.return_value
+    session_cursor.fetchone.return_value = {"net_write_timeout": 60}
+    base = {"book_id": 1, "user_id": 7, "user_email": "a@gmail.com", "amount": 300,
+            "status": "Paid", "payment_time": "2025-01-01T10:00:00", "showtime_id": 3,
+            "showtime": "2025-01-02T18:00:00", "movie_id": "m1", "theater_id": "t1"}
+    ss_cursor.fetchmany.side_effect = [
+        [dict(base, payment_id=1, seat_id=12, seat="A2"), dict(base, payment_id=1, seat_id=11, seat="A1")],
+        [dict(base, payment_id=2, book_id=2, seat_id=20, seat="B5")],
+        [],
+    ]
+
+    response = client.get('/api/admin/export/bookings?format=ndjson&status=Paid')
+    assert response.status_code == 200
+    assert response.mimetype == "application/x-ndjson"
+    lines = [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+    assert [(r["payment_id"], r["seat"], r["seat_count"]) for r in lines] == [(1, "A1, A2", 2), (2, "B5", 1)]
+    mock_conn.cursor.assert_any_call(InstrumentedSSDictCursor)
+    mock_conn.close.assert_called_once()
+    mock_conn.discard.assert_not_called()
+    # คืนค่า net_write_timeout เดิมก่อนคืน connection เข้า pool
+    session_cursor.execute.assert_called_with("SET SESSION net_write_timeout = %s", (60,))
+
+    response = client.get('/api/admin/export/bookings?format=xml')
+    assert response.status_code == 400
+
+@patch('seed.rebuild_review_stats')
+@patch('seed.get_mysql_connection')
+@patch('seed.get_mongo_db')
+def test_generate_dataset_is_reproducible(mock_get_mongo_db, mock_get_connection, mock_rebuild, client):
+    """
+    24. test_generate_dataset_is_reproducible
+    สิ่งที่ทำ: สร้างข้อมูลจำลองขนาดเล็กสองครั้งด้วย seed เดียวกัน โดยจำลองฐานข้อมูล (Mocking)
+    ผลลัพธ์ที่คาดหวัง: แถวที่เขียนลง MySQL เหมือนกันทุกครั้ง เขียนเป็นชุดผ่าน executemany และไม่มีที่นั่งซ้ำในรอบฉายเดียวกัน
+    """
+    import datetime
+    from bson.objectid import ObjectId
+    from seed import generate_dataset
+
+    def run():
+        mongo_db = MagicMock()
+        counter = iter(range(1, 10000))
+        mongo_db.__getattr__('movies').insert_many.side_effect = lambda docs, ordered=False: MagicMock(
+            inserted_ids=[ObjectId(f"{next(counter):024x}") for _ in docs])
+        mongo_db.__getattr__('theaters').insert_many.side_effect = lambda docs, ordered=False: MagicMock(
+            inserted_ids=[ObjectId(f"{next(counter):024x}") for _ in docs])
+        mongo_db.__getattr__('reviews').insert_many.side_effect = lambda docs, ordered=False: MagicMock(
+            inserted_ids=list(range(len(docs))))
+        mock_get_mongo_db.return_value = mongo_db
+        mock_conn = MagicMock()
+        mock_cursor = MagicMock()
+        mock_get_connection.return_value = mock_conn
+        mock_conn.cursor.return_value.__enter__.return_value = mock_cursor
+        mock_cursor.fetchone.side_effect = lambda: {"next_id": 1} if "next_id" in mock_cursor.execute.call_args[0][0] else None
+        generate_dataset(movies=3, theaters=2, days=1, users=20, bookings=60, reviews=10,
+                         seed=7, start=datetime.date(2030, 1, 1), batch_size=50)
+        return [(c[0][0], [tuple(r) for r in c[0][1]]) for c in mock_cursor.executemany.call_args_list]
+
+    # password hashes are salted, everything else must match
+    unsalted = lambda calls: [c for c in calls if not c[0].startswith("INSERT INTO users")]
+    first = run()
+    assert unsalted(first) == unsalted(run())
+    holds = [row for sql, rows in first if sql.startswith("INSERT INTO book_seat") for row in rows]
+    assert len(holds) >= 60
+    assert len({(row[0], row[2]) for row in holds}) == len(holds)
+    assert all(len(rows) <= 50 for _, rows in first)
+
+def test_bench_summary_percentiles():
+    """
+    25. test_bench_summary_percentiles
+    สิ่งที่ทำ: ตรวจสอบการสรุปผล benchmark (requests/sec และ p50/p95/p99) จากค่า latency ที่กำหนดไว้
+    ผลลัพธ์ที่คาดหวัง: ค่า percentile ใช้วิธี nearest-rank เป็นมิลลิวินาที และนับ error แยกจากคำขอที่สำเร็จ
+    """
+    from bench_load import percentile, summarize
+
+    latencies = [n / 1000 for n in range(100, 0, -1)]  # 1..100 ms, unsorted
+    report = summarize(latencies, errors=5, elapsed=2.0)
+    assert report["requests"] == 105
+    assert report["errors"] == 5
+    assert report["rps"] == 50.0
+    assert (report["p50_ms"], report["p95_ms"], report["p99_ms"], report["max_ms"]) == (50.0, 95.0, 99.0, 100.0)
+    assert percentile([], 50) is None
+    assert summarize([], errors=3, elapsed=1.0)["p99_ms"] is None
+
+    import bench_load
+    with patch.object(bench_load.subprocess, "Popen") as popen:
+        bench_load.spawn_app(5055)
+        bench_load.spawn_app(5056, "flask")
+    gunicorn_cmd, flask_cmd = (c.args[0] for c in popen.call_args_list)
+    assert gunicorn_cmd[1:5] == ["-m", "gunicorn", "-c", "gunicorn.conf.py"]
+    assert "127.0.0.1:5055" in gunicorn_cmd and gunicorn_cmd[-1] == "app:create_app()"
+    assert "app.run(" in flask_cmd[-1]
+
+def test_contention_reconcile_detects_double_booking():
+    """
+    26. test_contention_reconcile_detects_double_booking
+    สิ่งที่ทำ: ตรวจสอบตัวตรวจความถูกต้องของ harness จองที่นั่งพร้อมกัน ทั้งกรณีข้อมูลถูกต้องและกรณีที่นั่งถูกจองซ้ำ/ยอดเงินไม่ตรง
+    ผลลัพธ์ที่คาดหวัง: ข้อมูลที่ถูกต้องไม่มีปัญหา ส่วนข้อมูลที่ผิดต้องถูกรายงาน และจัดประเภท 409/deadlock ได้ถูกต้อง
+    """
+    from bench_booking import classify, reconcile
+
+    assert classify(201, {}) == "ok"
+    assert classify(409, {"error": "seat already taken: 3"}) == "conflict"
+    assert classify(400, {"error": "(1213, 'Deadlock found when trying to get lock')"}) == "deadlock"
+    assert classify(400, {"error": "insufficient balance"}) == "rejected"
+    assert classify(None, None) == "error"
+
+    seats = [
+        {"seat_id": 1, "status": "booked", "payment_status": "Paid", "user_id": 10},
+        {"seat_id": 2, "status": "booked", "payment_status": "Paid", "user_id": 10},
+        {"seat_id": 3, "status": "pending", "payment_status": "Pending", "user_id": 11},
+    ]
+    amounts = [{"book_id": 5, "amount": 500, "seat_total": 500}]
+    balances = [{"user_id": 10, "balance": 500, "paid": 500}, {"user_id": 11, "balance": 1000, "paid": 0}]
+    start = {10: 1000.0, 11: 1000.0}
+    assert reconcile([1, 2], start, [], seats, amounts, balances, [10, 11]) == []
+
+    problems = reconcile([1], start, [2], seats, amounts,
+                         [{"user_id": 10, "balance": 200, "paid": 500}, balances[1]], [10, 11])
+    assert len(problems) == 3
+    assert "held more than once" in problems[0]
+
+@patch('users.get_connection')
+def test_prometheus_metrics_per_route(mock_get_connection, client):
+    """
+    27. test_prometheus_metrics_per_route
+    สิ่งที่ทำ: เรียก API รายชื่อผู้ใช้ (จำลองฐานข้อมูลและเวลาของคำสั่ง SQL) แล้วอ่าน /api/admin/metrics
+    ผลลัพธ์ที่คาดหวัง: ได้ข้อความรูปแบบ Prometheus ที่มีจำนวนคำขอ, histogram ของ latency และจำนวน/เวลาคำสั่ง MySQL แยกตาม route
+    """
+    from metrics import metrics
+    from instrument import _notify, _sql_hooks
+
+    mock_conn = MagicMock()
+    mock_cursor = MagicMock()
+    mock_get_connection.return_value = mock_conn
+    mock_conn.cursor.return_value.__enter__.return_value = mock_cursor
+    # the mocked cursor never reaches pymysql, so report the statement like the real cursor would
+    mock_cursor.execute.side_effect = lambda sql, params=None: _notify(_sql_hooks, sql, 0.02, 1, None)
+    mock_cursor.fetchall.return_value = [{"user_id": 1, "email": "a@gmail.com", "balance": 0, "role": "user"}]
+    metrics.reset()
+
+    assert client.get('/api/admin/users').status_code == 200
+    response = client.get('/api/admin/metrics')
+    assert response.status_code == 200
+    assert response.mimetype == "text/plain"
+    text = response.get_data(as_text=True)
+    # ทุก series ระบุ pid ของ worker ที่ตอบ (gunicorn หลาย worker นับแยกกัน)
+    pid = f'pid="{os.getpid()}",'
+    assert f'cinema_streams_limit{{{pid[:-1]}}}' in text
+    text = text.replace(pid, "")
+    assert 'cinema_http_requests_total{method="GET",route="/api/admin/users",status="200"} 1' in text
+    assert 'cinema_http_request_duration_seconds_count{method="GET",route="/api/admin/users"} 1' in text
+    assert 'cinema_db_queries_total{method="GET",route="/api/admin/users",db="mysql"} 1' in text
+    assert 'cinema_db_query_seconds_total{method="GET",route="/api/admin/users",db="mysql"} 0.020000' in text
+    assert 'cinema_db_query_duration_seconds_bucket{db="mysql",le="0.025"} 1' in text
+
+def test_query_log_flags_n_plus_one_and_slow_queries():
+    """
+    28. test_query_log_flags_n_plus_one_and_slow_queries
+    สิ่งที่ทำ: จำลองคำสั่ง SQL รูปแบบเดียวกันหลายครั้งในคำขอเดียว และคำสั่งที่ช้ากว่าเกณฑ์
+    ผลลัพธ์ที่คาดหวัง: คำสั่งที่ต่างกันแค่ค่าพารามิเตอร์ถูกนับเป็นรูปแบบเดียว มีคำเตือน N+1 พร้อมตำแหน่งในโค้ด และบันทึก slow query
+    """
+    from querylog import QueryLog, sql_shape
+
+    assert sql_shape("SELECT * FROM seats WHERE seat_id IN (%s, %s, %s)") == "SELECT * FROM seats WHERE seat_id IN (...)"
+    assert sql_shape("INSERT INTO t (a, b) VALUES (1, 'x'), (2, 'y')") == "INSERT INTO t (a, b) VALUES (?, ?), ..."
+    assert sql_shape("SELECT title FROM movies  WHERE id = 7") == sql_shape("SELECT title FROM movies WHERE id = 42")
+
+    lines = []
+    log = QueryLog(threshold=3, slow_ms=100, out=lines.append)
+    with app.test_request_context('/api/booking/history/1'):
+        log.begin()
+        for movie_id in range(5):
+            log.observe("mysql", sql_shape(f"SELECT title FROM movies WHERE id = {movie_id}"), 0.001)
+        log.observe("mongo", "find movies", 0.25)
+        repeated = log.end()
+
+    assert [(store, count) for store, _, count, _, _ in repeated] == [("mysql", 5)]
+    assert any(line.startswith("[slow-query] mongo 250.0 ms") for line in lines)
+    n_plus_one = [line for line in lines if line.startswith("[n+1]")]
+    assert len(n_plus_one) == 1
+    assert "ran 5x" in n_plus_one[0] and "test_app.py" in n_plus_one[0] and "/api/booking/history/1" in n_plus_one[0]
+
+def test_tracing_spans_follow_incoming_traceparent():
+    """
+    29. test_tracing_spans_follow_incoming_traceparent
+    สิ่งที่ทำ: เปิด trace ของคำขอที่มี header traceparent มาจากผู้เรียก แล้วบันทึก span ของคำสั่ง MySQL และ MongoDB
+    ผลลัพธ์ที่คาดหวัง: ใช้ trace id เดิมจาก header, span ลูกชี้ไปที่ span ของคำขอ และ exporter ได้รับ span ทั้งหมดพร้อมรูปแบบคำสั่งและจำนวนแถว
+    """
+    from tracing import Tracer, parse_traceparent
+
+    incoming = "00-4bf92f3577b34da6a3ce929d0e0e4736-00f067aa0ba902b7-01"
+    assert parse_traceparent(incoming) == ("4bf92f3577b34da6a3ce929d0e0e4736", "00f067aa0ba902b7", True)
+    assert parse_traceparent("garbage") is None
+
+    exported = []
+    exporter = MagicMock()
+    exporter.export.side_effect = exported.append
+    tracer = Tracer(exporter, sample_rate=0.0)
+
+    outgoing = tracer.start("GET /api/transactions/<int:user_id>", incoming)
+    trace = tracer.current()
+    trace.child("mysql", 0.012, {"db.statement": "SELECT ... FROM payments p WHERE b.user_id = %s", "db.rows": 20})
+    trace.child("mongo.find", 0.002, {"db.statement": "find movies", "db.documents": 5})
+    spans = tracer.finish(**{"http.status_code": 200})
+
+    root = spans[0]
+    assert outgoing == f"00-4bf92f3577b34da6a3ce929d0e0e4736-{root.span_id}-01"
+    assert root.parent_id == "00f067aa0ba902b7"
+    assert [s.parent_id for s in spans[1:]] == [root.span_id, root.span_id]
+    assert {s.trace_id for s in spans} == {"4bf92f3577b34da6a3ce929d0e0e4736"}
+    assert exported == [spans]
+    assert spans[1].to_dict()["duration_ms"] == 12.0
+
+    # sample_rate 0 and no incoming decision: nothing is recorded
+    assert tracer.start("GET /api/movies").endswith("-00")
+    assert tracer.finish() is None
+
+@patch('mongo_routes.get_connection')
+@patch('mongo_routes.get_mongo_db')
+def test_create_theater_inserts_layout_in_one_statement(mock_get_mongo_db, mock_get_connection, client):
+    """
+    30. test_create_theater_inserts_layout_in_one_statement
+    สิ่งที่ทำ: สร้างโรงภาพยนตร์ใหม่แบบ IMAX ด้วย layout มาตรฐาน โดยจำลองฐานข้อมูล (Mocking)
+    ผลลัพธ์ที่คาดหวัง: ที่นั่งทั้ง 112 ที่ถูกเพิ่มด้วยคำสั่ง INSERT เดียว ราคาตามรูปแบบโรง และ layout ที่ไม่รู้จักได้ HTTP 400
+    """
+    from bson.objectid import ObjectId
+    mongo_db = MagicMock()
+    theater_id = ObjectId()
+    mongo_db.theaters.insert_one.return_value.inserted_id = theater_id
+    mongo_db.theaters.find_one.return_value = {"_id": theater_id, "branch_name": "Hall 9", "format": "IMAX", "layout": "standard"}
+    mock_get_mongo_db.return_value = mongo_db
+    mock_conn = MagicMock()
+    mock_cursor = MagicMock()
+    mock_get_connection.return_value = mock_conn
+    mock_conn.cursor.return_value.__enter__.return_value = mock_cursor
+
+    response = client.post('/api/mongo/theaters', json={"branch_name": "Hall 9", "format": "IMAX"})
+    assert response.status_code == 201
+    assert mock_cursor.execute.call_count == 1
+    sql, params = mock_cursor.execute.call_args[0]
+    assert sql.startswith("INSERT INTO seats (theater_id, seat, price) VALUES")
+    seats = [tuple(params[i:i + 3]) for i in range(0, len(params), 3)]
+    assert len(seats) == 112
+    assert seats[0] == (str(theater_id), "A1", 350.00)
+    assert seats[-1] == (str(theater_id), "G16", 750.00)
+    mock_conn.commit.assert_called_once()
+
+    response = client.post('/api/mongo/theaters', json={"branch_name": "Hall 10", "layout": "stadium"})
+    assert response.status_code == 400
+
+@patch('db.get_mongo_client')
+@patch('db.get_pool')
+def test_create_app_factory_and_worker_init(mock_get_pool, mock_get_mongo_client):
+    """
+    31. test_create_app_factory_and_worker_init
+    สิ่งที่ทำ: สร้างแอปใหม่ด้วย create_app() และเรียก hook post_fork ของ gunicorn แบบจำลอง (Mocking)
+    ผลลัพธ์ที่คาดหวัง: แอปใหม่มี route ครบและรับ config ได้ และแต่ละ worker เตรียม MySQL pool กับ MongoClient ของตัวเองหลัง fork
+    """
+    import runpy
+    from app import create_app
+
+    other = create_app({"TESTING": True})
+    assert other is not app and other.config["TESTING"] is True
+    rules = {rule.rule for rule in other.url_map.iter_rules()}
+    assert {"/api/movies", "/api/booking/bulk", "/api/admin/metrics", "/api/admin/db/pool"} <= rules
+
+    conf = runpy.run_path(os.path.join(os.path.dirname(__file__), "gunicorn.conf.py"))
+    assert conf["worker_class"] == "gthread" and conf["workers"] >= 1
+    with patch.dict(os.environ, {"HOLD_REAPER": "0"}):
+        conf["post_fork"](MagicMock(), MagicMock())
+    mock_get_pool.return_value.fill.assert_called_once()
+    mock_get_mongo_client.assert_called_once()
+
+    # หลังเตรียม pool แล้ว การยืม connection ไม่เรียก fill() ซ้ำทุกครั้ง
+    import db
+    db.get_connection()
+    db.get_connection()
+    mock_get_pool.return_value.fill.assert_called_once()
+    assert mock_get_pool.return_value.acquire.call_count == 2
+
+    # stream ที่ค้างเธรดไว้ถูกจำกัดจำนวนต่อ worker: เกินแล้วได้ 503 + Retry-After ทันที
+    from streams import stream_slots
+    active = stream_slots.active
+    with patch.object(stream_slots, "limit", 0):
+        client = other.test_client()
+        for url in ('/api/seats/stream?showtime_id=1', '/api/admin/export/bookings'):
+            response = client.get(url)
+            assert response.status_code == 503
+            assert "Retry-After" in response.headers
+    assert stream_slots.active == active
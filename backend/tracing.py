@@ -0,0 +1,224 @@
+import json
+import os
+import random
+import threading
+import time
+from flask import Blueprint, request
+from instrument import on_sql, on_mongo
+from querylog import sql_shape
+
+tracing_bp = Blueprint("tracing", __name__)
+
+# Request tracing across MySQL and MongoDB calls.
+#
+# Each request gets a span ("GET /api/transactions/<int:user_id>") and
+# every SQL statement / Mongo command it runs becomes a child span carrying
+# the statement shape, rows/documents and duration. The trace id is taken
+# from an incoming W3C `traceparent` header when present (so the request
+# joins the caller's trace) and returned in a `traceparent` response header.
+#
+# Finished traces go to an exporter chosen with TRACE_EXPORTER:
+#   none     tracing off (default)
+#   console  a timeline per request printed to stdout
+#   file     one JSON object per span appended to TRACE_FILE (traces.jsonl)
+# TRACE_SAMPLE_RATE (0..1) traces only a share of requests that do not come
+# with a sampling decision of their own.
+
+EXPORTER = os.getenv("TRACE_EXPORTER", "none").lower()
+TRACE_FILE = os.getenv("TRACE_FILE", os.path.join(os.path.dirname(os.path.abspath(__file__)), "traces.jsonl"))
+SAMPLE_RATE = float(os.getenv("TRACE_SAMPLE_RATE", "1.0"))
+MAX_SPANS = int(os.getenv("TRACE_MAX_SPANS", "1000"))
+
+_random = random.SystemRandom()
+
+
+def _new_id(nbytes):
+    return "%0*x" % (nbytes * 2, _random.getrandbits(nbytes * 8))
+
+
+def parse_traceparent(value):
+    """(trace_id, parent_span_id, sampled) from a traceparent header, or None if invalid."""
+    parts = (value or "").strip().split("-")
+    if len(parts) < 4 or len(parts[0]) != 2 or parts[0] == "ff":
+        return None
+    trace_id, span_id, flags = parts[1].lower(), parts[2].lower(), parts[3]
+    try:
+        int(trace_id, 16), int(span_id, 16)
+        sampled = bool(int(flags, 16) & 1)
+    except ValueError:
+        return None
+    if len(trace_id) != 32 or len(span_id) != 16 or trace_id == "0" * 32 or span_id == "0" * 16:
+        return None
+    return trace_id, span_id, sampled
+
+
+class Span:
+    __slots__ = ("name", "trace_id", "span_id", "parent_id", "start", "duration", "attributes", "error")
+
+    def __init__(self, name, trace_id, parent_id, start, duration=None, attributes=None, error=None):
+        self.name = name
+        self.trace_id = trace_id
+        self.span_id = _new_id(8)
+        self.parent_id = parent_id
+        self.start = start          # epoch seconds
+        self.duration = duration    # seconds
+        self.attributes = attributes or {}
+        self.error = error
+
+    def to_dict(self):
+        return {
+            "name": self.name,
+            "trace_id": self.trace_id,
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "start": round(self.start, 6),
+            "duration_ms": round((self.duration or 0) * 1000, 3),
+            "attributes": self.attributes,
+            "error": str(self.error) if self.error else None,
+        }
+
+
+class Trace:
+    def __init__(self, trace_id, parent_id, name):
+        self.root = Span(name, trace_id, parent_id, time.time())
+        self._started = time.perf_counter()
+        self.children = []
+        self.dropped = 0
+
+    def child(self, name, seconds, attributes, error=None):
+        if len(self.children) >= MAX_SPANS:
+            self.dropped += 1
+            return
+        # called when the statement has finished; back-date its start
+        self.children.append(Span(name, self.root.trace_id, self.root.span_id,
+                                  time.time() - seconds, seconds, attributes, error))
+
+    def finish(self):
+        self.root.duration = time.perf_counter() - self._started
+        if self.dropped:
+            self.root.attributes["spans.dropped"] = self.dropped
+        return [self.root] + self.children
+
+
+class ConsoleExporter:
+    def __init__(self, out=print):
+        self.out = out
+
+    def export(self, spans):
+        root = spans[0]
+        lines = [f"trace {root.trace_id} {root.name} "
+                 f"{root.attributes.get('http.status_code', '-')} {root.duration * 1000:.1f} ms"]
+        for span in spans[1:]:
+            offset = (span.start - root.start) * 1000
+            detail = " ".join(f"{k}={v}" for k, v in span.attributes.items()
+                              if k not in ("db.system", "db.statement"))
+            lines.append(f"  +{offset:8.1f} ms {span.duration * 1000:8.1f} ms  {span.name}  "
+                         f"{span.attributes.get('db.statement', '')[:120]}  {detail}".rstrip())
+        self.out("\n".join(lines))
+
+
+class FileExporter:
+    def __init__(self, path=TRACE_FILE):
+        self.path = path
+        self._lock = threading.Lock()
+
+    def export(self, spans):
+        data = "".join(json.dumps(span.to_dict(), default=str) + "\n" for span in spans)
+        with self._lock:
+            with open(self.path, "a") as f:
+                f.write(data)
+
+
+class Tracer:
+    def __init__(self, exporter=None, sample_rate=SAMPLE_RATE):
+        self.exporter = exporter
+        self.sample_rate = sample_rate
+        self._local = threading.local()
+
+    def current(self):
+        return getattr(self._local, "trace", None)
+
+    def start(self, name, traceparent=None):
+        """Begin the request trace; returns the traceparent to send back."""
+        incoming = parse_traceparent(traceparent)
+        if incoming:
+            trace_id, parent_id, sampled = incoming
+        else:
+            trace_id, parent_id = _new_id(16), None
+            sampled = _random.random() < self.sample_rate
+        trace = Trace(trace_id, parent_id, name) if sampled else None
+        self._local.trace = trace
+        span_id = trace.root.span_id if trace else (parent_id or _new_id(8))
+        return f"00-{trace_id}-{span_id}-{'01' if sampled else '00'}"
+
+    def finish(self, **attributes):
+        trace = self.current()
+        self._local.trace = None
+        if trace is None:
+            return None
+        trace.root.attributes.update(attributes)
+        spans = trace.finish()
+        if self.exporter is not None:
+            try:
+                self.exporter.export(spans)
+            except Exception as e:
+                print(f"Trace export failed: {e}")
+        return spans
+
+
+def _exporter():
+    if EXPORTER == "console":
+        return ConsoleExporter()
+    if EXPORTER == "file":
+        return FileExporter()
+    return None
+
+
+tracer = Tracer(_exporter())
+
+
+if tracer.exporter is not None:
+    @on_sql
+    def _trace_sql(query, seconds, rowcount, error):
+        trace = tracer.current()
+        if trace is not None:
+            trace.child("mysql", seconds, {
+                "db.system": "mysql",
+                "db.statement": sql_shape(query),
+                "db.rows": rowcount,
+            }, error)
+
+    @on_mongo
+    def _trace_mongo(command_name, collection, seconds, error, docs):
+        trace = tracer.current()
+        if trace is not None:
+            trace.child(f"mongo.{command_name}", seconds, {
+                "db.system": "mongodb",
+                "db.statement": f"{command_name} {collection or ''}".strip(),
+                "db.collection": collection,
+                "db.documents": docs,
+            }, error)
+
+    @tracing_bp.before_app_request
+    def _start_trace():
+        rule = request.url_rule.rule if request.url_rule is not None else request.path
+        request.environ["tracing.traceparent"] = tracer.start(
+            f"{request.method} {rule}", request.headers.get("traceparent")
+        )
+
+    @tracing_bp.after_app_request
+    def _tag_response(response):
+        response.headers["traceparent"] = request.environ.get("tracing.traceparent", "")
+        trace = tracer.current()
+        if trace is not None:
+            trace.root.attributes["http.status_code"] = response.status_code
+        return response
+
+    @tracing_bp.teardown_app_request
+    def _finish_trace(exc):
+        # runs after streamed responses have finished, so their queries are included
+        trace = tracer.current()
+        if trace is not None and exc is not None:
+            trace.root.error = exc
+            trace.root.attributes.setdefault("http.status_code", 500)
+        tracer.finish(**{"http.method": request.method, "http.target": request.full_path.rstrip("?")})
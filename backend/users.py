@@ -1,5 +1,6 @@
 from flask import Blueprint, request, jsonify
 from db import get_connection
+from pagination import BadCursor, page_args, page_response
 
 users_bp = Blueprint("users", __name__)
 
@@ -61,12 +62,22 @@ def delete_user(user_id):
         conn.close()
 @users_bp.route("/api/admin/users", methods=["GET"])
 def list_users():
+    # keyset pagination by user_id (see pagination.py)
+    try:
+        limit, after = page_args(1)
+    except BadCursor as e:
+        return jsonify({"error": str(e)}), 400
+
     conn = get_connection()
     try:
         with conn.cursor() as cursor:
-            cursor.execute("SELECT user_id, email, balance, role FROM users")
+            cursor.execute(
+                "SELECT user_id, email, balance, role FROM users "
+                "WHERE user_id > %s ORDER BY user_id LIMIT %s",
+                (after[0] if after else 0, limit + 1)
+            )
             users = cursor.fetchall()
-            return jsonify(users)
+            return page_response(users, limit, lambda u: [u["user_id"]])
     finally:
         conn.close()
 
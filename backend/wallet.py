@@ -1,5 +1,6 @@
 from flask import Blueprint, request, jsonify
 from db import get_connection, get_mongo_db
+from pagination import BadCursor, page_args, page_response
 import datetime
 from bson.objectid import ObjectId
 
@@ -42,21 +43,33 @@ def get_qr_code():
 # ================= ADMIN: MANAGE TOP-UPS =================
 @wallet_bp.route("/api/admin/wallet/requests", methods=["GET"])
 def list_topup_requests():
+    # keyset pagination by (created_at, request_id), newest first
+    try:
+        limit, after = page_args(2)
+    except BadCursor as e:
+        return jsonify({"error": str(e)}), 400
+    keyset_sql, keyset_params = "", ()
+    if after:
+        keyset_sql = "WHERE tr.created_at < %s OR (tr.created_at = %s AND tr.request_id < %s)"
+        keyset_params = (after[0], after[0], after[1])
+
     try:
         conn = get_connection()
         with conn.cursor() as cursor:
-            cursor.execute("""
+            cursor.execute(f"""
                 SELECT tr.*, u.email 
                 FROM topup_requests tr
                 JOIN users u ON tr.user_id = u.user_id
-                ORDER BY tr.created_at DESC
-            """)
+                {keyset_sql}
+                ORDER BY tr.created_at DESC, tr.request_id DESC
+                LIMIT %s
+            """, (*keyset_params, limit + 1))
             requests = cursor.fetchall()
             # Convert decimal and datetime for JSON
             for r in requests:
                 r["amount"] = float(r["amount"])
                 r["created_at"] = r["created_at"].isoformat()
-            return jsonify(requests)
+            return page_response(requests, limit, lambda r: [r["created_at"].replace("T", " "), r["request_id"]])
     except Exception as e:
         return jsonify({"error": str(e)}), 500
     finally:
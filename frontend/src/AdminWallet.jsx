@@ -1,27 +1,35 @@
 import { useState, useEffect } from "react";
 import { useNavigate } from "react-router-dom";
+import { fetchPage } from "./paging";
 
 const API = import.meta.env.VITE_API || "/api";
 
 function AdminWallet() {
     const [requests, setRequests] = useState([]);
+    const [requestsCursor, setRequestsCursor] = useState(null);
     const [bookings, setBookings] = useState([]);
+    const [bookingsCursor, setBookingsCursor] = useState(null);
     const [qrUrl, setQrUrl] = useState("");
     const [newQrUrl, setNewQrUrl] = useState("");
     const [loading, setLoading] = useState(false);
     const navigate = useNavigate();
 
-    const fetchRequests = () => {
-        fetch(`${API}/admin/wallet/requests`)
-            .then(r => r.json())
-            .then(d => setRequests(Array.isArray(d) ? d : []))
+    // lists are paged; pass the X-Next-Cursor of the last page to append the next one
+    const fetchRequests = (cursor = null) => {
+        fetchPage(`${API}/admin/wallet/requests`, cursor)
+            .then(({ items, next }) => {
+                setRequests(prev => (cursor ? [...prev, ...items] : items));
+                setRequestsCursor(next);
+            })
             .catch(console.error);
     };
 
-    const fetchBookings = () => {
-        fetch(`${API}/admin/bookings`)
-            .then(r => r.json())
-            .then(d => setBookings(Array.isArray(d) ? d : []))
+    const fetchBookings = (cursor = null) => {
+        fetchPage(`${API}/admin/bookings`, cursor)
+            .then(({ items, next }) => {
+                setBookings(prev => (cursor ? [...prev, ...items] : items));
+                setBookingsCursor(next);
+            })
             .catch(console.error);
     };
 
@@ -123,7 +131,7 @@ function AdminWallet() {
                             <h3 className="font-bold flex items-center gap-2">
                                 <span className="material-symbols-outlined text-primary">pending_actions</span> Pending Top-ups
                             </h3>
-                            <button onClick={fetchRequests} className="text-xs text-primary hover:text-white transition-colors uppercase font-bold tracking-widest flex items-center gap-1">
+                            <button onClick={() => fetchRequests()} className="text-xs text-primary hover:text-white transition-colors uppercase font-bold tracking-widest flex items-center gap-1">
                                 <span className="material-symbols-outlined text-xs">refresh</span> Refresh
                             </button>
                         </div>
@@ -171,6 +179,11 @@ function AdminWallet() {
                                 </tbody>
                             </table>
                         </div>
+                        {requestsCursor && (
+                            <button onClick={() => fetchRequests(requestsCursor)} className="py-3 text-xs text-primary hover:text-white transition-colors uppercase font-bold tracking-widest border-t border-neutral-dark/30">
+                                Load more
+                            </button>
+                        )}
                     </div>
 
                     {/* Booking Management Section */}
@@ -179,7 +192,7 @@ function AdminWallet() {
                             <h3 className="font-bold flex items-center gap-2">
                                 <span className="material-symbols-outlined text-primary">confirmation_number</span> Booking Management
                             </h3>
-                            <button onClick={fetchBookings} className="text-xs text-primary hover:text-white transition-colors uppercase font-bold tracking-widest flex items-center gap-1">
+                            <button onClick={() => fetchBookings()} className="text-xs text-primary hover:text-white transition-colors uppercase font-bold tracking-widest flex items-center gap-1">
                                 <span className="material-symbols-outlined text-xs">refresh</span> Refresh
                             </button>
                         </div>
@@ -238,6 +251,11 @@ function AdminWallet() {
                                 </tbody>
                             </table>
                         </div>
+                        {bookingsCursor && (
+                            <button onClick={() => fetchBookings(bookingsCursor)} className="py-3 text-xs text-primary hover:text-white transition-colors uppercase font-bold tracking-widest border-t border-neutral-dark/30">
+                                Load more
+                            </button>
+                        )}
                     </div>
                 </div>
 
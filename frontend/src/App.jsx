@@ -292,7 +292,8 @@ function Cinema({ user, navigate, searchTerm }) {
         body: JSON.stringify({
           user_id: user.user_id,
           showtime_id: showtimeId,
-          seat_ids: selectedSeats.map(s => s.seat_id)
+          seat_ids: selectedSeats.map(s => s.seat_id),
+          mode: "basket"
         })
       });
       const res = await resp.json();
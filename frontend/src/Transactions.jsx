@@ -1,36 +1,30 @@
 import { useEffect, useState } from "react";
+import { fetchPage } from "./paging";
 
 const API = import.meta.env.VITE_API || "/api"; // support proxy and container networking
 
 export default function Transactions({ user, refreshUser }) {
   const [data, setData] = useState([]);
-  const [totalDue, setTotalDue] = useState(0);
+  const [nextCursor, setNextCursor] = useState(null);
 
-  const load = () => {
-    fetch(`${API}/transactions/${user.user_id}`)
-      .then(r => {
-        if (!r.ok) throw new Error(`Server error: ${r.status}`);
-        return r.json();
-      })
-      .then(arr => {
-        if (!Array.isArray(arr)) {
-          console.warn("Expected array from transactions API", arr);
-          setData([]);
-          return;
-        }
-        setData(arr);
-        const due = arr
-          .filter(t => t.status === "Pending")
-          .reduce((sum, t) => sum + Number(t.amount || 0), 0);
-        setTotalDue(due);
+  const totalDue = data
+    .filter(t => t.status === "Pending")
+    .reduce((sum, t) => sum + Number(t.amount || 0), 0);
+
+  // first page; "Load more" follows X-Next-Cursor
+  const load = (cursor = null) => {
+    fetchPage(`${API}/transactions/${user.user_id}`, cursor)
+      .then(({ items, next }) => {
+        setData(prev => (cursor ? [...prev, ...items] : items));
+        setNextCursor(next);
       })
       .catch(e => {
         console.error("Failed to load transactions:", e);
-        setData([]);
+        if (!cursor) setData([]);
       });
   };
 
-  useEffect(load, [user]);
+  useEffect(() => load(), [user]);
 
   const doPayAll = async () => {
     if (totalDue <= 0) return;
@@ -108,6 +102,16 @@ export default function Transactions({ user, refreshUser }) {
           </div>
         ))}
       </div>
+      {nextCursor && (
+        <div className="mt-4 flex justify-center">
+          <button
+            onClick={() => load(nextCursor)}
+            className="text-xs text-primary hover:text-white transition-colors uppercase font-bold tracking-widest"
+          >
+            Load more
+          </button>
+        </div>
+      )}
       {totalDue > 0 && (
         <div style={{ marginTop: 24, padding: 16, borderRadius: 12, background: "#111", border: "1px solid #333" }}>
           <div style={{ fontWeight: "bold", marginBottom: 8 }}>
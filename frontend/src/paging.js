@@ -0,0 +1,9 @@
+// Keyset-paginated list endpoints return one page as a JSON array and the
+// cursor for the next page in the X-Next-Cursor header (none = last page).
+export async function fetchPage(url, cursor) {
+  const sep = url.includes("?") ? "&" : "?";
+  const r = await fetch(cursor ? `${url}${sep}cursor=${encodeURIComponent(cursor)}` : url);
+  if (!r.ok) throw new Error(`Server error: ${r.status}`);
+  const items = await r.json();
+  return { items: Array.isArray(items) ? items : [], next: r.headers.get("X-Next-Cursor") };
+}
@@ -1,3 +1,4 @@
+DROP TABLE IF EXISTS schema_migrations;
 DROP TABLE IF EXISTS payments;
 DROP TABLE IF EXISTS topup_requests;
 DROP TABLE IF EXISTS book_seat;
@@ -20,7 +21,11 @@ CREATE TABLE showtimes (
     showtime_id INT AUTO_INCREMENT PRIMARY KEY,
     movie_id VARCHAR(50) NOT NULL, -- References MongoDB ObjectId
     theater_id VARCHAR(50) NOT NULL, -- References MongoDB ObjectId
-    showtime DATETIME NOT NULL
+    showtime DATETIME NOT NULL,
+    end_time DATETIME NULL, -- showtime + movie duration, used for overlap checks
+    INDEX idx_showtimes_movie_time (movie_id, showtime),
+    INDEX idx_showtimes_theater_time (theater_id, showtime),
+    INDEX idx_showtimes_theater_end (theater_id, end_time)
 );
 
 -- BOOKING
@@ -29,6 +34,7 @@ CREATE TABLE booking (
     user_id INT NOT NULL,
     showtime_id INT NOT NULL,
     created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+    INDEX idx_booking_user (user_id),
     FOREIGN KEY (user_id) REFERENCES users (user_id),
     FOREIGN KEY (showtime_id) REFERENCES showtimes (showtime_id)
 );
@@ -38,7 +44,8 @@ CREATE TABLE seats (
     seat_id INT AUTO_INCREMENT PRIMARY KEY,
     theater_id VARCHAR(50) NOT NULL, -- References MongoDB ObjectId
     seat VARCHAR(5) NOT NULL,
-    price DECIMAL(10, 2) NOT NULL DEFAULT 250.00
+    price DECIMAL(10, 2) NOT NULL DEFAULT 250.00,
+    INDEX idx_seats_theater (theater_id)
 );
 
 -- BOOK_SEAT
@@ -48,10 +55,12 @@ CREATE TABLE book_seat (
     book_id INT NOT NULL,
     seat_id INT NOT NULL,
     status ENUM('pending', 'booked') NOT NULL DEFAULT 'pending',
+    created_at DATETIME DEFAULT CURRENT_TIMESTAMP, -- when the seat was held; pending holds expire after HOLD_TTL_SECONDS
     FOREIGN KEY (showtime_id) REFERENCES showtimes (showtime_id),
     FOREIGN KEY (book_id) REFERENCES booking (book_id),
     FOREIGN KEY (seat_id) REFERENCES seats (seat_id),
-    UNIQUE (showtime_id, seat_id)
+    UNIQUE (showtime_id, seat_id),
+    INDEX idx_book_seat_status_created (status, created_at)
 );
 
 -- PAYMENTS
@@ -61,6 +70,8 @@ CREATE TABLE payments (
     amount DECIMAL(10, 2) NOT NULL,
     status ENUM('Failed', 'Pending', 'Paid') DEFAULT 'Pending',
     payment_time DATETIME DEFAULT CURRENT_TIMESTAMP,
+    INDEX idx_payments_book_status (book_id, status),
+    INDEX idx_payments_time (payment_time),
     FOREIGN KEY (book_id) REFERENCES booking (book_id)
 );
 
@@ -75,6 +86,8 @@ CREATE TABLE topup_requests (
         'Rejected'
     ) DEFAULT 'Pending',
     created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+    INDEX idx_topup_status_created (status, created_at),
+    INDEX idx_topup_created (created_at),
     FOREIGN KEY (user_id) REFERENCES users (user_id)
 );
 